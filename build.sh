@@ -11,5 +11,14 @@ python manage.py makemigrations
 # Run migrations
 python manage.py migrate
 
+# Create the shared cache table (no-op when it exists)
+python manage.py createcachetable
+
+# Seed or repair the membership analytics rollups
+python manage.py reconcile_membership_rollups
+
+# Compute article derivatives for rows saved before (or under an older) pipeline
+python manage.py backfill_article_derivatives
+
 # Collect static files
 python manage.py collectstatic --no-input 
\ No newline at end of file
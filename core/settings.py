@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 from dotenv import load_dotenv
 import cloudinary
@@ -34,6 +35,9 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
+# True under `manage.py test`, where Django forces DEBUG off
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1,backend-dep-kwln.onrender.com').split(',')
 
 
@@ -46,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -105,6 +110,24 @@ DATABASES = {
 }
 
 
+# Caches
+# `default` is shared by every web and worker process (python manage.py createcachetable),
+# so invalidation tokens written by one process are seen by all of them. `responses`
+# holds rendered bodies per process; their keys embed the shared tokens.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -183,7 +206,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'party.pagination.FeedPagination',
     'PAGE_SIZE': 10
 }
 
@@ -296,13 +319,67 @@ LOGGING = {
 
 # Frontend URL for newsletter verification
 FRONTEND_URL = os.getenv('FRONTEND_URL')
+# Per-recipient unsubscribe link placed in newsletters, {email} is substituted
+NEWSLETTER_UNSUBSCRIBE_URL = os.getenv('NEWSLETTER_UNSUBSCRIBE_URL', f"{FRONTEND_URL}/unsubscribe?email={{email}}")
 
 # Email Configuration
 EMAIL_BACKEND = 'party.email_backend.BrevoEmailBackend'
 BREVO_API_KEY = os.getenv('BREVO_API_KEY')
+BREVO_EMAIL = {
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 30,
+    'MAX_CONCURRENCY': int(os.getenv('BREVO_MAX_CONCURRENCY', 4)),
+    'MAX_RETRIES': 3,
+}
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 
+# Newsletter fan-out: subscribers are streamed in chunks and sent in batches
+# by a bounded worker pool, throttled per email provider
+NEWSLETTER_FANOUT = {
+    'CHUNK_SIZE': int(os.getenv('NEWSLETTER_CHUNK_SIZE', 1000)),
+    'PROVIDER': os.getenv('NEWSLETTER_PROVIDER', 'brevo'),
+    'PROVIDERS': {
+        'brevo': {
+            'BATCH_SIZE': 50,
+            'MAX_WORKERS': 4,
+            'MAX_PER_SECOND': 100,
+        },
+        'console': {
+            'BACKEND': 'django.core.mail.backends.console.EmailBackend',
+            'BATCH_SIZE': 100,
+            'MAX_WORKERS': 1,
+            'MAX_PER_SECOND': None,
+        },
+    },
+}
+
+# Background job queue (python manage.py run_jobs)
+JOB_QUEUE = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+    'STALE_AFTER': 1800,
+}
+
+# Cached anonymous GET responses for the public read endpoints; model saves
+# and deletes invalidate them, TIMEOUT only bounds how long an entry can live
+RESPONSE_CACHE = {
+    'CACHE': 'responses',
+    'TIMEOUT': 300,
+    'MAX_BODY_SIZE': 2 * 1024 * 1024,
+}
+
+# Unpaid orders hold their stock for TTL seconds; the sweeper (release_expired_reservations)
+# returns it afterwards, SWEEP_BATCH reservations per transaction
+STOCK_RESERVATION = {
+    'TTL': int(os.getenv('STOCK_RESERVATION_TTL', 900)),
+    'SWEEP_BATCH': 500,
+}
+
+# Payments: signs provider callbacks; callbacks are refused while it is unset
+PAYMENT_WEBHOOK_SECRET = os.getenv('PAYMENT_WEBHOOK_SECRET')
+
 # For development/testing, you can use console backend instead:
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
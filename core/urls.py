@@ -26,12 +26,16 @@ from party.views.views import (
     GalleryViewSet, GalleryCategoryViewSet,
     NationalLeadershipViewSet, LeadershipPositionViewSet,
     DonationViewSet, ProductViewSet, ProductCategoryViewSet,
-    OrderViewSet, OrderItemViewSet, MembershipPlanViewSet,
+    OrderItemViewSet, MembershipPlanViewSet,
     MembershipViewSet, UserViewSet, CountyViewSet,
     ConstituencyViewSet, WardViewSet
 )
-from party.views.shop import PickupLocationViewSet
+from party.views.shop import OrderViewSet, PickupLocationViewSet
 from party.views.newsletter import subscribe, verify_subscription, unsubscribe
+from party.views.locations import location_hierarchy, location_search
+from party.views.analytics import membership_totals, membership_series, response_cache_metrics
+from party.views.payments import payment_callback
+from party.views.search import site_search
 from django.views.static import serve
 
 router = DefaultRouter()
@@ -67,6 +71,13 @@ urlpatterns = [
     path('api/newsletter/subscribe/', subscribe, name='newsletter-subscribe'),
     path('api/newsletter/verify/<str:token>/', verify_subscription, name='newsletter-verify'),
     path('api/newsletter/unsubscribe/', unsubscribe, name='newsletter-unsubscribe'),
+    path('api/locations/hierarchy/', location_hierarchy, name='location-hierarchy'),
+    path('api/locations/search/', location_search, name='location-search'),
+    path('api/search/', site_search, name='site-search'),
+    path('api/analytics/memberships/', membership_totals, name='analytics-membership-totals'),
+    path('api/analytics/memberships/series/', membership_series, name='analytics-membership-series'),
+    path('api/analytics/response-cache/', response_cache_metrics, name='analytics-response-cache'),
+    path('api/payments/callback/<str:provider>/', payment_callback, name='payment-callback'),
 ]
 
 # Serve media files in both development and production
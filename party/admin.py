@@ -1,14 +1,29 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.postgres.search import SearchQuery
 from django.utils.translation import gettext_lazy as _
 from .models import (
     User, News, NewsCategory, Event, EventCategory, EventRegistration,
     Gallery, GalleryCategory, NationalLeadership, LeadershipPosition,
     Donation, Product, ProductCategory, Order, OrderItem,
-    MembershipPlan, Membership, NewsletterSubscription
+    MembershipPlan, Membership, NewsletterSubscription, BackgroundJob
 )
 from .models.locations import County, Constituency, Ward
 from .models.shop import PickupLocation
+from .services.search import SEARCH_CONFIG
+
+
+class FullTextSearchAdminMixin:
+    """
+    Answer the changelist search box from the stored search_vector (GIN index)
+    instead of icontains scans over the HTML content; search_fields only
+    switches the box on
+    """
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        query = SearchQuery(search_term, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query), False
 
 # Location Admin
 @admin.register(County)
@@ -68,7 +83,7 @@ class NewsCategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(News)
-class NewsAdmin(admin.ModelAdmin):
+class NewsAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'category', 'author', 'is_published', 'created_at',)
     list_filter = ('is_published', 'category', 'created_at',)
     search_fields = ('title', 'content',)
@@ -83,7 +98,7 @@ class EventCategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'category', 'start_date', 'end_date', 'is_published',)
     list_filter = ('is_published', 'category', 'start_date',)
     search_fields = ('title', 'description',)
@@ -105,7 +120,7 @@ class GalleryCategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Gallery)
-class GalleryAdmin(admin.ModelAdmin):
+class GalleryAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'category', 'uploaded_by', 'created_at',)
     list_filter = ('category', 'created_at',)
     search_fields = ('title', 'description',)
@@ -142,7 +157,7 @@ class ProductCategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'stock', 'is_featured',)
     list_filter = ('is_featured', 'category',)
     search_fields = ('name', 'description',)
@@ -150,8 +165,8 @@ class ProductAdmin(admin.ModelAdmin):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at',)
-    list_filter = ('status', 'created_at',)
+    list_display = ('order_number', 'user', 'status', 'payment_status', 'total_amount', 'refund_required', 'created_at',)
+    list_filter = ('status', 'payment_status', 'refund_required', 'created_at',)
     search_fields = ('order_number', 'user__email',)
     date_hierarchy = 'created_at'
 
@@ -223,3 +238,11 @@ class PickupLocationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'completed_at')
+    list_filter = ('status', 'task', 'created_at')
+    search_fields = ('task', 'idempotency_key', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'completed_at', 'locked_at')
+    date_hierarchy = 'created_at'
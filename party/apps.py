@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PartyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'party'
+
+    def ready(self):
+        # Register signal receivers and background job handlers
+        from . import signals, tasks  # noqa: F401
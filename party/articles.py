@@ -0,0 +1,172 @@
+import math
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.utils.html import escape
+from django.utils.text import Truncator
+
+# Bump when the pipeline's output changes; backfill_article_derivatives
+# reprocesses every row stored under an older version
+ARTICLE_PIPELINE_VERSION = 1
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 280
+
+# Tags kept in the render-ready HTML and the attributes each may carry.
+# Any other tag is unwrapped (its text kept); DROPPED_TAGS lose their content too.
+ALLOWED_TAGS = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height', 'style'},
+    'iframe': {'src', 'width', 'height', 'allowfullscreen', 'frameborder'},
+    'table': {'style'}, 'thead': set(), 'tbody': set(), 'tr': set(),
+    'td': {'colspan', 'rowspan', 'style'}, 'th': {'colspan', 'rowspan', 'style'},
+    'p': {'style'}, 'div': {'style'}, 'span': {'style'},
+    'h1': {'style'}, 'h2': {'style'}, 'h3': {'style'}, 'h4': {'style'}, 'h5': {'style'}, 'h6': {'style'},
+    'ul': set(), 'ol': set(), 'li': {'style'}, 'blockquote': set(), 'pre': set(), 'code': set(),
+    'figure': set(), 'figcaption': set(), 'hr': set(), 'br': set(),
+    'strong': set(), 'b': set(), 'em': set(), 'i': set(), 'u': set(), 's': set(), 'strike': set(),
+    'sub': set(), 'sup': set(),
+}
+DROPPED_TAGS = {'script', 'style', 'noscript', 'template', 'object', 'embed', 'form', 'textarea', 'select', 'head', 'title'}
+VOID_TAGS = {'img', 'br', 'hr'}
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'hr', 'li', 'tr', 'blockquote', 'pre', 'figure', 'figcaption', 'table',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+}
+REQUIRED_ATTRIBUTES = {'img': 'src', 'iframe': 'src'}
+# Only video players Froala embeds may be framed
+EMBED_HOSTS = {'www.youtube.com', 'youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com'}
+UNSAFE_STYLE = re.compile(r'url\s*\(|expression\s*\(|javascript:', re.IGNORECASE)
+
+
+def safe_url(value, tag):
+    value = value.strip()
+    parts = urlsplit(value)
+    scheme = parts.scheme.lower()
+    if tag == 'iframe':
+        return value if scheme == 'https' and parts.hostname in EMBED_HOSTS else None
+    if scheme in ('http', 'https', '') or (tag == 'a' and scheme in ('mailto', 'tel')):
+        return value
+    return None
+
+
+class ArticleParser(HTMLParser):
+    """
+    One pass over editor HTML producing allowlisted HTML, the text runs and the images
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.images = []
+        self.open_tags = []
+        self.skipping = []  # dropped elements we are inside of
+
+    def clean_attributes(self, tag, attrs):
+        allowed = ALLOWED_TAGS[tag]
+        attributes = {}
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            value = value or ''
+            if name in ('href', 'src'):
+                value = safe_url(value, tag)
+                if value is None:
+                    continue
+            if name == 'style' and UNSAFE_STYLE.search(value):
+                continue
+            attributes[name] = value
+        required = REQUIRED_ATTRIBUTES.get(tag)
+        if required and required not in attributes:
+            return None
+        if tag == 'a' and attributes.get('target') == '_blank':
+            attributes['rel'] = 'noopener noreferrer'
+        return attributes
+
+    def handle_starttag(self, tag, attrs):
+        if self.skipping:
+            if tag == self.skipping[-1]:
+                self.skipping.append(tag)
+            return
+        if tag in DROPPED_TAGS:
+            self.skipping.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag not in ALLOWED_TAGS:
+            return
+        attributes = self.clean_attributes(tag, attrs)
+        if attributes is None:
+            if tag not in VOID_TAGS:
+                self.skipping.append(tag)
+            return
+        if tag == 'img':
+            self.images.append({'src': attributes['src'], 'alt': attributes.get('alt', '')})
+        # An unclosed <li> or <p> ends where its next sibling starts
+        if tag in ('li', 'p') and self.open_tags and self.open_tags[-1] == tag:
+            self.html.append(f'</{self.open_tags.pop()}>')
+        rendered = ''.join(f' {name}="{escape(value)}"' for name, value in attributes.items())
+        self.html.append(f'<{tag}{rendered}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.skipping:
+            if tag == self.skipping[-1]:
+                self.skipping.pop()
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append('\n')
+        if tag in self.open_tags:
+            while self.open_tags:
+                current = self.open_tags.pop()
+                self.html.append(f'</{current}>')
+                if current == tag:
+                    break
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        self.html.append(escape(data))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def parse_content(article):
+    parser = ArticleParser()
+    parser.feed(article['source'])
+    parser.close()
+    lines = (' '.join(line.split()) for line in ''.join(parser.text).splitlines())
+    article['html'] = ''.join(parser.html)
+    article['text'] = '\n'.join(line for line in lines if line)
+    article['images'] = parser.images
+
+
+def build_excerpt(article):
+    article['excerpt'] = Truncator(article['text'].replace('\n', ' ')).chars(EXCERPT_LENGTH)
+
+
+def count_words(article):
+    article['word_count'] = len(article['text'].split())
+    article['reading_time'] = math.ceil(article['word_count'] / WORDS_PER_MINUTE)
+
+
+# Each step reads and extends the article dict; later steps build on earlier ones
+ARTICLE_PIPELINE = (parse_content, build_excerpt, count_words)
+
+
+def derive_article(html):
+    """
+    Run rich-text `html` through the pipeline. Returns a dict with 'html'
+    (sanitized, render-ready), 'text', 'excerpt', 'word_count',
+    'reading_time' (minutes) and 'images' ([{'src', 'alt'}]).
+    """
+    article = {'source': html or ''}
+    for step in ARTICLE_PIPELINE:
+        step(article)
+    return article
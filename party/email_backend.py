@@ -1,71 +1,294 @@
 from django.core.mail.backends.base import BaseEmailBackend
 from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parseaddr
+from requests.adapters import HTTPAdapter
 import requests
-import json
 import base64
 import logging
+import random
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BREVO_SETTINGS = {
+    'API_URL': 'https://api.brevo.com/v3/smtp/email',
+    'SENDER_NAME': 'Devolution Empowerment Party',
+    'CONNECT_TIMEOUT': 5,
+    'READ_TIMEOUT': 30,
+    'MAX_CONCURRENCY': 4,    # requests in flight per send_messages() call
+    'MAX_RETRIES': 3,        # extra attempts on 429, 5xx and connection errors
+    'BACKOFF_BASE': 0.5,     # seconds, doubled per retry with full jitter
+    'BACKOFF_MAX': 10,
+    'MAX_VERSIONS': 500,     # messageVersions packed into a single API call
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class BrevoAPIError(Exception):
+    """
+    An API call that still failed after its retries; raised unless the backend fails silently
+    """
+
+
+def get_brevo_settings():
+    config = dict(DEFAULT_BREVO_SETTINGS)
+    config.update(getattr(settings, 'BREVO_EMAIL', {}))
+    return config
+
+
+class BrevoStats:
+    """
+    Process-wide counters for the Brevo API, shared by every backend instance
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.retries = 0
+        self.sent = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record_request(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def record_result(self, sent, failed):
+        with self.lock:
+            self.sent += sent
+            self.failed += failed
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'sent': self.sent,
+                'failed': self.failed,
+                'latency_avg': self.latency_total / self.requests if self.requests else 0.0,
+                'latency_max': self.latency_max,
+            }
+
+
+stats = BrevoStats()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Shared, connection-pooled session so every send reuses open TLS connections
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            config = get_brevo_settings()
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(10, config['MAX_CONCURRENCY'] * 2),
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'accept': 'application/json',
+                'content-type': 'application/json',
+            })
+            _session = session
+        return _session
+
+
 class BrevoEmailBackend(BaseEmailBackend):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.api_key = settings.BREVO_API_KEY
-        self.api_url = 'https://api.brevo.com/v3/smtp/email'
+        self.config = get_brevo_settings()
+        self.api_url = self.config['API_URL']
+        self.timeout = (self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT'])
 
-    def send_messages(self, email_messages):
-        if not email_messages:
-            return 0
+    def get_sender(self, message):
+        name, email = parseaddr(message.from_email or settings.DEFAULT_FROM_EMAIL)
+        return {
+            'email': email or settings.DEFAULT_FROM_EMAIL,
+            'name': name or self.config['SENDER_NAME'],
+        }
 
-        success_count = 0
+    def get_content(self, message):
+        """
+        Return (html, text) for a message, picking up html alternatives from EmailMultiAlternatives
+        """
+        if message.content_subtype == 'html':
+            return message.body, None
+        html = None
+        for alternative in getattr(message, 'alternatives', []):
+            content, mimetype = alternative[0], alternative[1]
+            if mimetype == 'text/html':
+                html = content
+                break
+        return html, message.body
+
+    def get_attachments(self, message):
+        attachments = []
+        for attachment in getattr(message, 'attachments', []):
+            if isinstance(attachment, tuple):
+                filename, content, mimetype = attachment
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+                attachments.append({
+                    'name': filename,
+                    'content': base64.b64encode(content).decode('utf-8'),
+                    'contentType': mimetype
+                })
+        return attachments
+
+    def get_recipients(self, message):
+        recipients = {'to': [{'email': recipient} for recipient in message.to]}
+        if message.cc:
+            recipients['cc'] = [{'email': recipient} for recipient in message.cc]
+        if message.bcc:
+            recipients['bcc'] = [{'email': recipient} for recipient in message.bcc]
+        return recipients
+
+    def build_payload(self, message):
+        html, text = self.get_content(message)
+        payload = {
+            'sender': self.get_sender(message),
+            'subject': message.subject,
+            'htmlContent': html,
+            'textContent': text,
+        }
+        payload.update(self.get_recipients(message))
+        if message.reply_to:
+            payload['replyTo'] = {'email': message.reply_to[0]}
+        attachments = self.get_attachments(message)
+        if attachments:
+            payload['attachment'] = attachments
+        return {key: value for key, value in payload.items() if value is not None}
+
+    def build_batches(self, email_messages):
+        """
+        Pack messages into API calls. Messages that share a sender, subject and reply-to
+        go out as one request using Brevo's messageVersions, with per-version content
+        only where it differs from the first message. Messages with attachments are
+        sent on their own.
+
+        Returns a list of (payload, message_count).
+        """
+        batches = []
+        groups = {}
         for message in email_messages:
-            try:
-                # Handle attachments if present
-                attachments = []
-                if hasattr(message, 'attachments'):
-                    for attachment in message.attachments:
-                        if isinstance(attachment, tuple):
-                            filename, content, mimetype = attachment
-                            attachments.append({
-                                'name': filename,
-                                'content': base64.b64encode(content).decode('utf-8'),
-                                'contentType': mimetype
-                            })
-
-                payload = {
-                    'sender': {
-                        'email': settings.DEFAULT_FROM_EMAIL,
-                        'name': 'Devolution Empowerment Party'
-                    },
-                    'to': [{'email': recipient} for recipient in message.to],
-                    'subject': message.subject,
-                    'htmlContent': message.body if message.content_subtype == 'html' else None,
-                    'textContent': message.body if message.content_subtype == 'plain' else None,
-                    'attachment': attachments if attachments else None
-                }
+            payload = self.build_payload(message)
+            if 'attachment' in payload:
+                batches.append((payload, 1))
+                continue
+            key = (
+                payload['sender']['email'], payload['sender']['name'],
+                payload['subject'], tuple(message.reply_to),
+            )
+            groups.setdefault(key, []).append(payload)
 
-                headers = {
-                    'accept': 'application/json',
-                    'content-type': 'application/json',
-                    'api-key': self.api_key
+        max_versions = self.config['MAX_VERSIONS']
+        for payloads in groups.values():
+            for start in range(0, len(payloads), max_versions):
+                chunk = payloads[start:start + max_versions]
+                if len(chunk) == 1:
+                    batches.append((chunk[0], 1))
+                    continue
+                base = chunk[0]
+                batch = {
+                    key: value for key, value in base.items()
+                    if key not in ('to', 'cc', 'bcc')
                 }
+                versions = []
+                for payload in chunk:
+                    version = {
+                        key: payload[key] for key in ('to', 'cc', 'bcc') if key in payload
+                    }
+                    for key in ('htmlContent', 'textContent'):
+                        if payload.get(key) != base.get(key):
+                            version[key] = payload.get(key)
+                    versions.append(version)
+                batch['messageVersions'] = versions
+                batches.append((batch, len(chunk)))
+        return batches
 
-                response = requests.post(
-                    self.api_url,
-                    headers=headers,
-                    data=json.dumps(payload)
-                )
-                
-                if response.status_code == 201:
-                    success_count += 1
-                    logger.info(f"Email sent successfully to {message.to}")
-                else:
-                    logger.error(f"Failed to send email: {response.text}")
-                    print(f"Failed to send email: {response.text}")
-                    
-            except Exception as e:
-                logger.error(f"Error sending email: {str(e)}", exc_info=True)
-                print(f"Error sending email: {str(e)}")
-                continue
+    def get_backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.config['BACKOFF_MAX'])
+        delay = min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def post(self, payload, message_count):
+        """
+        Send one API call, retrying throttled and transient failures. Returns messages sent,
+        or raises BrevoAPIError once the retries are spent unless fail_silently is set.
+        """
+        session = get_session()
+        headers = {'api-key': self.api_key}
+        max_retries = self.config['MAX_RETRIES']
+
+        for attempt in range(max_retries + 1):
+            response = None
+            started = time.monotonic()
+            try:
+                response = session.post(self.api_url, headers=headers, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                stats.record_request(time.monotonic() - started)
+                error = str(e)
+            else:
+                stats.record_request(time.monotonic() - started)
+                if response.status_code in (200, 201, 202):
+                    stats.record_result(message_count, 0)
+                    logger.info(f"Email sent successfully to {message_count} recipient(s)")
+                    return message_count
+                error = f"HTTP {response.status_code}: {response.text}"
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+
+            if attempt < max_retries:
+                stats.record_retry()
+                delay = self.get_backoff(attempt, response)
+                logger.warning(f"Brevo request failed ({error}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+        stats.record_result(0, message_count)
+        logger.error(f"Failed to send email: {error}")
+        if not self.fail_silently:
+            raise BrevoAPIError(f"Failed to send {message_count} email(s): {error}")
+        return 0
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+
+        try:
+            batches = self.build_batches(email_messages)
+        except Exception as e:
+            logger.error(f"Error preparing emails: {str(e)}", exc_info=True)
+            if not self.fail_silently:
+                raise
+            return 0
+
+        if len(batches) == 1:
+            return self.post(*batches[0])
 
-        return success_count 
\ No newline at end of file
+        # Every batch is attempted; the first failure is re-raised once they all finish
+        workers = min(self.config['MAX_CONCURRENCY'], len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.post, *batch) for batch in batches]
+        return sum(future.result() for future in futures)
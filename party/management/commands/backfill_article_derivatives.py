@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from party.articles import ARTICLE_PIPELINE_VERSION
+from party.models import Event, News
+from party.models.articles import DERIVED_FIELDS
+from party.services.response_cache import invalidate_model_responses
+from party.services.search import SEARCH_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Compute sanitized HTML, plain text, excerpt, reading time and images for news and events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Articles processed per transaction')
+        parser.add_argument('--force', action='store_true', help='Reprocess rows already on the current pipeline version')
+
+    def handle(self, *args, **options):
+        for model in (News, Event):
+            queryset = model.objects.all()
+            if not options['force']:
+                queryset = queryset.filter(derivatives_version__lt=ARTICLE_PIPELINE_VERSION)
+            processed = self.backfill(model, queryset, options['batch_size'])
+            if processed:
+                invalidate_model_responses(model)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {processed} processed")
+        self.stdout.write(self.style.SUCCESS('Article derivatives up to date'))
+
+    def backfill(self, model, queryset, batch_size):
+        # Keyset batches, so rows updated by an earlier batch are never re-read
+        last_pk = 0
+        processed = 0
+        while True:
+            articles = list(queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:batch_size])
+            if not articles:
+                return processed
+            for article in articles:
+                article.refresh_derivatives()
+            pks = [article.pk for article in articles]
+            with transaction.atomic():
+                model.objects.bulk_update(articles, DERIVED_FIELDS)
+                # bulk_update skips post_save, so refresh the search documents here
+                model.objects.filter(pk__in=pks).update(search_vector=SEARCH_MODELS[model].vector())
+            processed += len(articles)
+            last_pk = pks[-1]
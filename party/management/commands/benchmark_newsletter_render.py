@@ -0,0 +1,61 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+from party.services.newsletter_templates import CompiledNewsletter, get_recipient_context
+
+class Command(BaseCommand):
+    help = 'Compare per-recipient template rendering with the render-once newsletter pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=50000, help='Number of simulated subscribers')
+        parser.add_argument('--legacy-sample', type=int, default=2000,
+                            help='Recipients rendered on the legacy path; the result is extrapolated')
+        parser.add_argument('--template', type=str, default='newsletter/news_notification.html')
+
+    def get_context(self):
+        return {
+            'title': 'Benchmark article',
+            'content': '<p>' + 'Devolution Empowerment Party news. ' * 200 + '</p>',
+            'date': datetime.now(),
+            'url': '/news/1',
+            'year': datetime.now().year,
+        }
+
+    def handle(self, *args, **options):
+        recipients = [f"subscriber{i}@example.com" for i in range(options['recipients'])]
+        template = options['template']
+        context = self.get_context()
+
+        # Legacy path: render_to_string and strip_tags for every subscriber
+        sample = recipients[:options['legacy_sample']]
+        started = time.perf_counter()
+        for email in sample:
+            html = render_to_string(template, dict(context, **get_recipient_context(email)))
+            strip_tags(html)
+        legacy_per_email = (time.perf_counter() - started) / max(1, len(sample))
+        legacy_total = legacy_per_email * len(recipients)
+
+        # Pipeline: one render for the campaign, a string join per subscriber
+        started = time.perf_counter()
+        newsletter = CompiledNewsletter.from_template(template, context)
+        compile_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for email in recipients:
+            newsletter.render(get_recipient_context(email))
+        pipeline_total = compile_time + (time.perf_counter() - started)
+        pipeline_per_email = pipeline_total / max(1, len(recipients))
+
+        self.stdout.write(f"Recipients:      {len(recipients)}")
+        self.stdout.write(
+            f"Legacy:          {legacy_per_email * 1e6:10.1f} us/email, "
+            f"{legacy_total:8.2f} s total (extrapolated from {len(sample)})"
+        )
+        self.stdout.write(
+            f"Render-once:     {pipeline_per_email * 1e6:10.1f} us/email, "
+            f"{pipeline_total:8.2f} s total (compile {compile_time * 1e3:.2f} ms)"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup:         {legacy_total / pipeline_total if pipeline_total else float('inf'):.1f}x"
+        ))
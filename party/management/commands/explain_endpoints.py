@@ -0,0 +1,110 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from party.models import User, NewsCategory, EventCategory, GalleryCategory, ProductCategory, NewsletterSubscription
+from party.views.views import (
+    NewsViewSet, EventViewSet, GalleryViewSet, NationalLeadershipViewSet, DonationViewSet,
+    ProductViewSet, MembershipViewSet
+)
+from party.views.shop import OrderViewSet
+
+
+def first_slug(model):
+    return model.objects.values_list('slug', flat=True).first() or 'missing'
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the query behind each list endpoint and flag sequential scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Use EXPLAIN ANALYZE (executes the queries)')
+        parser.add_argument('--no-seqscan', action='store_true',
+                            help='PostgreSQL only: disable seq scans to check an index path exists on small tables')
+        parser.add_argument('--user-email', type=str, help='User whose orders/memberships are explained')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+
+    def get_endpoints(self):
+        """
+        (label, viewset, query params, needs user)
+        """
+        return [
+            ('GET /api/news/', NewsViewSet, {}, False),
+            ('GET /api/news/?category=', NewsViewSet, {'category': first_slug(NewsCategory)}, False),
+            ('GET /api/events/', EventViewSet, {}, False),
+            ('GET /api/events/?category=', EventViewSet, {'category': first_slug(EventCategory)}, False),
+            ('GET /api/gallery/', GalleryViewSet, {}, False),
+            ('GET /api/gallery/?category=', GalleryViewSet, {'category': first_slug(GalleryCategory)}, False),
+            ('GET /api/leadership/', NationalLeadershipViewSet, {}, False),
+            ('GET /api/donations/', DonationViewSet, {}, False),
+            ('GET /api/products/', ProductViewSet, {}, False),
+            ('GET /api/products/?category=', ProductViewSet, {'category': first_slug(ProductCategory)}, False),
+            ('GET /api/orders/', OrderViewSet, {}, True),
+            ('GET /api/memberships/', MembershipViewSet, {}, True),
+        ]
+
+    def get_queryset(self, viewset, params, user):
+        factory = APIRequestFactory()
+        request = Request(factory.get('/', params))
+        request.user = user
+        view = viewset(action='list', request=request, args=(), kwargs={}, format_kwarg=None)
+        queryset = view.filter_queryset(view.get_queryset())
+        page_size = view.paginator.get_page_size(request) if view.paginator else None
+        return queryset[:page_size] if page_size else queryset
+
+    def is_sequential(self, line):
+        if connection.vendor == 'postgresql':
+            return 'Seq Scan' in line
+        if connection.vendor == 'sqlite':
+            return 'SCAN ' in line and 'USING' not in line
+        return 'ALL' in line.split()
+
+    def explain(self, queryset, options):
+        with transaction.atomic():
+            if options['no_seqscan'] and connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            if options['analyze']:
+                return queryset.explain(analyze=True)
+            return queryset.explain()
+
+    def handle(self, *args, **options):
+        if options['user_email']:
+            user = User.objects.get(email=options['user_email'])
+        else:
+            user = User.objects.order_by('id').first()
+
+        queries = []
+        for label, viewset, params, needs_user in self.get_endpoints():
+            if needs_user and user is None:
+                self.stdout.write(self.style.WARNING(f'{label}: skipped, no users in the database'))
+                continue
+            queryset = self.get_queryset(viewset, params, user if needs_user else AnonymousUser())
+            queries.append((label, queryset))
+        queries.append((
+            'newsletter fan-out',
+            NewsletterSubscription.objects.filter(status='active', is_verified=True, id__gt=0).order_by('id')[:1000],
+        ))
+
+        flagged = 0
+        for label, queryset in queries:
+            plan = self.explain(queryset, options)
+            sequential = [line.strip() for line in plan.splitlines() if self.is_sequential(line)]
+            if sequential:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'{label}: sequential scan'))
+                for line in sequential:
+                    self.stdout.write(f'    {line}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: ok'))
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+
+        summary = f'{flagged} of {len(queries)} queries use a sequential scan'
+        if flagged:
+            self.stdout.write(self.style.WARNING(summary))
+            if connection.vendor == 'postgresql' and not options['no_seqscan']:
+                self.stdout.write('Small tables are often scanned sequentially by choice; rerun with --no-seqscan to check for a usable index.')
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
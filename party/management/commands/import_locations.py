@@ -1,73 +1,165 @@
+import os
 import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from party.models.locations import County, Constituency, Ward
+from party.services.locations import invalidate_location_snapshot, get_location_snapshot
 from django.db import transaction
 
+LEVELS = ('County', 'Constituency', 'Ward')
+READERS = {
+    'excel': pd.read_excel,
+    'csv': pd.read_csv,
+    'parquet': pd.read_parquet,
+}
+EXTENSIONS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+}
+BATCH_SIZE = 1000
+
+
 class Command(BaseCommand):
-    help = 'Import locations data from Excel file'
+    help = 'Import locations data from an Excel, CSV or Parquet file'
 
     def add_arguments(self, parser):
-        parser.add_argument('excel_file', type=str, help='Path to the Excel file')
+        parser.add_argument('file', type=str, help='Path to the Excel, CSV or Parquet file')
+        parser.add_argument('--format', choices=sorted(READERS), help='Input format (default: from the file extension)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        df = self.read_locations(options['file'], options['format'])
+        self.stdout.write(f"Read {len(df)} rows from {options['file']}")
+
+        counties = self.diff(
+            df.drop_duplicates('County')[['County', 'County Code']],
+            County.objects.values_list('name', 'code'),
+            keys=['County'],
+        )
+        constituencies = self.diff(
+            df.drop_duplicates(['County', 'Constituency'])[['County', 'Constituency', 'Constituency Code']],
+            Constituency.objects.values_list('county__name', 'name', 'code'),
+            keys=['County', 'Constituency'],
+        )
+        wards = self.diff(
+            df.drop_duplicates(['County', 'Constituency', 'Ward'])[['County', 'Constituency', 'Ward', 'Ward Code']],
+            Ward.objects.values_list('constituency__county__name', 'constituency__name', 'name', 'code'),
+            keys=['County', 'Constituency', 'Ward'],
+        )
+
+        for level, frame in zip(LEVELS, (counties, constituencies, wards)):
+            self.report(level, frame, options['verbosity'])
 
-    def handle(self, *args, **kwargs):
-        excel_file = kwargs['excel_file']
-        
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes written'))
+            return
+
+        with transaction.atomic():
+            self.upsert_counties(counties)
+            self.upsert_constituencies(constituencies)
+            self.upsert_wards(wards)
+
+        # bulk_create skips post_save, so refresh the hierarchy snapshot here
+        invalidate_location_snapshot()
+        snapshot = get_location_snapshot()
+        self.stdout.write(f"Location hierarchy snapshot: {snapshot.version}")
+        self.stdout.write(self.style.SUCCESS('Successfully imported locations data'))
+
+    def read_locations(self, path, file_format):
+        file_format = file_format or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format")
         try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Clean the data
-            df['County'] = df['County'].str.strip()
-            df['Constituency'] = df['Constituency'].str.strip()
-            df['Ward'] = df['Ward'].str.strip()
-
-            # Get unique counties with their codes
-            unique_counties = df[['County']].drop_duplicates()
-            
-            with transaction.atomic():
-                # Process counties
-                for _, county_row in unique_counties.iterrows():
-                    county_name = county_row['County']
-                    county, created = County.objects.get_or_create(
-                        name=county_name
-                    )
-                    if created:
-                        self.stdout.write(f"Created county: {county_name}")
-
-                # Get unique constituencies per county
-                for county in County.objects.all():
-                    county_constituencies = df[
-                        (df['County'] == county.name)
-                    ][['Constituency']].drop_duplicates()
-
-                    # Process constituencies for this county
-                    for _, const_row in county_constituencies.iterrows():
-                        constituency_name = const_row['Constituency']
-                        constituency, created = Constituency.objects.get_or_create(
-                            name=constituency_name,
-                            county=county
-                        )
-                        if created:
-                            self.stdout.write(f"Created constituency: {constituency_name} in {county.name}")
-
-                        # Get wards for this constituency
-                        constituency_wards = df[
-                            (df['County'] == county.name) & 
-                            (df['Constituency'] == constituency_name)
-                        ][['Ward']].drop_duplicates()
-
-                        # Process wards for this constituency
-                        for _, ward_row in constituency_wards.iterrows():
-                            ward_name = ward_row['Ward']
-                            ward, created = Ward.objects.get_or_create(
-                                name=ward_name,
-                                constituency=constituency
-                            )
-                            if created:
-                                self.stdout.write(f"Created ward: {ward_name} in {constituency_name}")
-
-            self.stdout.write(self.style.SUCCESS('Successfully imported locations data'))
-            
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Error importing data: {str(e)}'))
-            raise e 
\ No newline at end of file
+            # Keep codes as text so Excel/CSV don't turn '001' into 1.0
+            df = READERS[file_format](path, **({} if file_format == 'parquet' else {'dtype': str}))
+        except (OSError, ValueError, ImportError) as e:
+            raise CommandError(f"Error reading {path}: {e}")
+
+        df.columns = df.columns.str.strip()
+        missing = [level for level in LEVELS if level not in df.columns]
+        if missing:
+            raise CommandError(f"Missing column(s): {', '.join(missing)}")
+
+        for level in LEVELS:
+            df[level] = df[level].astype('string').str.strip()
+            # Codes are optional; absent or blank codes are stored as NULL
+            code = f'{level} Code'
+            if code in df.columns:
+                df[code] = df[code].astype('string').str.strip().replace('', pd.NA)
+            else:
+                df[code] = pd.NA
+        df = df.dropna(subset=list(LEVELS))
+        return df[df[list(LEVELS)].ne('').all(axis=1)]
+
+    def diff(self, incoming, existing, keys):
+        """
+        Compare the deduplicated input rows for one level against what is stored,
+        adding a `status` column: created, updated (code changed) or unchanged
+        """
+        code = f'{keys[-1]} Code'
+        stored = pd.DataFrame(list(existing), columns=keys + ['stored_code'], dtype='string')
+        frame = incoming.merge(stored, on=keys, how='left', indicator=True)
+        is_new = frame['_merge'] == 'left_only'
+        code_changed = frame[code].notna() & frame[code].ne(frame['stored_code']).fillna(True)
+        frame['status'] = 'unchanged'
+        frame.loc[~is_new & code_changed, 'status'] = 'updated'
+        frame.loc[is_new, 'status'] = 'created'
+        return frame.drop(columns=['_merge', 'stored_code'])
+
+    def report(self, level, frame, verbosity):
+        counts = frame['status'].value_counts()
+        self.stdout.write(
+            f"{level}: {counts.get('created', 0)} created, {counts.get('updated', 0)} updated, "
+            f"{counts.get('unchanged', 0)} unchanged"
+        )
+        if verbosity > 1:
+            for row in frame[frame['status'] != 'unchanged'].itertuples(index=False):
+                depth = LEVELS.index(level) + 1
+                path = ' › '.join(getattr(row, part) for part in LEVELS[:depth])
+                self.stdout.write(f"  {row.status}: {path}")
+
+    def upsert_counties(self, frame):
+        changed = frame[frame['status'] != 'unchanged']
+        self.bulk_upsert(County, [
+            County(name=name, code=_or_none(code))
+            for name, code in zip(changed['County'], changed['County Code'])
+        ], unique_fields=['name'])
+
+    def upsert_constituencies(self, frame):
+        changed = frame[frame['status'] != 'unchanged']
+        county_ids = dict(County.objects.filter(name__in=set(changed['County'])).values_list('name', 'id'))
+        self.bulk_upsert(Constituency, [
+            Constituency(name=name, code=_or_none(code), county_id=county_ids[county])
+            for county, name, code in zip(changed['County'], changed['Constituency'], changed['Constituency Code'])
+        ], unique_fields=['name', 'county'])
+
+    def upsert_wards(self, frame):
+        changed = frame[frame['status'] != 'unchanged']
+        constituency_ids = {
+            (county, name): pk
+            for county, name, pk in Constituency.objects.filter(
+                name__in=set(changed['Constituency'])
+            ).values_list('county__name', 'name', 'id')
+        }
+        self.bulk_upsert(Ward, [
+            Ward(name=name, code=_or_none(code), constituency_id=constituency_ids[(county, constituency)])
+            for county, constituency, name, code in zip(
+                changed['County'], changed['Constituency'], changed['Ward'], changed['Ward Code']
+            )
+        ], unique_fields=['name', 'constituency'])
+
+    def bulk_upsert(self, model, objs, unique_fields):
+        if objs:
+            model.objects.bulk_create(
+                objs,
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['code'],
+            )
+
+
+def _or_none(value):
+    return None if pd.isna(value) else value
@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from rest_framework.exceptions import ValidationError
+from party.models import Product, ProductCategory
+from party.models.shop import StockReservation
+from party.services.stock import reserve_stock, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Hammer stock reservation with concurrent checkouts and check nothing oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=100, help='Units on the test product')
+        parser.add_argument('--buyers', type=int, default=500, help='Checkout attempts')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent checkout threads')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per checkout')
+        parser.add_argument('--keep', action='store_true', help='Keep the test product afterwards')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Concurrency results are only meaningful on PostgreSQL')
+
+        tag = uuid.uuid4().hex[:8]
+        category, _ = ProductCategory.objects.get_or_create(slug='loadtest', defaults={'name': 'Load test'})
+        product = Product.objects.create(
+            name=f'Load test {tag}', slug=f'loadtest-{tag}', description='Stock reservation load test',
+            price=1, category=category, stock=options['stock'],
+        )
+        quantities = {product.pk: options['quantity']}
+        latencies = []
+        outcomes = {'reserved': 0, 'sold_out': 0, 'error': 0}
+        lock = threading.Lock()
+
+        def checkout(_):
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    reserve_stock(quantities)
+                outcome = 'reserved'
+            except ValidationError:
+                outcome = 'sold_out'
+            except Exception as e:
+                self.stderr.write(f'Checkout failed: {e}')
+                outcome = 'error'
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                outcomes[outcome] += 1
+
+        self.stdout.write(
+            f"{options['buyers']} checkouts of {options['quantity']} against {options['stock']} units, "
+            f"{options['concurrency']} at a time"
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(checkout, range(options['buyers'])))
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        held = StockReservation.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        expected = min(options['buyers'], options['stock'] // options['quantity'])
+        oversold = max(0, held - options['stock'])
+
+        self.stdout.write(f"Reserved {outcomes['reserved']}, sold out {outcomes['sold_out']}, errors {outcomes['error']}")
+        self.stdout.write(f"Throughput {options['buyers'] / elapsed:.0f} checkouts/s over {elapsed:.2f}s")
+        self.stdout.write(
+            f"Latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:.1f} ms"
+        )
+        self.stdout.write(f"Final stock {product.stock}, units held {held}, oversold {oversold}")
+
+        # Expire everything and check the sweeper returns every unit
+        StockReservation.objects.filter(product=product, status='held').update(expires_at=product.created_at)
+        while release_expired_reservations():
+            pass
+        product.refresh_from_db()
+        restored = product.stock == options['stock']
+        self.stdout.write(f"After sweeping: stock {product.stock} ({'restored' if restored else 'NOT restored'})")
+
+        if not options['keep']:
+            product.delete()
+
+        if oversold or product.stock < 0 or outcomes['reserved'] != expected or not restored:
+            raise CommandError('Stock reservation load test failed')
+        self.stdout.write(self.style.SUCCESS('No oversells'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from party.services.search import SEARCH_TYPES, rebuild_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored full-text search documents, e.g. after changing field weights'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(SEARCH_TYPES), action='append', help='Only rebuild these types')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows updated per statement')
+
+    def handle(self, *args, **options):
+        for name in options['type'] or SEARCH_TYPES:
+            updated = rebuild_search_vectors(SEARCH_TYPES[name].model, batch_size=options['batch_size'])
+            self.stdout.write(f"{name}: {updated} rows")
+        self.stdout.write(self.style.SUCCESS('Search documents rebuilt'))
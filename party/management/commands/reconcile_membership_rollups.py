@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from party.services.membership_rollups import reconcile_membership_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the regional membership rollups from Membership and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report rows that have drifted')
+
+    def handle(self, *args, **options):
+        drift = reconcile_membership_rollups(dry_run=options['dry_run'])
+        self.stdout.write(f"Drifted rows: {drift['totals']} totals, {drift['daily']} daily")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes written'))
+        elif any(drift.values()):
+            self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Rollups already consistent'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from party.media import media_url
+from party.models import NationalLeadership
+from party.services.response_cache import invalidate_model_responses
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored NationalLeadership.image_url from each image, e.g. after changing CLOUDINARY_STORAGE'
+
+    def handle(self, *args, **options):
+        leaders = []
+        for leader in NationalLeadership.objects.only('pk', 'image', 'image_url'):
+            image_url = media_url(leader.image.name) if leader.image else ''
+            if image_url != leader.image_url:
+                leader.image_url = image_url
+                leaders.append(leader)
+        # bulk_update skips post_save, so retire the cached leadership responses here
+        NationalLeadership.objects.bulk_update(leaders, ['image_url'], batch_size=500)
+        if leaders:
+            invalidate_model_responses(NationalLeadership)
+        self.stdout.write(self.style.SUCCESS(f"{len(leaders)} leadership image URLs updated"))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from party.services.stock import release_expired_reservations
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired, unpaid order reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Sweep until nothing is expired, then exit')
+        parser.add_argument('--sleep', type=float, default=30.0, help='Seconds between sweeps')
+        parser.add_argument('--batch-size', type=int, default=None, help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                released = release_expired_reservations(batch_size=options['batch_size'])
+                total += released
+                if released:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Reservation sweeper stopping')
+
+        self.stdout.write(self.style.SUCCESS(f'Released {total} reservations'))
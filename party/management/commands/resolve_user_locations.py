@@ -0,0 +1,76 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from party.models import User
+from party.services.location_matching import DEFAULT_MIN_CONFIDENCE, get_location_matcher
+
+RESOLVED_FIELDS = ['resolved_county', 'resolved_constituency', 'resolved_ward', 'location_confidence']
+CONFIDENCE_BANDS = ((1.0, 'exact'), (0.95, '>= 0.95'), (0.9, '>= 0.90'), (0.0, 'lower'))
+
+
+class Command(BaseCommand):
+    help = 'Match users\' free-text county/constituency/ward to location records and store the foreign keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-resolve users that already have a match')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users loaded and updated per batch')
+        parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                            help='Similarity below which a level is left unresolved')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without writing')
+        parser.add_argument('--show-unmatched', type=int, default=10, help='List the most common unmatched strings')
+
+    def handle(self, *args, **options):
+        matcher = get_location_matcher(options['min_confidence'])
+        users = User.objects.filter(Q(county__gt='') | Q(constituency__gt='') | Q(ward__gt=''))
+        if not options['all']:
+            users = users.filter(resolved_county__isnull=True)
+        total = users.count()
+        self.stdout.write(f"Resolving locations for {total} users")
+
+        levels = Counter()
+        bands = Counter()
+        unmatched = Counter()
+        processed = 0
+        last_pk = 0
+        batch_size = options['batch_size']
+        fields = ('pk', 'county', 'constituency', 'ward') + tuple(RESOLVED_FIELDS)
+
+        while True:
+            # Keyset pagination, so rows updated in earlier batches never shift the window
+            batch = list(users.filter(pk__gt=last_pk).order_by('pk').only(*fields)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for user in batch:
+                match = matcher.match(user.county, user.constituency, user.ward)
+                user.resolved_county_id = match.county_id
+                user.resolved_constituency_id = match.constituency_id
+                user.resolved_ward_id = match.ward_id
+                user.location_confidence = match.confidence
+                levels[match.level or 'unmatched'] += 1
+                if match.level is None:
+                    unmatched[' › '.join(part or '-' for part in (user.county, user.constituency, user.ward))] += 1
+                else:
+                    bands[next(label for floor, label in CONFIDENCE_BANDS if match.confidence >= floor)] += 1
+
+            if not options['dry_run']:
+                User.objects.bulk_update(batch, RESOLVED_FIELDS)
+            processed += len(batch)
+            self.stdout.write(f"  {processed}/{total} users")
+
+        self.stdout.write('Resolved to: ' + ', '.join(
+            f"{level} {levels[level]}" for level in ('ward', 'constituency', 'county', 'unmatched')
+        ))
+        self.stdout.write('Confidence: ' + ', '.join(
+            f"{label} {bands[label]}" for _, label in CONFIDENCE_BANDS
+        ))
+        if unmatched and options['show_unmatched']:
+            self.stdout.write('Most common unmatched locations:')
+            for text, count in unmatched.most_common(options['show_unmatched']):
+                self.stdout.write(f"  {count:>6}  {text}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Updated {processed} users'))
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from party.services.jobs import run_pending_jobs
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (newsletters and other deferred work)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after processing this many jobs')
+
+    def handle(self, *args, **options):
+        max_jobs = options['max_jobs']
+        processed = 0
+        self.stdout.write('Job worker started')
+
+        try:
+            while max_jobs is None or processed < max_jobs:
+                close_old_connections()
+                remaining = None if max_jobs is None else max_jobs - processed
+                count = run_pending_jobs(max_jobs=remaining)
+                processed += count
+                if options['once']:
+                    break
+                if count == 0:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Job worker stopping')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+import cloudinary.utils
+
+# Named transformations the API exposes as pre-sized variants
+MEDIA_PRESETS = {
+    'thumbnail': {'width': 150, 'height': 150, 'crop': 'fill', 'gravity': 'auto'},
+    'card': {'width': 480, 'height': 320, 'crop': 'fill', 'gravity': 'auto'},
+    'hero': {'width': 1600, 'height': 900, 'crop': 'fill', 'gravity': 'auto'},
+}
+SRCSET_WIDTHS = (320, 640, 960, 1280, 1920)
+
+VERSIONED_PATH = re.compile(r'^v(\d+)/(.+)$')
+
+
+def _storage_prefix():
+    # MediaCloudinaryStorage stores unversioned names under this folder
+    prefix = settings.CLOUDINARY_STORAGE.get('PREFIX', settings.MEDIA_URL)
+    return prefix.strip('/')
+
+
+@lru_cache(maxsize=8192)
+def media_url(path, preset=None, width=None):
+    """
+    Build the Cloudinary delivery URL for a stored media path, in process.
+
+    `path` is a field value as stored: a full URL (returned unchanged), a
+    versioned public id ('v123/folder/name') or a storage-relative name.
+    `preset` picks a MEDIA_PRESETS transformation; `width` a responsive width.
+    """
+    if not path:
+        return None
+    path = str(path)
+    if path.startswith('http'):
+        return path
+    options = {
+        'secure': True,
+        'cloud_name': settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
+    }
+    match = VERSIONED_PATH.match(path)
+    if match:
+        options['version'] = match.group(1)
+        public_id = match.group(2)
+    else:
+        prefix = _storage_prefix()
+        public_id = path if not prefix or path.startswith(f'{prefix}/') else f'{prefix}/{path}'
+    if preset:
+        options.update(MEDIA_PRESETS[preset])
+    if width:
+        options.update(width=width, crop='scale')
+    if preset or width:
+        options.update(fetch_format='auto', quality='auto')
+    url, _ = cloudinary.utils.cloudinary_url(public_id, **options)
+    return url
+
+
+def media_srcset(path):
+    """Return a `srcset` attribute value covering SRCSET_WIDTHS."""
+    if not path:
+        return None
+    return ', '.join(f'{media_url(str(path), width=width)} {width}w' for width in SRCSET_WIDTHS)
+
+
+def media_variants(path):
+    """Return the original URL plus every preset and the srcset for a media path."""
+    if not path:
+        return None
+    path = str(path)
+    variants = {'original': media_url(path)}
+    for preset in MEDIA_PRESETS:
+        variants[preset] = media_url(path, preset)
+    variants['srcset'] = media_srcset(path)
+    return variants
+
+
+@receiver(setting_changed)
+def clear_media_url_cache(setting, **kwargs):
+    if setting in ('CLOUDINARY_STORAGE', 'MEDIA_URL'):
+        media_url.cache_clear()
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    # Cursor pagination on the news feed needs a non-null published_at
+    News = apps.get_model('party', 'News')
+    News.objects.filter(is_published=True, published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0015_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-created_at'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['-created_at'], name='gallery_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['is_published', '-published_at', '-created_at'], name='news_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ),
+    ]
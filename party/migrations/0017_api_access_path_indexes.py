@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-start_date'], name='event_published_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category', '-start_date'], name='event_published_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['category', '-created_at'], name='gallery_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['user', '-created_at'], name='membership_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['category', '-published_at', '-created_at'], name='news_published_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newslettersubscription',
+            index=models.Index(condition=models.Q(('is_verified', True), ('status', 'active')), fields=['id'], name='newsletter_sendable_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newslettersubscription',
+            index=models.Index(fields=['status', 'is_verified'], name='newsletter_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at'], name='product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-created_at'], name='product_category_created_idx'),
+        ),
+    ]
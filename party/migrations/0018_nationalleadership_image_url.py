@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_image_urls(apps, schema_editor):
+    # Historical models have no save() hooks, so build the URLs here.
+    NationalLeadership = apps.get_model('party', 'NationalLeadership')
+    base = f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/"
+    leaders = []
+    for leader in NationalLeadership.objects.exclude(image='').exclude(image__isnull=True):
+        path = str(leader.image)
+        if path.startswith('http'):
+            leader.image_url = path
+        else:
+            if not path.startswith('v') and not path.startswith('leadership/'):
+                path = f"leadership/{path.split('/')[-1]}"
+            leader.image_url = f"{base}{path}"
+        leaders.append(leader)
+    NationalLeadership.objects.bulk_update(leaders, ['image_url'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0017_api_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nationalleadership',
+            name='image_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
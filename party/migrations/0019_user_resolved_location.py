@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0018_nationalleadership_image_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='resolved_county',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='party.county'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='resolved_constituency',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='party.constituency'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='resolved_ward',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='party.ward'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='location_confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
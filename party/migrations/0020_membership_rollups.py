@@ -0,0 +1,43 @@
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0019_user_resolved_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('national', 'National'), ('county', 'County'), ('constituency', 'Constituency'), ('ward', 'Ward')], max_length=20)),
+                ('region_id', models.PositiveIntegerField(default=0)),
+                ('membership_type', models.CharField(max_length=20)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('member_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('level', 'region_id', 'membership_type', 'payment_status'), name='membership_rollup_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MembershipDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('national', 'National'), ('county', 'County'), ('constituency', 'Constituency'), ('ward', 'Ward')], max_length=20)),
+                ('region_id', models.PositiveIntegerField(default=0)),
+                ('membership_type', models.CharField(max_length=20)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('member_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('day', models.DateField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('level', 'region_id', 'day', 'membership_type', 'payment_status'), name='membership_daily_rollup_key')],
+            },
+        ),
+    ]
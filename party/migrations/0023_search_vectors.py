@@ -0,0 +1,78 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, Func, TextField
+
+# Frozen copy of party.services.search.SEARCH_TYPES at the time of this migration
+DOCUMENTS = {
+    'News': (('title', 'A'), ('description', 'B'), ('content', 'C')),
+    'Event': (('title', 'A'), ('description', 'B'), ('location', 'B'), ('content', 'C')),
+    'Product': (('name', 'A'), ('description', 'B')),
+    'Gallery': (('title', 'A'), ('description', 'B')),
+}
+HTML_FIELDS = ('content',)
+
+
+class StripTags(Func):
+    function = 'regexp_replace'
+    template = "%(function)s(%(expressions)s, '<[^>]*>', ' ', 'g')"
+    output_field = TextField()
+
+
+def backfill_search_vectors(apps, schema_editor):
+    for model_name, weights in DOCUMENTS.items():
+        model = apps.get_model('party', model_name)
+        document = None
+        for field, weight in weights:
+            source = StripTags(F(field)) if field in HTML_FIELDS else F(field)
+            vector = SearchVector(source, weight=weight, config='english')
+            document = vector if document is None else document + vector
+        model.objects.update(search_vector=document)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0022_order_payment_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='news',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='news_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='gallery_search_idx'),
+        ),
+    ]
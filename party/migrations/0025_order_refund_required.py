@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0024_article_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='refund_required',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from party.media import media_url
+
+
+def recompute_image_urls(apps, schema_editor):
+    # 0018 stored URLs built by hand; rebuild them the way NationalLeadership.save() does
+    NationalLeadership = apps.get_model('party', 'NationalLeadership')
+    leaders = []
+    for leader in NationalLeadership.objects.only('pk', 'image', 'image_url'):
+        image_url = media_url(leader.image.name) if leader.image else ''
+        if image_url != leader.image_url:
+            leader.image_url = image_url
+            leaders.append(leader)
+    NationalLeadership.objects.bulk_update(leaders, ['image_url'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('party', '0025_order_refund_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_image_urls, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,8 @@ from .donate import Donation
 from .shop import Product, ProductCategory, Order, OrderItem, Review
 from .membership import MembershipPlan, Membership
 from .newsletter import NewsletterSubscription
+from .jobs import BackgroundJob
+from .analytics import MembershipRollup, MembershipDailyRollup
 
 __all__ = [
     'User',
@@ -27,4 +29,7 @@ __all__ = [
     'MembershipPlan',
     'Membership',
     'NewsletterSubscription',
+    'BackgroundJob',
+    'MembershipRollup',
+    'MembershipDailyRollup',
 ] 
\ No newline at end of file
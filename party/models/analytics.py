@@ -0,0 +1,59 @@
+from django.db import models
+from decimal import Decimal
+
+REGION_LEVELS = [
+    ('national', 'National'),
+    ('county', 'County'),
+    ('constituency', 'Constituency'),
+    ('ward', 'Ward'),
+]
+
+
+class MembershipRollupBase(models.Model):
+    """
+    Membership count and revenue for one region, membership type and payment status.
+    `region_id` is the County/Constituency/Ward id for that level, and 0 for national.
+    """
+    level = models.CharField(max_length=20, choices=REGION_LEVELS)
+    region_id = models.PositiveIntegerField(default=0)
+    membership_type = models.CharField(max_length=20)
+    payment_status = models.CharField(max_length=20)
+    member_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        abstract = True
+
+
+class MembershipRollup(MembershipRollupBase):
+    """
+    Running totals, maintained by the Membership signals
+    """
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['level', 'region_id', 'membership_type', 'payment_status'],
+                name='membership_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.level}:{self.region_id} {self.membership_type}/{self.payment_status}"
+
+
+class MembershipDailyRollup(MembershipRollupBase):
+    """
+    Per-day totals, bucketed on the membership's creation date
+    """
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['level', 'region_id', 'day', 'membership_type', 'payment_status'],
+                name='membership_daily_rollup_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.level}:{self.region_id} {self.membership_type}/{self.payment_status}"
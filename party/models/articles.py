@@ -0,0 +1,74 @@
+from django.db import models
+from ..articles import ARTICLE_PIPELINE_VERSION, derive_article
+import hashlib
+
+# Fields the article pipeline fills from `content`
+DERIVED_FIELDS = (
+    'content_html', 'content_text', 'excerpt', 'word_count', 'reading_time',
+    'content_images', 'derivatives_version',
+)
+
+
+def content_hash(content):
+    return hashlib.sha256((content or '').encode()).digest()
+
+
+class ArticleContent(models.Model):
+    """
+    Derivatives of a rich-text `content` field, computed by the article pipeline
+    whenever changed content is saved, so read paths and emails never parse
+    HTML. Subclasses define `content`.
+    """
+    content_html = models.TextField(blank=True, editable=False)  # sanitized, render-ready
+    content_text = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=300, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)  # minutes
+    content_images = models.JSONField(default=list, blank=True, editable=False)
+    derivatives_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Fingerprint the content as loaded, so save() can tell whether it was edited
+        if 'content' in instance.__dict__:
+            instance._loaded_content_hash = content_hash(instance.__dict__['content'])
+        return instance
+
+    def content_changed(self):
+        """
+        Whether the derivatives are out of date. A deferred content column that was
+        never touched is unchanged and is not loaded to find out.
+        """
+        if self._state.adding:
+            return True
+        version = self.__dict__.get('derivatives_version')
+        if version is not None and version != ARTICLE_PIPELINE_VERSION:
+            return True
+        if 'content' not in self.__dict__:
+            return False
+        loaded = getattr(self, '_loaded_content_hash', None)
+        return loaded is None or loaded != content_hash(self.content)
+
+    def refresh_derivatives(self):
+        article = derive_article(self.content)
+        self.content_html = article['html']
+        self.content_text = article['text']
+        self.excerpt = article['excerpt']
+        self.word_count = article['word_count']
+        self.reading_time = article['reading_time']
+        self.content_images = article['images']
+        self.derivatives_version = ARTICLE_PIPELINE_VERSION
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'content' in update_fields) and self.content_changed():
+            self.refresh_derivatives()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(DERIVED_FIELDS)
+        super().save(*args, **kwargs)
+        if 'content' in self.__dict__:
+            self._loaded_content_hash = content_hash(self.content)
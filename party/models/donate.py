@@ -42,4 +42,7 @@ class Donation(models.Model):
         return f"{self.donor_name} - {self.amount} - {self.status}"
     
     class Meta:
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='donation_created_idx'),
+        ] 
\ No newline at end of file
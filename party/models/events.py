@@ -1,9 +1,11 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from froala_editor.fields import FroalaField
 from .user import User
-import cloudinary
-from django.conf import settings
+from .articles import ArticleContent
+from ..media import media_url
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 class EventCategory(models.Model):
@@ -22,7 +24,7 @@ class EventCategory(models.Model):
     class Meta:
         verbose_name_plural = "Event Categories"
 
-class Event(models.Model):
+class Event(ArticleContent):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()  # Preview description
@@ -35,24 +37,31 @@ class Event(models.Model):
     is_published = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted full-text document, maintained by party.services.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
-    def get_preview_image_url(self):
-        if not self.preview_image:
-            return None
-        if str(self.preview_image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.preview_image}"
-        return self.preview_image.url if self.preview_image else None
+    def get_preview_image_url(self, preset=None):
+        return media_url(self.preview_image.name, preset) if self.preview_image else None
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['-start_date'], name='event_published_start_idx', condition=models.Q(is_published=True)),
+            models.Index(
+                fields=['category', '-start_date'],
+                name='event_published_category_idx',
+                condition=models.Q(is_published=True),
+            ),
+            GinIndex(fields=['search_vector'], name='event_search_idx'),
+        ]
 
 class EventRegistration(models.Model):
     STATUS_CHOICES = [
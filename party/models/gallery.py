@@ -1,7 +1,8 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from .user import User
-import cloudinary
-from django.conf import settings
+from ..media import media_url
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 class GalleryCategory(models.Model):
@@ -32,20 +33,14 @@ class Gallery(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
+    # Weighted full-text document, maintained by party.services.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
-    def get_image_url(self):
-        if not self.image:
-            return None
-        if str(self.image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.image}"
-        return self.image.url if self.image else None
+    def get_image_url(self, preset=None):
+        return media_url(self.image.name, preset) if self.image else None
 
-    def get_thumbnail_url(self):
-        if not self.thumbnail:
-            return None
-        if str(self.thumbnail).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.thumbnail}"
-        return self.thumbnail.url if self.thumbnail else None
+    def get_thumbnail_url(self, preset=None):
+        return media_url(self.thumbnail.name, preset) if self.thumbnail else None
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -59,4 +54,9 @@ class Gallery(models.Model):
 
     class Meta:
         verbose_name_plural = "Gallery"
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='gallery_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='gallery_category_created_idx'),
+            GinIndex(fields=['search_vector'], name='gallery_search_idx'),
+        ] 
\ No newline at end of file
@@ -3,8 +3,11 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .user import User
 from cloudinary_storage.storage import MediaCloudinaryStorage
+from ..media import media_url
 import cloudinary.uploader
-import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 class LeadershipPosition(models.Model):
     title = models.CharField(max_length=100)
@@ -29,6 +32,8 @@ class NationalLeadership(models.Model):
         null=True,
         blank=True
     )
+    # Delivery URL resolved when the image is saved, so reads never touch the Cloudinary API
+    image_url = models.URLField(max_length=500, blank=True)
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
@@ -51,11 +56,12 @@ class NationalLeadership(models.Model):
                     folder="leadership",
                     resource_type="image"
                 )
-                print(f"Cloudinary upload result: {result}")
+                logger.info(f"Cloudinary upload result: {result}")
                 # Update the image field with Cloudinary version
                 self.image = f"v{result['version']}/{result['public_id']}"
             except Exception as e:
-                print(f"Error uploading to Cloudinary: {str(e)}")
+                logger.error(f"Error uploading to Cloudinary: {str(e)}")
+        self.image_url = media_url(self.image.name) if self.image else ''
         super().save(*args, **kwargs)
 
     class Meta:
@@ -65,8 +71,4 @@ class NationalLeadership(models.Model):
 @receiver(post_save, sender=NationalLeadership)
 def log_image_upload(sender, instance, **kwargs):
     if instance.image:
-        print(f"\nImage details for {instance.name}:")
-        print(f"Image path: {instance.image}")
-        print(f"Image URL: {instance.image.url}")
-        print(f"Image storage: {instance.image.storage}")
-        print(f"Is Cloudinary URL: {str(instance.image).startswith('v')}") 
\ No newline at end of file
+        logger.debug(f"Image for {instance.name}: path={instance.image} url={instance.image_url}") 
\ No newline at end of file
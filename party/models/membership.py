@@ -90,4 +90,7 @@ class Membership(models.Model):
         return f"{self.email} - {self.membership_type}"
 
     class Meta:
-        ordering = ['-created_at'] 
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='membership_user_created_idx'),
+        ] 
\ No newline at end of file
@@ -1,9 +1,12 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.utils.text import slugify
 from froala_editor.fields import FroalaField
 from .user import User
-import cloudinary
-from django.conf import settings
+from .articles import ArticleContent
+from ..media import media_url
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 class NewsCategory(models.Model):
@@ -25,7 +28,7 @@ class NewsCategory(models.Model):
         verbose_name_plural = "News Categories"
         ordering = ['name']
 
-class News(models.Model):
+class News(ArticleContent):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()  # Preview description
@@ -38,29 +41,35 @@ class News(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted full-text document, maintained by party.services.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        # The news feed pages on published_at, so published articles always carry one
+        if self.is_published and not self.published_at:
+            self.published_at = timezone.now()
         super().save(*args, **kwargs)
 
-    def get_preview_image_url(self):
-        if not self.preview_image:
-            return None
-        if str(self.preview_image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.preview_image}"
-        return self.preview_image.url if self.preview_image else None
+    def get_preview_image_url(self, preset=None):
+        return media_url(self.preview_image.name, preset) if self.preview_image else None
 
-    def get_image_url(self):
-        if not self.image:
-            return None
-        if str(self.image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.image}"
-        return self.image.url if self.image else None
+    def get_image_url(self, preset=None):
+        return media_url(self.image.name, preset) if self.image else None
 
     def __str__(self):
         return self.title
 
     class Meta:
         verbose_name_plural = "News"
-        ordering = ['-published_at', '-created_at'] 
\ No newline at end of file
+        ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['is_published', '-published_at', '-created_at'], name='news_feed_idx'),
+            models.Index(
+                fields=['category', '-published_at', '-created_at'],
+                name='news_published_category_idx',
+                condition=models.Q(is_published=True),
+            ),
+            GinIndex(fields=['search_vector'], name='news_search_idx'),
+        ] 
\ No newline at end of file
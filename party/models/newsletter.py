@@ -30,4 +30,13 @@ class NewsletterSubscription(models.Model):
     class Meta:
         verbose_name = 'Newsletter Subscription'
         verbose_name_plural = 'Newsletter Subscriptions'
-        ordering = ['-subscription_date'] 
\ No newline at end of file
+        ordering = ['-subscription_date']
+        indexes = [
+            # Newsletter fan-out walks active, verified subscribers by id
+            models.Index(
+                fields=['id'],
+                name='newsletter_sendable_idx',
+                condition=models.Q(status='active', is_verified=True),
+            ),
+            models.Index(fields=['status', 'is_verified'], name='newsletter_status_idx'),
+        ] 
\ No newline at end of file
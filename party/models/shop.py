@@ -1,8 +1,10 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from .user import User
-import cloudinary
-from django.conf import settings
+from ..media import media_url
 from cloudinary_storage.storage import MediaCloudinaryStorage
 
 class ProductCategory(models.Model):
@@ -33,8 +35,13 @@ class Product(models.Model):
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE)
     stock = models.IntegerField(default=0)
     is_featured = models.BooleanField(default=False)
+    # Denormalized from Review, kept in sync by party.signals.update_product_rating
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted full-text document, maintained by party.services.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -43,12 +50,31 @@ class Product(models.Model):
             self.original_price = self.calculate_original_price()
         super().save(*args, **kwargs)
 
-    def get_image_url(self):
-        if not self.image:
+    def get_image_url(self, preset=None):
+        return media_url(self.image.name, preset) if self.image else None
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
             return None
-        if str(self.image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{self.image}"
-        return self.image.url if self.image else None
+        return self.rating_sum / self.rating_count
+
+    @classmethod
+    def refresh_ratings(cls, *product_ids):
+        """
+        Recompute rating_count/rating_sum from the reviews table in a single UPDATE,
+        for the given products or for every product when none are given
+        """
+        products = cls.objects.filter(pk__in=product_ids) if product_ids else cls.objects.all()
+        reviews = Review.objects.filter(product=models.OuterRef('pk')).order_by().values('product')
+        products.update(
+            rating_count=Coalesce(
+                models.Subquery(reviews.annotate(count=models.Count('pk')).values('count')), 0
+            ),
+            rating_sum=Coalesce(
+                models.Subquery(reviews.annotate(total=models.Sum('rating')).values('total')), 0
+            ),
+        )
 
     def calculate_original_price(self):
         if self.price_modifier_type == 'multiply':
@@ -67,6 +93,11 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='product_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='product_category_created_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_idx'),
+        ]
 
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -121,6 +152,10 @@ class Order(models.Model):
     payment_provider = models.CharField(max_length=50)  # e.g., 'mpesa', 'stripe', 'paypal'
     transaction_id = models.CharField(max_length=100, null=True, blank=True)
     payment_provider_response = models.JSONField(null=True, blank=True)
+    # Our id for the current payment attempt, echoed back by provider callbacks
+    payment_reference = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Paid after its stock was released and resold; the payment must be returned
+    refund_required = models.BooleanField(default=False)
     
     # Order details
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -137,6 +172,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -150,6 +188,35 @@ class OrderItem(models.Model):
     class Meta:
         unique_together = ('order', 'product') 
 
+class StockReservation(models.Model):
+    """
+    Stock taken off Product.stock for an unpaid order. Held reservations expire
+    after a TTL and the sweeper puts their quantity back; paid ones are committed.
+    """
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, related_name='reservations', null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} ({self.status})"
+
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            # The sweeper's scan: held reservations by expiry
+            models.Index(fields=['expires_at'], condition=models.Q(status='held'), name='reservation_held_expiry_idx'),
+        ]
+
 class PickupLocation(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField()
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from .locations import County, Constituency, Ward
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -30,6 +31,11 @@ class User(AbstractUser):
     county = models.CharField(max_length=100, blank=True, null=True)
     constituency = models.CharField(max_length=100, blank=True, null=True)
     ward = models.CharField(max_length=100, blank=True, null=True)
+    # The free-text location above matched to the location tables, for regional joins
+    resolved_county = models.ForeignKey(County, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
+    resolved_constituency = models.ForeignKey(Constituency, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
+    resolved_ward = models.ForeignKey(Ward, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
+    location_confidence = models.FloatField(null=True, blank=True)
     membership_type = models.CharField(max_length=50, blank=True, null=True)
     membership_status = models.CharField(max_length=20, default='pending')
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
@@ -39,5 +45,25 @@ class User(AbstractUser):
     
     objects = UserManager()
     
+    def resolve_location(self):
+        """
+        Match the free-text county/constituency/ward against the location tables
+        """
+        from ..services.location_matching import LocationMatch, get_location_matcher
+        if self.county or self.constituency or self.ward:
+            match = get_location_matcher().match(self.county, self.constituency, self.ward)
+        else:
+            match = LocationMatch()
+        self.resolved_county_id = match.county_id
+        self.resolved_constituency_id = match.constituency_id
+        self.resolved_ward_id = match.ward_id
+        self.location_confidence = match.confidence
+
+    def save(self, *args, **kwargs):
+        # Partial saves (last_login, password, ...) leave the location untouched
+        if kwargs.get('update_fields') is None:
+            self.resolve_location()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email 
\ No newline at end of file
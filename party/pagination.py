@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class UncountedPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination without the COUNT(*): one extra row is fetched to
+    tell whether a next page exists, and `count` is returned as null.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.page_number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except (TypeError, ValueError):
+            self.page_number = 1
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination on the view's `cursor_ordering`, so every page is
+    a `WHERE position < last_seen ORDER BY ... LIMIT n` index range scan
+    """
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+class FeedPagination(PageNumberPagination):
+    """
+    Default pagination for the API.
+
+    Page numbers stay the default so existing clients keep working. Views that
+    declare `cursor_ordering` also accept `?pagination=cursor` (and the `cursor`
+    parameter in the links it returns) for keyset paging, and any view accepts
+    `?count=false` to skip the COUNT(*) on page-number requests.
+    """
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def get_delegate(self, request, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        wants_cursor = (
+            request.query_params.get(self.mode_query_param) == 'cursor' or
+            CursorPagination.cursor_query_param in request.query_params
+        )
+        if ordering and wants_cursor:
+            return KeysetCursorPagination(ordering)
+        if request.query_params.get(self.count_query_param) in ('0', 'false'):
+            return UncountedPageNumberPagination()
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.delegate = self.get_delegate(request, view)
+        if self.delegate is not None:
+            page = self.delegate.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.delegate.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.delegate is not None:
+            return self.delegate.to_html()
+        return super().to_html()
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from django.contrib.auth.password_validation import validate_password
 from .models import (
     User, News, NewsCategory, Event, EventCategory, EventRegistration,
@@ -8,10 +10,141 @@ from .models import (
     MembershipPlan, Membership
 )
 from .models.locations import County, Constituency, Ward
-from django.conf import settings
-import cloudinary
+from .media import media_url, media_variants
+from .services.pricing import price_product
 from .models.shop import PickupLocation
 
+class EagerLoadingMixin:
+    """
+    Declares the query plan a serializer needs, so viewsets can load every
+    related object it renders up front instead of one query per row.
+    Entries may be field paths or Prefetch objects.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    only_fields = ()
+    defer_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        if cls.only_fields:
+            queryset = queryset.only(*cls.only_fields)
+        if cls.defer_fields:
+            queryset = queryset.defer(*cls.defer_fields)
+        return queryset
+
+def sparse_params(request):
+    """
+    The (fields, expand) a read request asked for through ?fields=a,b and ?expand=x,y.
+    `fields` is None when not given; writes always get the full representation.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None, set()
+
+    def names(param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    return names('fields'), names('expand') or set()
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    """
+    Sparse fieldsets for read requests. ?fields= keeps only the listed fields and
+    ?expand= renders the listed `expandable_fields` relations in full; once either
+    parameter is given, relations left unexpanded are rendered as primary keys.
+    Without them the representation is unchanged.
+
+    The query plan follows the selection: collapsed relations are neither joined
+    nor prefetched, and when the columns behind every kept field are known the
+    rows are loaded with only() those. Fields that are not plain model fields
+    (SerializerMethodFields and the like) declare their columns in `field_sources`;
+    an undeclared one makes the plan fall back to loading full rows.
+    """
+    expandable_fields = ()
+    field_sources = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Only the outermost serializer (or the child of its list) answers the parameters
+        if self.root not in (self, self.parent):
+            return fields
+        requested, expand = sparse_params(self.context.get('request'))
+        if requested is None and not expand:
+            return fields
+        if requested is not None:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        for name in self.expandable_fields:
+            if name in fields and name not in expand:
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=self._is_many(name))
+        return fields
+
+    @classmethod
+    def _is_many(cls, name):
+        field = cls.Meta.model._meta.get_field(name)
+        return field.many_to_many or field.one_to_many
+
+    @classmethod
+    def _columns(cls, declared, names):
+        opts = cls.Meta.model._meta
+        columns = {opts.pk.name}
+        for name in names:
+            if name in cls.field_sources:
+                columns.update(cls.field_sources[name])
+                continue
+            try:
+                field = opts.get_field(declared[name].source)
+            except FieldDoesNotExist:
+                return None
+            if field.concrete:
+                columns.add(field.name)
+        return columns
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=None, required=()):
+        if fields is None and not expand:
+            return super().setup_eager_loading(queryset)
+
+        declared = cls().fields  # no request in context, so the full field set
+        names = [name for name in declared if fields is None or name in fields]
+        rendered = {name for name in names if name not in cls.expandable_fields or name in expand}
+        collapsed = [name for name in names if name not in rendered]
+
+        select = [path for path in cls.select_related_fields if path.split('__')[0] in rendered]
+        prefetch = [
+            lookup for lookup in cls.prefetch_related_fields
+            if getattr(lookup, 'prefetch_to', lookup).split('__')[0] in rendered
+        ]
+        # A collapsed to-many relation still needs its ids
+        prefetch += [name for name in collapsed if cls._is_many(name)]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        columns = cls._columns(declared, names)
+        if columns is None:
+            return queryset.defer(*cls.defer_fields) if cls.defer_fields else queryset
+        columns.update(required)
+        columns.update(path.split('__')[0] for path in select)
+        return queryset.only(*columns)
+
+class ArticleContentField(serializers.CharField):
+    """
+    Takes the editor's raw HTML on write and reads back the sanitized content_html
+    the article pipeline stored at save time; raw content is only read for rows
+    not processed yet
+    """
+    def get_attribute(self, instance):
+        if instance.derivatives_version:
+            return instance.content_html
+        return super().get_attribute(instance)
+
 # User Serializers
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -42,8 +175,10 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'email', 'username', 'first_name', 'last_name', 
                  'phone_number', 'county', 'constituency', 'ward', 'membership_type', 
-                 'membership_status', 'profile_picture')
-        read_only_fields = ('id', 'membership_status')
+                 'membership_status', 'profile_picture',
+                 'resolved_county', 'resolved_constituency', 'resolved_ward')
+        read_only_fields = ('id', 'membership_status',
+                            'resolved_county', 'resolved_constituency', 'resolved_ward')
 
 # News Serializers
 class NewsCategorySerializer(serializers.ModelSerializer):
@@ -51,15 +186,27 @@ class NewsCategorySerializer(serializers.ModelSerializer):
         model = NewsCategory
         fields = '__all__'
 
-class NewsSerializer(serializers.ModelSerializer):
+class NewsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = NewsCategorySerializer(read_only=True)
     author = UserSerializer(read_only=True)
+    content = ArticleContentField()
     preview_image_url = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    select_related_fields = ('category', 'author')
+    defer_fields = ('search_vector', 'content', 'content_text')
+    expandable_fields = ('category', 'author')
+    field_sources = {
+        'content': ('content_html', 'derivatives_version'),
+        'preview_image_url': ('preview_image',),
+        'image_url': ('image',),
+        'image_variants': ('image',),
+    }
 
     class Meta:
         model = News
-        fields = '__all__'
+        exclude = ('search_vector', 'content_html', 'content_text', 'derivatives_version')
         read_only_fields = ('author', 'created_at', 'updated_at')
 
     def get_preview_image_url(self, obj):
@@ -68,48 +215,77 @@ class NewsSerializer(serializers.ModelSerializer):
     def get_image_url(self, obj):
         return obj.get_image_url()
 
+    def get_image_variants(self, obj):
+        return media_variants(obj.image.name) if obj.image else None
+
 # Event Serializers
 class EventCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = EventCategory
         fields = '__all__'
 
-class EventRegistrationSerializer(serializers.ModelSerializer):
+class EventRegistrationSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
+    select_related_fields = ('user',)
+
     class Meta:
         model = EventRegistration
         fields = '__all__'
         read_only_fields = ('user', 'registration_date')
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = EventCategorySerializer(read_only=True)
     registrations = EventRegistrationSerializer(many=True, read_only=True)
+    content = ArticleContentField()
     preview_image_url = serializers.SerializerMethodField()
+    preview_image_variants = serializers.SerializerMethodField()
+
+    select_related_fields = ('category',)
+    defer_fields = ('search_vector', 'content', 'content_text')
+    expandable_fields = ('category',)
+    field_sources = {
+        'content': ('content_html', 'derivatives_version'),
+        'preview_image_url': ('preview_image',),
+        'preview_image_variants': ('preview_image',),
+    }
 
     class Meta:
         model = Event
-        fields = '__all__'
+        exclude = ('search_vector', 'content_html', 'content_text', 'derivatives_version')
         read_only_fields = ('created_at', 'updated_at')
 
     def get_preview_image_url(self, obj):
         return obj.get_preview_image_url()
 
+    def get_preview_image_variants(self, obj):
+        return media_variants(obj.preview_image.name) if obj.preview_image else None
+
 # Gallery Serializers
 class GalleryCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = GalleryCategory
         fields = '__all__'
 
-class GallerySerializer(serializers.ModelSerializer):
+class GallerySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = GalleryCategorySerializer(read_only=True)
     uploaded_by = UserSerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    select_related_fields = ('category', 'uploaded_by')
+    defer_fields = ('search_vector',)
+    expandable_fields = ('category', 'uploaded_by')
+    field_sources = {
+        'image_url': ('image',),
+        'thumbnail_url': ('thumbnail',),
+        'image_variants': ('image',),
+    }
 
     class Meta:
         model = Gallery
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('uploaded_by', 'created_at', 'updated_at')
 
     def get_image_url(self, obj):
@@ -118,63 +294,41 @@ class GallerySerializer(serializers.ModelSerializer):
     def get_thumbnail_url(self, obj):
         return obj.get_thumbnail_url()
 
+    def get_image_variants(self, obj):
+        return media_variants(obj.image.name) if obj.image else None
+
 # Leadership Serializers
 class LeadershipPositionSerializer(serializers.ModelSerializer):
     class Meta:
         model = LeadershipPosition
         fields = ['id', 'title', 'slug', 'description', 'order']
 
-class NationalLeadershipSerializer(serializers.ModelSerializer):
+class NationalLeadershipSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     position = LeadershipPositionSerializer(read_only=True)
     image = serializers.SerializerMethodField()
-    
+    image_variants = serializers.SerializerMethodField()
+
+    select_related_fields = ('position',)
+    expandable_fields = ('position',)
+    field_sources = {
+        'image': ('image', 'image_url'),
+        'image_variants': ('image',),
+    }
+
     class Meta:
         model = NationalLeadership
-        fields = ['id', 'name', 'position', 'bio', 'image', 'start_date', 'end_date', 'is_active']
+        fields = ['id', 'name', 'position', 'bio', 'image', 'image_variants', 'start_date', 'end_date', 'is_active']
     
     def get_image(self, obj):
         if not obj.image:
             return None
-        # If it's a full URL, return it as is
-        if str(obj.image).startswith('http'):
-            return str(obj.image)
-        # If it's a Cloudinary public_id (starts with 'v'), return the full URL
-        if str(obj.image).startswith('v'):
-            return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{obj.image}"
-        # If it's a local path, try to get the Cloudinary URL
-        try:
-            # Get the Cloudinary URL for the image
-            # The public_id should be the path without the version number
-            public_id = str(obj.image)
-            print(f"Original image path: {public_id}")  # Debug log
-            
-            # Handle different path formats
-            if public_id.startswith('leadership/'):
-                # Path already includes leadership folder
-                cloudinary_path = public_id
-            else:
-                # Extract filename and add leadership folder
-                filename = public_id.split('/')[-1]
-                cloudinary_path = f"leadership/{filename}"
-            
-            print(f"Cloudinary path: {cloudinary_path}")  # Debug log
-            
-            # Try to get the image from Cloudinary
-            try:
-                result = cloudinary.uploader.explicit(cloudinary_path, type="upload")
-                print(f"Cloudinary result: {result}")  # Debug log
-                return result['secure_url']
-            except Exception as e:
-                print(f"Error getting Cloudinary URL: {str(e)}")  # Debug log
-                # Fallback to basic URL
-                return f"https://res.cloudinary.com/{settings.CLOUDINARY_STORAGE['CLOUD_NAME']}/image/upload/{cloudinary_path}"
-        except Exception as e:
-            print(f"Error in get_image for {obj.name}: {str(e)}")  # Debug log
-            # Fallback to local media URL if Cloudinary URL can't be generated
-            return f"{settings.MEDIA_URL}{obj.image}"
+        return obj.image_url or media_url(obj.image.name)
+
+    def get_image_variants(self, obj):
+        return media_variants(obj.image.name) if obj.image else None
 
 # Donation Serializers
-class DonationSerializer(serializers.ModelSerializer):
+class DonationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Donation
         fields = '__all__'
@@ -197,56 +351,104 @@ class ReviewSerializer(serializers.ModelSerializer):
     def get_user(self, obj):
         return obj.user.get_full_name() or obj.user.email
 
-class ProductSerializer(serializers.ModelSerializer):
+# Columns price_product() reads
+PRICE_SOURCES = ('price', 'price_modifier_type', 'price_modifier_value', 'updated_at')
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = ProductCategorySerializer(read_only=True)
     original_price = serializers.DecimalField(read_only=True, max_digits=10, decimal_places=2)
     discount = serializers.IntegerField(read_only=True)
     reviews = ReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    select_related_fields = ('category',)
+    prefetch_related_fields = (
+        Prefetch('reviews', queryset=Review.objects.select_related('user')),
+    )
+    defer_fields = ('search_vector',)
+    expandable_fields = ('category', 'reviews')
+    field_sources = {
+        'original_price': PRICE_SOURCES,
+        'discount': PRICE_SOURCES,
+        'average_rating': ('rating_count', 'rating_sum'),
+        'image_url': ('image',),
+        'image_variants': ('image',),
+    }
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'slug', 'description', 'price', 'original_price',
             'price_modifier_type', 'price_modifier_value', 'discount',
-            'image', 'image_url', 'category', 'stock', 'is_featured', 'reviews',
-            'average_rating', 'created_at', 'updated_at'
+            'image', 'image_url', 'image_variants', 'category', 'stock', 'is_featured', 'reviews',
+            'average_rating', 'rating_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ('created_at', 'updated_at', 'original_price', 'discount')
+        read_only_fields = ('created_at', 'updated_at', 'original_price', 'discount', 'rating_count')
 
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if not reviews:
-            return None
-        return sum(review.rating for review in reviews) / len(reviews)
+        return obj.average_rating
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['original_price'] = instance.calculate_original_price()
-        data['discount'] = instance.calculate_discount()
+        # discount has no model attribute, so DRF skips it and only self.fields says it was asked for
+        priced = [name for name in ('original_price', 'discount') if name in self.fields]
+        if priced:
+            price = price_product(instance)
+            for name in priced:
+                data[name] = getattr(price, name)
         return data
 
     def get_image_url(self, obj):
-        if obj.image and str(obj.image).startswith('v'):
-            return f"https://res.cloudinary.com/dgkommeq9/image/upload/{obj.image}"
-        return obj.image.url if obj.image else None
+        return obj.get_image_url()
+
+    def get_image_variants(self, obj):
+        return media_variants(obj.image.name) if obj.image else None
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class ProductListSerializer(ProductSerializer):
+    """
+    Catalogue view of a product: rating totals only, without the embedded reviews
+    """
+    prefetch_related_fields = ()
+
+    class Meta(ProductSerializer.Meta):
+        fields = [field for field in ProductSerializer.Meta.fields if field != 'reviews']
+
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
 
+    select_related_fields = ('product__category',)
+    prefetch_related_fields = (
+        Prefetch('product__reviews', queryset=Review.objects.select_related('user')),
+    )
+    defer_fields = ('product__search_vector',)
+    expandable_fields = ('product',)
+
     class Meta:
         model = OrderItem
         fields = '__all__'
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user = UserSerializer(read_only=True)
 
+    select_related_fields = ('user',)
+    expandable_fields = ('items', 'user')
+    prefetch_related_fields = (
+        Prefetch('items', queryset=OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())),
+    )
+
     class Meta:
         model = Order
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        # The total is priced server-side from the items, see services.orders.place_order;
+        # status and payment fields only move through services.payments
+        read_only_fields = (
+            'total_amount', 'status', 'payment_status', 'payment_provider', 'transaction_id',
+            'payment_provider_response', 'payment_reference', 'refund_required',
+            'created_at', 'updated_at',
+        )
 
 # Membership Serializers
 class MembershipPlanSerializer(serializers.ModelSerializer):
@@ -291,8 +493,10 @@ class WardSerializer(serializers.ModelSerializer):
         model = Ward
         fields = ['id', 'name', 'code']
 
-class ConstituencySerializer(serializers.ModelSerializer):
+class ConstituencySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     wards = WardSerializer(many=True, read_only=True)
+
+    prefetch_related_fields = ('wards',)
     
     class Meta:
         model = Constituency
@@ -303,8 +507,10 @@ class CountySerializer(serializers.ModelSerializer):
         model = County
         fields = ['id', 'name', 'code']
 
-class CountyDetailSerializer(serializers.ModelSerializer):
+class CountyDetailSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     constituencies = ConstituencySerializer(many=True, read_only=True)
+
+    prefetch_related_fields = ('constituencies__wards',)
     
     class Meta:
         model = County
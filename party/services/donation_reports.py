@@ -0,0 +1,141 @@
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import csv
+import io
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'amount', 'payment_method', 'status', 'transaction_id',
+    'payment_provider', 'donor_name', 'donor_email', 'donor_phone', 'user_id',
+)
+EXPORT_CHUNK_SIZE = 5000
+
+
+def filter_donations(queryset, start=None, end=None, status=None, payment_method=None):
+    if start:
+        queryset = queryset.filter(created_at__date__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__date__lte=end)
+    if status:
+        queryset = queryset.filter(status=status)
+    if payment_method:
+        queryset = queryset.filter(payment_method=payment_method)
+    return queryset
+
+
+def donation_summary(queryset):
+    """
+    Totals overall and by day, payment method and status, all aggregated in the database
+    """
+    queryset = queryset.order_by()
+
+    def grouped(*fields):
+        return list(
+            queryset.values(*fields)
+            .annotate(count=Count('pk'), total=Sum('amount'))
+            .order_by(*fields)
+        )
+
+    by_day = (
+        queryset.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('pk'), total=Sum('amount'))
+        .order_by('day')
+    )
+    return {
+        **queryset.aggregate(count=Count('pk'), total=Sum('amount')),
+        'by_day': list(by_day),
+        'by_payment_method': grouped('payment_method'),
+        'by_status': grouped('status'),
+    }
+
+
+def _export_rows(queryset):
+    # values_list + iterator streams rows through a server-side cursor on PostgreSQL
+    return queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """
+    File-like object whose write() just returns the value, so csv.writer yields lines
+    """
+    def write(self, value):
+        return value
+
+
+def stream_donations_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _export_rows(queryset):
+        yield writer.writerow(row)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only stream that hands back whatever was written since the last drain
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_donations_parquet(queryset):
+    """
+    Write one Parquet row group per chunk of rows, yielding the bytes as they are produced.
+    Needs pyarrow; callers should check parquet_available() first.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('amount', pa.decimal128(10, 2)),
+        ('payment_method', pa.string()),
+        ('status', pa.string()),
+        ('transaction_id', pa.string()),
+        ('payment_provider', pa.string()),
+        ('donor_name', pa.string()),
+        ('donor_email', pa.string()),
+        ('donor_phone', pa.string()),
+        ('user_id', pa.int64()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+
+    def write_chunk(rows):
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        ))
+
+    rows = []
+    for row in _export_rows(queryset):
+        rows.append(row)
+        if len(rows) >= EXPORT_CHUNK_SIZE:
+            write_chunk(rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        write_chunk(rows)
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return False
+    return hasattr(pq, 'ParquetWriter')
@@ -1,8 +1,7 @@
-from django.core.mail import send_mail, EmailMessage
+from django.core.mail import EmailMessage
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from ..models.newsletter import NewsletterSubscription
+from .newsletter_fanout import NewsletterFanout
+from .newsletter_templates import CompiledNewsletter
 from datetime import datetime
 import logging
 import os
@@ -11,29 +10,23 @@ logger = logging.getLogger(__name__)
 
 class EmailService:
     @staticmethod
-    def send_newsletter(subject, html_content, context=None):
+    def send_newsletter(subject, html_content, context=None, on_progress=None, start_after=0, completed=None):
         """
-        Send newsletter to all active subscribers
+        Send newsletter to all active subscribers, optionally resuming after a subscriber id
+        or skipping the subscriber id ranges an earlier attempt completed
         """
-        subscribers = NewsletterSubscription.objects.filter(status='active', is_verified=True)
-        
-        for subscriber in subscribers:
-            # Render the email template with context
-            html_message = render_to_string(html_content, context) if context else html_content
-            plain_message = strip_tags(html_message)
-            
-            try:
-                send_mail(
-                    subject=subject,
-                    message=plain_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[subscriber.email],
-                    html_message=html_message,
-                    fail_silently=False,
-                )
-            except Exception as e:
-                logger.error(f"Failed to send email to {subscriber.email}: {str(e)}")
-                print(f"Failed to send email to {subscriber.email}: {str(e)}")
+        # Render the email template once for the whole list; only per-recipient
+        # fields such as the unsubscribe link are filled in for each email
+        if context:
+            newsletter = CompiledNewsletter.from_template(html_content, context)
+        else:
+            newsletter = CompiledNewsletter.from_html(html_content)
+
+        fanout = NewsletterFanout(
+            subject, newsletter,
+            on_progress=on_progress, start_after=start_after, completed=completed
+        )
+        return fanout.run()
 
     @staticmethod
     def send_verification_email(subscriber):
@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+from ..models.jobs import BackgroundJob
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+_TASKS = {}
+
+DEFAULT_JOB_QUEUE_SETTINGS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 30,      # seconds before the first retry, doubled on each attempt
+    'BACKOFF_MAX': 3600,
+    'STALE_AFTER': 1800,     # running jobs whose worker died are reclaimed after this many seconds
+}
+
+
+def get_job_queue_settings():
+    config = dict(DEFAULT_JOB_QUEUE_SETTINGS)
+    config.update(getattr(settings, 'JOB_QUEUE', {}))
+    return config
+
+
+def task(name):
+    """
+    Register a job handler. Handlers receive the BackgroundJob and read job.payload.
+    """
+    def decorator(func):
+        _TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, idempotency_key=None, run_after=None, max_attempts=None):
+    """
+    Create a pending job, or return the existing one if the idempotency key was already used
+    """
+    if task_name not in _TASKS:
+        raise ValueError(f"Unknown job task: {task_name}")
+
+    fields = {
+        'task': task_name,
+        'payload': payload or {},
+        'run_after': run_after or timezone.now(),
+        'max_attempts': max_attempts or get_job_queue_settings()['MAX_ATTEMPTS'],
+    }
+    if idempotency_key is None:
+        return BackgroundJob.objects.create(**fields)
+
+    try:
+        with transaction.atomic():
+            job, created = BackgroundJob.objects.get_or_create(
+                idempotency_key=idempotency_key, defaults=fields
+            )
+    except IntegrityError:
+        # Lost a race with another enqueue for the same key
+        job, created = BackgroundJob.objects.get(idempotency_key=idempotency_key), False
+    if not created:
+        logger.info(f"Job {idempotency_key} already enqueued as #{job.pk}, skipping")
+    return job
+
+
+def enqueue_on_commit(task_name, payload=None, idempotency_key=None, **kwargs):
+    """
+    Enqueue once the surrounding transaction commits, so the worker never sees
+    a job for a row that was rolled back
+    """
+    transaction.on_commit(
+        lambda: enqueue(task_name, payload, idempotency_key=idempotency_key, **kwargs)
+    )
+
+
+def get_backoff(attempts):
+    config = get_job_queue_settings()
+    delay = min(config['BACKOFF_MAX'], config['BACKOFF_BASE'] * (2 ** max(0, attempts - 1)))
+    # Full jitter keeps retries from a burst of failures from lining up
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def claim_next_job():
+    """
+    Lock and mark the next runnable job as running. Safe to call from many workers.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=get_job_queue_settings()['STALE_AFTER'])
+    with transaction.atomic():
+        job = (
+            BackgroundJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', run_after__lte=now) |
+                Q(status='running', locked_at__lt=stale_before)
+            )
+            .order_by('run_after')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_at', 'updated_at'])
+    return job
+
+
+def run_job(job):
+    handler = _TASKS.get(job.task)
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for task {job.task}")
+        handler(job)
+    except Exception as e:
+        job.last_error = str(e)
+        if job.attempts < job.max_attempts:
+            job.status = 'pending'
+            job.run_after = timezone.now() + get_backoff(job.attempts)
+            logger.warning(
+                f"Job {job.task} #{job.pk} failed (attempt {job.attempts}/{job.max_attempts}), "
+                f"retrying at {job.run_after}: {str(e)}"
+            )
+        else:
+            job.status = 'failed'
+            logger.error(f"Job {job.task} #{job.pk} failed permanently: {str(e)}", exc_info=True)
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_at', 'result', 'updated_at'])
+        return False
+
+    job.status = 'completed'
+    job.completed_at = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=['status', 'completed_at', 'locked_at', 'result', 'updated_at'])
+    logger.info(f"Job {job.task} #{job.pk} completed")
+    return True
+
+
+def run_pending_jobs(max_jobs=None):
+    """
+    Run jobs until the queue is drained or max_jobs have been processed
+    """
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,132 @@
+from difflib import SequenceMatcher, get_close_matches
+from functools import lru_cache
+from .locations import get_location_snapshot
+from .location_search import normalize
+
+# Below this similarity a level is left unresolved, and so are the levels under it
+DEFAULT_MIN_CONFIDENCE = 0.8
+# Distinct spellings remembered per matcher; free text from users is unbounded
+DEFAULT_MEMO_SIZE = 4096
+
+
+class LocationMatch:
+    __slots__ = ('county_id', 'constituency_id', 'ward_id', 'confidence')
+
+    def __init__(self, county_id=None, constituency_id=None, ward_id=None, confidence=None):
+        self.county_id = county_id
+        self.constituency_id = constituency_id
+        self.ward_id = ward_id
+        self.confidence = confidence
+
+    @property
+    def level(self):
+        if self.ward_id:
+            return 'ward'
+        if self.constituency_id:
+            return 'constituency'
+        if self.county_id:
+            return 'county'
+        return None
+
+
+class LocationMatcher:
+    """
+    Resolves free-text county/constituency/ward strings against the location tree.
+
+    Each level is matched among the children of the level above when that
+    resolved, or nationally when it did not, so a misspelt county does not
+    stop an exact constituency from matching. Results are memoized per
+    normalized triple, least recently used first out past `memo_size`;
+    most users share a handful of spellings.
+    """
+    def __init__(self, tree, min_confidence=DEFAULT_MIN_CONFIDENCE, memo_size=DEFAULT_MEMO_SIZE):
+        self.min_confidence = min_confidence
+        self.counties = {}                 # name -> county id
+        self.constituencies = {}           # name -> [(county id, constituency id)]
+        self.constituencies_by_county = {}  # county id -> {name: constituency id}
+        self.wards = {}                    # name -> [(constituency id, ward id)]
+        self.wards_by_constituency = {}    # constituency id -> {name: ward id}
+        self.constituency_county = {}
+        self.ward_constituency = {}
+        self._memo = lru_cache(maxsize=memo_size)(self._match)
+        for county in tree:
+            self.counties[normalize(county['name'])] = county['id']
+            children = self.constituencies_by_county.setdefault(county['id'], {})
+            for constituency in county['constituencies']:
+                name = normalize(constituency['name'])
+                children[name] = constituency['id']
+                self.constituencies.setdefault(name, []).append((county['id'], constituency['id']))
+                self.constituency_county[constituency['id']] = county['id']
+                wards = self.wards_by_constituency.setdefault(constituency['id'], {})
+                for ward in constituency['wards']:
+                    ward_name = normalize(ward['name'])
+                    wards[ward_name] = ward['id']
+                    self.wards.setdefault(ward_name, []).append((constituency['id'], ward['id']))
+                    self.ward_constituency[ward['id']] = constituency['id']
+        self.unique_constituencies = self._unique(self.constituencies)
+        self.unique_wards = self._unique(self.wards)
+
+    def match(self, county, constituency, ward):
+        return self._memo(normalize(county), normalize(constituency), normalize(ward))
+
+    def _match(self, county, constituency, ward):
+        scores = []
+        county_id, score = self._closest(county, self.counties)
+        if county_id:
+            scores.append(score)
+
+        constituency_id = None
+        if constituency:
+            choices = self.constituencies_by_county[county_id] if county_id else self.unique_constituencies
+            constituency_id, score = self._closest(constituency, choices)
+            if constituency_id:
+                scores.append(score)
+                county_id = self.constituency_county[constituency_id]
+
+        ward_id = None
+        if ward:
+            choices = self.wards_by_constituency[constituency_id] if constituency_id else self.unique_wards
+            ward_id, score = self._closest(ward, choices)
+            if ward_id and not constituency_id:
+                constituency_id = self.ward_constituency[ward_id]
+                # A ward found nationally must still sit in the county the user gave
+                if county_id and self.constituency_county[constituency_id] != county_id:
+                    ward_id = constituency_id = None
+                else:
+                    county_id = self.constituency_county[constituency_id]
+            if ward_id:
+                scores.append(score)
+
+        if not scores:
+            return LocationMatch()
+        return LocationMatch(county_id, constituency_id, ward_id, round(min(scores), 3))
+
+    def _closest(self, name, choices):
+        if not name:
+            return None, None
+        if name in choices:
+            return choices[name], 1.0
+        close = get_close_matches(name, choices, n=1, cutoff=self.min_confidence)
+        if not close:
+            return None, None
+        return choices[close[0]], SequenceMatcher(None, name, close[0]).ratio()
+
+    @staticmethod
+    def _unique(index):
+        # Names shared by several parents are ambiguous without the parent level
+        return {name: ids[0][1] for name, ids in index.items() if len(ids) == 1}
+
+
+_matchers = {}
+
+
+def get_location_matcher(min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Return a matcher for the current hierarchy snapshot, rebuilt when the snapshot changes
+    """
+    snapshot = get_location_snapshot()
+    cached = _matchers.get(min_confidence)
+    if cached is None or cached[0] is not snapshot:
+        cached = (snapshot, LocationMatcher(snapshot.tree, min_confidence))
+        _matchers[min_confidence] = cached
+    return cached[1]
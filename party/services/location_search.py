@@ -0,0 +1,131 @@
+from .locations import get_location_snapshot
+import re
+import unicodedata
+
+KIND_ORDER = {'county': 0, 'constituency': 1, 'ward': 2}
+MAX_PREFIX_LENGTH = 20
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """
+    Fold case and accents and collapse punctuation, so 'Murang'a' matches 'muranga'
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.casefold().replace("'", '').replace('’', '')
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationSearchIndex:
+    """
+    Word-prefix and trigram index over every county, constituency and ward.
+
+    Prefixes answer typeahead as the user types; trigrams catch misspellings
+    when prefixes find too little. Each entry carries its full
+    county › constituency › ward path so results need no further lookups.
+    """
+    def __init__(self, tree):
+        self.entries = []
+        self.prefixes = {}
+        self.grams = {}
+        for county in tree:
+            county_ref = {'id': county['id'], 'name': county['name']}
+            self._add('county', county, county_ref, None, None)
+            for constituency in county['constituencies']:
+                constituency_ref = {'id': constituency['id'], 'name': constituency['name']}
+                self._add('constituency', constituency, county_ref, constituency_ref, None)
+                for ward in constituency['wards']:
+                    ward_ref = {'id': ward['id'], 'name': ward['name']}
+                    self._add('ward', ward, county_ref, constituency_ref, ward_ref)
+
+    def _add(self, kind, node, county, constituency, ward):
+        key = normalize(node['name'])
+        names = [ref['name'] for ref in (county, constituency, ward) if ref]
+        position = len(self.entries)
+        self.entries.append((key, {
+            'type': kind,
+            'id': node['id'],
+            'name': node['name'],
+            'code': node['code'],
+            'county': county,
+            'constituency': constituency,
+            'ward': ward,
+            'path': ' › '.join(names),
+        }))
+        for word in set(key.split()):
+            for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                self.prefixes.setdefault(word[:length], set()).add(position)
+        for gram in trigrams(key):
+            self.grams.setdefault(gram, set()).add(position)
+
+    def search(self, query, limit=10, kind=None):
+        query = normalize(query)
+        if not query:
+            return []
+        words = query.split()
+
+        candidates = None
+        for word in words:
+            matches = self.prefixes.get(word[:MAX_PREFIX_LENGTH], set())
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                break
+        ranked = [
+            (self._prefix_rank(position, query), position)
+            for position in candidates or ()
+            if kind is None or self.entries[position][1]['type'] == kind
+        ]
+
+        if len(ranked) < limit and len(query) >= 3:
+            ranked.extend(self._fuzzy(query, kind, exclude={position for _, position in ranked}))
+
+        ranked.sort()
+        return [self.entries[position][1] for _, position in ranked[:limit]]
+
+    def _prefix_rank(self, position, query):
+        key, entry = self.entries[position]
+        if key == query:
+            tier = 0
+        elif key.startswith(query):
+            tier = 1
+        else:
+            tier = 2
+        return (tier, 0.0, KIND_ORDER[entry['type']], len(key), key)
+
+    def _fuzzy(self, query, kind, exclude):
+        query_grams = trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for position in self.grams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        for position, count in shared.items():
+            key, entry = self.entries[position]
+            if position in exclude or (kind is not None and entry['type'] != kind):
+                continue
+            similarity = count / len(query_grams | trigrams(key))
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                yield (3, -similarity, KIND_ORDER[entry['type']], len(key), key), position
+
+
+_index = None
+
+
+def get_location_search_index():
+    """
+    Return the index for the current hierarchy snapshot, rebuilding it alongside the snapshot
+    """
+    global _index
+    snapshot = get_location_snapshot()
+    index = _index
+    if index is None or index[0] is not snapshot:
+        index = (snapshot, LocationSearchIndex(snapshot.tree))
+        _index = index
+    return index[1]
@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+from ..models.locations import County, Constituency, Ward
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Token replaced on every location change, kept in the shared default cache
+# (see CACHES) so each web worker notices that its in-memory snapshot is stale
+# even when another process, such as an import_locations run, did the write.
+# An evicted token is simply regenerated, which also forces a rebuild.
+GENERATION_CACHE_KEY = 'locations:hierarchy:generation'
+
+
+class LocationSnapshot:
+    """
+    The whole county → constituency → ward tree, serialized once.
+    `body` is the JSON payload, `gzipped` the same bytes pre-compressed and
+    `version` a content hash. Each encoding gets its own strong ETag, since the
+    two bodies are not byte-for-byte the same.
+    """
+    def __init__(self, tree, generation):
+        self.tree = tree
+        self.generation = generation
+        self.body = json.dumps(tree, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.version = hashlib.sha256(self.body).hexdigest()[:20]
+        self.etag = f'"{self.version}"'
+        self.gzip_etag = f'"{self.version}-gzip"'
+
+
+_snapshot = None
+_lock = threading.Lock()
+# Inside a request the generation is read from the cache once and reused
+_request_state = threading.local()
+
+
+def build_location_tree():
+    """
+    Load the hierarchy with one query per level and nest it in Python
+    """
+    wards_by_constituency = {}
+    for ward_id, name, code, constituency_id in (
+        Ward.objects.order_by('name').values_list('id', 'name', 'code', 'constituency_id')
+    ):
+        wards_by_constituency.setdefault(constituency_id, []).append(
+            {'id': ward_id, 'name': name, 'code': code}
+        )
+
+    constituencies_by_county = {}
+    for constituency_id, name, code, county_id in (
+        Constituency.objects.order_by('name').values_list('id', 'name', 'code', 'county_id')
+    ):
+        constituencies_by_county.setdefault(county_id, []).append({
+            'id': constituency_id,
+            'name': name,
+            'code': code,
+            'wards': wards_by_constituency.get(constituency_id, []),
+        })
+
+    return [
+        {
+            'id': county_id,
+            'name': name,
+            'code': code,
+            'constituencies': constituencies_by_county.get(county_id, []),
+        }
+        for county_id, name, code in County.objects.order_by('name').values_list('id', 'name', 'code')
+    ]
+
+
+@receiver(request_started)
+def _start_request(**kwargs):
+    _request_state.active = True
+    _request_state.generation = None
+
+
+@receiver(request_finished)
+def _finish_request(**kwargs):
+    _request_state.active = False
+    _request_state.generation = None
+
+
+def _current_generation():
+    in_request = getattr(_request_state, 'active', False)
+    if in_request and _request_state.generation is not None:
+        return _request_state.generation
+    generation = cache.get_or_set(GENERATION_CACHE_KEY, lambda: uuid.uuid4().hex, timeout=None)
+    if in_request:
+        _request_state.generation = generation
+    return generation
+
+
+def get_location_snapshot():
+    """
+    Return the in-memory snapshot, rebuilding it only when the locations changed.
+    A request checks the shared generation once; later calls in it reuse that answer.
+    """
+    global _snapshot
+    generation = _current_generation()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            _snapshot = LocationSnapshot(build_location_tree(), generation)
+            logger.info(f"Built location hierarchy snapshot {_snapshot.version} ({len(_snapshot.body)} bytes)")
+        return _snapshot
+
+
+def invalidate_location_snapshot():
+    """
+    Drop the snapshot in every worker; the next read rebuilds it
+    """
+    global _snapshot
+    cache.set(GENERATION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    _request_state.generation = None
+    _snapshot = None
@@ -0,0 +1,209 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+from ..models.analytics import MembershipRollup, MembershipDailyRollup
+from ..models.membership import Membership
+from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Membership field holding the region id for each level below national
+LEVEL_FIELDS = {
+    'county': 'county_id',
+    'constituency': 'constituency_id',
+    'ward': 'ward_id',
+}
+BUCKETS = {
+    'day': TruncDate,
+    'week': TruncWeek,
+}
+
+
+def membership_contribution(membership):
+    """
+    What one membership adds to the rollups, as a hashable snapshot of the fields that matter
+    """
+    created = membership.created_at or timezone.now()
+    return (
+        membership.membership_type,
+        membership.payment_status,
+        timezone.localdate(created),
+        membership.amount or Decimal('0.00'),
+        tuple((level, getattr(membership, field)) for level, field in LEVEL_FIELDS.items()),
+    )
+
+
+def _rollup_keys(contribution):
+    membership_type, payment_status, day, amount, regions = contribution
+    yield 'national', 0
+    for level, region_id in regions:
+        if region_id:
+            yield level, region_id
+
+
+def _bump(model, keys, count, revenue):
+    # Increment in place; create the row on first use and retry if another writer beat us to it
+    updated = model.objects.filter(**keys).update(
+        member_count=F('member_count') + count,
+        revenue=F('revenue') + revenue,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(member_count=count, revenue=revenue, **keys)
+    except IntegrityError:
+        model.objects.filter(**keys).update(
+            member_count=F('member_count') + count,
+            revenue=F('revenue') + revenue,
+        )
+
+
+def apply_contribution(contribution, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one membership from every rollup it counts towards
+    """
+    membership_type, payment_status, day, amount, _ = contribution
+    for level, region_id in _rollup_keys(contribution):
+        keys = {
+            'level': level,
+            'region_id': region_id,
+            'membership_type': membership_type,
+            'payment_status': payment_status,
+        }
+        _bump(MembershipRollup, keys, sign, sign * amount)
+        _bump(MembershipDailyRollup, dict(keys, day=day), sign, sign * amount)
+
+
+def update_membership_rollups(previous, current):
+    """
+    Move a membership's contribution from `previous` to `current`; either may be None
+    """
+    if previous == current:
+        return
+    if previous is not None:
+        apply_contribution(previous, -1)
+    if current is not None:
+        apply_contribution(current, 1)
+
+
+def compute_rollups():
+    """
+    Recompute every rollup row from Membership with DB-side aggregation.
+    Returns ({key: (count, revenue)}, {key + (day,): (count, revenue)}).
+    """
+    totals = {}
+    daily = {}
+    for level, field in [('national', None)] + list(LEVEL_FIELDS.items()):
+        queryset = Membership.objects.order_by()
+        group = ['membership_type', 'payment_status']
+        if field:
+            queryset = queryset.filter(**{f'{field}__isnull': False})
+            group.append(field)
+        rows = (
+            queryset.annotate(day=TruncDate('created_at'))
+            .values(*group, 'day')
+            .annotate(member_count=Count('pk'), revenue=Sum('amount'))
+        )
+        for row in rows:
+            key = (level, row[field] if field else 0, row['membership_type'], row['payment_status'])
+            revenue = row['revenue'] or Decimal('0.00')
+            daily[key + (row['day'],)] = (row['member_count'], revenue)
+            count, total = totals.get(key, (0, Decimal('0.00')))
+            totals[key] = (count + row['member_count'], total + revenue)
+    return totals, daily
+
+
+def stored_rollups():
+    key_fields = ('level', 'region_id', 'membership_type', 'payment_status')
+    totals = {
+        tuple(row[:4]): (row[4], row[5])
+        for row in MembershipRollup.objects.values_list(*key_fields, 'member_count', 'revenue')
+    }
+    daily = {
+        tuple(row[:5]): (row[5], row[6])
+        for row in MembershipDailyRollup.objects.values_list(*key_fields, 'day', 'member_count', 'revenue')
+    }
+    return totals, daily
+
+
+def _drift(expected, stored):
+    # Rows that are wrong, missing, or left over with non-zero values
+    keys = set(expected) | set(stored)
+    zero = (0, Decimal('0.00'))
+    return sum(1 for key in keys if expected.get(key, zero) != stored.get(key, zero))
+
+
+def reconcile_membership_rollups(dry_run=False):
+    """
+    Rebuild both rollup tables from Membership; returns the number of rows that had drifted
+    """
+    with transaction.atomic():
+        expected_totals, expected_daily = compute_rollups()
+        stored_totals, stored_daily = stored_rollups()
+        drift = {
+            'totals': _drift(expected_totals, stored_totals),
+            'daily': _drift(expected_daily, stored_daily),
+        }
+        if not dry_run and any(drift.values()):
+            MembershipRollup.objects.all().delete()
+            MembershipDailyRollup.objects.all().delete()
+            MembershipRollup.objects.bulk_create([
+                MembershipRollup(level=level, region_id=region_id, membership_type=membership_type,
+                                 payment_status=payment_status, member_count=count, revenue=revenue)
+                for (level, region_id, membership_type, payment_status), (count, revenue) in expected_totals.items()
+            ], batch_size=1000)
+            MembershipDailyRollup.objects.bulk_create([
+                MembershipDailyRollup(level=level, region_id=region_id, membership_type=membership_type,
+                                      payment_status=payment_status, day=day, member_count=count, revenue=revenue)
+                for (level, region_id, membership_type, payment_status, day), (count, revenue) in expected_daily.items()
+            ], batch_size=1000)
+    if any(drift.values()):
+        logger.warning(f"Membership rollups drifted: {drift}")
+    return drift
+
+
+def region_totals(level, region_id):
+    """
+    Totals for one region, by membership type and payment status
+    """
+    rows = MembershipRollup.objects.filter(level=level, region_id=region_id).exclude(member_count=0)
+    breakdown = {}
+    total_count = 0
+    total_revenue = Decimal('0.00')
+    for row in rows:
+        breakdown.setdefault(row.membership_type, {})[row.payment_status] = {
+            'count': row.member_count,
+            'revenue': row.revenue,
+        }
+        total_count += row.member_count
+        total_revenue += row.revenue
+    return {'count': total_count, 'revenue': total_revenue, 'by_type': breakdown}
+
+
+def region_series(level, region_id, bucket='day', start=None, end=None,
+                  membership_type=None, payment_status=None):
+    """
+    Time series for one region, summed over the daily rollups into day or week buckets
+    """
+    rows = MembershipDailyRollup.objects.filter(level=level, region_id=region_id)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    if membership_type:
+        rows = rows.filter(membership_type=membership_type)
+    if payment_status:
+        rows = rows.filter(payment_status=payment_status)
+    rows = (
+        rows.annotate(bucket=BUCKETS[bucket]('day'))
+        .values('bucket')
+        .annotate(count=Sum('member_count'), revenue=Sum('revenue'))
+        .order_by('bucket')
+    )
+    return [
+        {'bucket': row['bucket'], 'count': row['count'], 'revenue': row['revenue']}
+        for row in rows
+    ]
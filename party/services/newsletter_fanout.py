@@ -0,0 +1,286 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+from ..models.newsletter import NewsletterSubscription
+from .newsletter_templates import get_recipient_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDER_LIMITS = {
+    'BACKEND': None,        # falls back to settings.EMAIL_BACKEND
+    'BATCH_SIZE': 50,       # messages handed to the backend per send_messages() call
+    'MAX_WORKERS': 4,       # concurrent batches in flight
+    'MAX_PER_SECOND': None, # messages per second across all workers, None = unlimited
+}
+
+
+def get_fanout_settings():
+    """
+    Merge NEWSLETTER_FANOUT from settings with the defaults
+    """
+    config = getattr(settings, 'NEWSLETTER_FANOUT', {})
+    provider = config.get('PROVIDER', 'default')
+    limits = dict(DEFAULT_PROVIDER_LIMITS)
+    limits.update(config.get('PROVIDERS', {}).get(provider, {}))
+    return {
+        'CHUNK_SIZE': config.get('CHUNK_SIZE', 1000),
+        'PROVIDER': provider,
+        'LIMITS': limits,
+    }
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the worker threads, refilled at `rate` tokens per second
+    """
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = float(rate) if rate else 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(float(max(self.rate, count)), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait_for = (count - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def merge_ranges(ranges):
+    """
+    Merge half-open subscriber id ranges (after_id, last_id] that overlap or touch
+    """
+    merged = []
+    for after_id, last_id in sorted(ranges):
+        if merged and after_id <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], last_id)
+        else:
+            merged.append([after_id, last_id])
+    return merged
+
+
+class BatchResult:
+    def __init__(self, index, size, sent, duration, after_id=None, last_id=None, error=None):
+        self.index = index
+        self.after_id = after_id
+        self.last_id = last_id
+        self.size = size
+        self.sent = sent
+        self.duration = duration
+        self.error = error
+
+    @property
+    def failed(self):
+        return self.size - self.sent
+
+    def as_dict(self):
+        return {
+            'index': self.index,
+            'size': self.size,
+            'sent': self.sent,
+            'failed': self.failed,
+            'duration': round(self.duration, 4),
+            'error': self.error,
+        }
+
+
+class FanoutProgress:
+    """
+    Running totals for a newsletter fan-out, updated as batches complete
+    """
+    def __init__(self, total, completed=()):
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.batches = []
+        # Subscriber id ranges (after_id, last_id] whose batches were all handed off
+        # without error, this run or an earlier one. Batches finish out of order, so
+        # a failed batch leaves a gap rather than holding back everything after it.
+        self.completed = merge_ranges(completed)
+        self.errors = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    @property
+    def checkpoint(self):
+        """
+        Highest subscriber id up to which every recipient has been handed off
+        """
+        if self.completed and self.completed[0][0] <= 0:
+            return self.completed[0][1]
+        return 0
+
+    @property
+    def processed(self):
+        return self.sent + self.failed
+
+    @property
+    def elapsed(self):
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+    def record(self, result):
+        self.batches.append(result)
+        self.sent += result.sent
+        self.failed += result.failed
+        if not result.error:
+            self.completed = merge_ranges(self.completed + [[result.after_id, result.last_id]])
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'processed': self.processed,
+            'checkpoint': self.checkpoint,
+            'completed': self.completed,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 4),
+            'batches': [batch.as_dict() for batch in self.batches],
+        }
+
+
+class NewsletterFanout:
+    """
+    Send one compiled newsletter to every active, verified subscriber.
+
+    Subscribers are streamed from the database in keyset-paginated chunks,
+    split into batches and handed to the email backend by a bounded pool
+    of worker threads, throttled to the provider's configured rate.
+    A resumed send passes the `completed` id ranges of earlier attempts
+    (FanoutProgress.completed) and only the subscribers outside them are sent to.
+    """
+    def __init__(self, subject, newsletter, from_email=None,
+                 on_progress=None, start_after=0, completed=None, config=None):
+        self.subject = subject
+        self.newsletter = newsletter
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+        self.on_progress = on_progress
+        self.completed = merge_ranges(([[0, start_after]] if start_after else []) + list(completed or []))
+        self.config = config or get_fanout_settings()
+        self.limits = self.config['LIMITS']
+        self.rate_limiter = RateLimiter(self.limits['MAX_PER_SECOND'])
+        self.progress_lock = threading.Lock()
+
+    def get_queryset(self):
+        return NewsletterSubscription.objects.filter(status='active', is_verified=True)
+
+    def get_remaining(self):
+        """
+        Subscribers not yet covered by a completed range
+        """
+        queryset = self.get_queryset()
+        for after_id, last_id in self.completed:
+            queryset = queryset.exclude(id__gt=after_id, id__lte=last_id)
+        return queryset
+
+    def iter_subscriber_chunks(self):
+        """
+        Yield lists of (id, email) ordered by id, using `id > last_id` rather than OFFSET
+        """
+        queryset = self.get_remaining().order_by('id').values_list('id', 'email')
+        chunk_size = self.config['CHUNK_SIZE']
+        last_id = 0
+        while True:
+            chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+    def iter_batches(self):
+        """
+        Yield (emails, after_id, last_id): the batch holds every remaining subscriber
+        with after_id < id <= last_id
+        """
+        batch_size = self.limits['BATCH_SIZE']
+        after_id = 0
+        for chunk in self.iter_subscriber_chunks():
+            for start in range(0, len(chunk), batch_size):
+                batch = chunk[start:start + batch_size]
+                yield [email for _, email in batch], after_id, batch[-1][0]
+                after_id = batch[-1][0]
+
+    def build_message(self, email, connection):
+        html_message, plain_message = self.newsletter.render(get_recipient_context(email))
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=plain_message,
+            from_email=self.from_email,
+            to=[email],
+            connection=connection,
+        )
+        message.attach_alternative(html_message, 'text/html')
+        return message
+
+    def send_batch(self, index, emails, after_id, last_id):
+        self.rate_limiter.acquire(len(emails))
+        started = time.monotonic()
+        try:
+            connection = get_connection(backend=self.limits['BACKEND'], fail_silently=False)
+            messages = [self.build_message(email, connection) for email in emails]
+            sent = connection.send_messages(messages) or 0
+        except Exception as e:
+            logger.error(f"Newsletter batch {index} failed ({len(emails)} recipients): {str(e)}")
+            return BatchResult(
+                index, len(emails), 0, time.monotonic() - started,
+                after_id=after_id, last_id=last_id, error=str(e),
+            )
+        # A backend that reports fewer messages than it was given dropped the rest
+        error = None
+        if sent < len(emails):
+            error = f"Backend accepted {sent} of {len(emails)} messages"
+            logger.error(f"Newsletter batch {index} incomplete: {error}")
+        return BatchResult(
+            index, len(emails), sent, time.monotonic() - started,
+            after_id=after_id, last_id=last_id, error=error,
+        )
+
+    def _record(self, progress, result):
+        with self.progress_lock:
+            progress.record(result)
+            if result.error:
+                progress.errors += 1
+        logger.info(
+            f"Newsletter batch {result.index}: {result.sent}/{result.size} sent in {result.duration:.3f}s "
+            f"({progress.processed}/{progress.total})"
+        )
+        if self.on_progress:
+            self.on_progress(progress, result)
+
+    def run(self):
+        progress = FanoutProgress(total=self.get_remaining().count(), completed=self.completed)
+        max_workers = max(1, self.limits['MAX_WORKERS'])
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for index, (emails, after_id, last_id) in enumerate(self.iter_batches()):
+                # Keep at most two batches queued per worker so memory stays bounded
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._record(progress, future.result())
+                pending.add(executor.submit(self.send_batch, index, emails, after_id, last_id))
+
+            for future in wait(pending).done:
+                self._record(progress, future.result())
+
+        progress.finished_at = time.monotonic()
+        logger.info(
+            f"Newsletter '{self.subject}' finished: {progress.sent} sent, "
+            f"{progress.failed} failed in {progress.elapsed:.2f}s"
+        )
+        return progress
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import escape, strip_tags
+from urllib.parse import quote
+import re
+import secrets
+
+# Per-recipient values that may differ between otherwise identical newsletter emails
+PERSONAL_FIELDS = ('email', 'unsubscribe_url')
+
+
+def get_unsubscribe_url(email):
+    url = getattr(settings, 'NEWSLETTER_UNSUBSCRIBE_URL', None) or f"{settings.FRONTEND_URL}/unsubscribe?email={{email}}"
+    return url.format(email=quote(email))
+
+
+def get_recipient_context(email):
+    return {
+        'email': email,
+        'unsubscribe_url': get_unsubscribe_url(email),
+    }
+
+
+class CompiledNewsletter:
+    """
+    A newsletter rendered once per campaign.
+
+    The template is rendered a single time with unique placeholder tokens in
+    place of the per-recipient fields. The HTML and its plain-text alternative
+    are then split into static segments around those tokens, so personalizing
+    an email is a string join rather than a template render plus strip_tags.
+    """
+    def __init__(self, html, markers=None):
+        markers = markers or {}
+        self.html_segments = self.split(html, markers)
+        self.plain_segments = self.split(strip_tags(html), markers)
+
+    @staticmethod
+    def split(content, markers):
+        """
+        Return a list alternating static text and field names: [text, field, text, ...]
+        """
+        if not markers:
+            return [content]
+        pattern = re.compile('|'.join(re.escape(marker) for marker in markers))
+        segments = []
+        position = 0
+        for match in pattern.finditer(content):
+            segments.append(content[position:match.start()])
+            segments.append(markers[match.group(0)])
+            position = match.end()
+        segments.append(content[position:])
+        return segments
+
+    @classmethod
+    def from_template(cls, template_name, context=None, personal_fields=PERSONAL_FIELDS):
+        token = secrets.token_hex(8)
+        # Alphanumeric markers survive autoescaping and strip_tags unchanged
+        markers = {f"NEWSLETTER{token}{field.upper()}": field for field in personal_fields}
+        context = dict(context or {})
+        context.update({field: marker for marker, field in markers.items()})
+        return cls(render_to_string(template_name, context), markers)
+
+    @classmethod
+    def from_html(cls, html):
+        return cls(html)
+
+    @staticmethod
+    def join(segments, values, escape_values):
+        if len(segments) == 1:
+            return segments[0]
+        parts = list(segments)
+        for index in range(1, len(parts), 2):
+            value = str(values.get(parts[index], ''))
+            parts[index] = escape(value) if escape_values else value
+        return ''.join(parts)
+
+    def render(self, recipient):
+        """
+        Return (html, plain) for one recipient
+        """
+        return (
+            self.join(self.html_segments, recipient, escape_values=True),
+            self.join(self.plain_segments, recipient, escape_values=False),
+        )
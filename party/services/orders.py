@@ -0,0 +1,66 @@
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from ..models.shop import Product, OrderItem
+from .pricing import quote
+from .response_cache import invalidate_model_responses
+from .stock import reserve_stock
+
+
+def parse_order_items(items_data):
+    """
+    Validate the submitted items and merge repeats; returns {product_id: quantity}
+    """
+    if not isinstance(items_data, list) or not items_data:
+        raise ValidationError({'items': 'At least one item is required.'})
+
+    quantities = {}
+    errors = {}
+    for position, item in enumerate(items_data):
+        try:
+            product_id = int(item['product'])
+            quantity = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errors[position] = 'Each item needs a product id and an integer quantity.'
+            continue
+        if quantity < 1:
+            errors[position] = 'Quantity must be at least 1.'
+            continue
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if errors:
+        raise ValidationError({'items': errors})
+    return quantities
+
+
+def load_cart(items_data):
+    """
+    Validate the items and fetch every product they reference in one query;
+    returns ({product_id: quantity}, {product_id: Product})
+    """
+    quantities = parse_order_items(items_data)
+    products = Product.objects.in_bulk(quantities.keys())
+    missing = sorted(set(quantities) - set(products))
+    if missing:
+        raise ValidationError({'items': f"Unknown product(s): {', '.join(map(str, missing))}"})
+    return quantities, products
+
+
+def place_order(serializer, user, items_data):
+    """
+    Create an order and its items atomically with a fixed number of queries:
+    one product lookup, the order insert, one bulk item insert, one stock update
+    and one bulk insert of the reservations that hold that stock until payment.
+    Line prices and the order total are computed here, never taken from the client.
+    """
+    quantities, products = load_cart(items_data)
+    order_quote = quote(quantities, products)
+
+    with transaction.atomic():
+        order = serializer.save(user=user, total_amount=order_quote.total)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=line.product, quantity=line.quantity, price=line.unit_price)
+            for line in order_quote.lines
+        ])
+        # bulk_create sends no post_save, so move the order validators here
+        invalidate_model_responses(OrderItem)
+        reserve_stock(quantities, order=order)
+    return order
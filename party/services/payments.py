@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from ..models.shop import Order
+from .jobs import enqueue, enqueue_on_commit
+from .stock import commit_reservations
+import hashlib
+import hmac
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Providers that accept payments without moving money; never registered in production
+DEVELOPMENT_PAYMENT_PROVIDERS = {
+    'fake': 'party.services.payments.FakePaymentProvider',
+}
+FINAL_PAYMENT_STATUSES = ('completed', 'failed', 'refunded')
+PAYMENT_JOB_MAX_ATTEMPTS = 3
+# Seconds during which repeated verify requests for one payment share a single job
+PAYMENT_VERIFY_INTERVAL = 60
+
+
+class PaymentResult:
+    """
+    What a provider reported about one payment. `status` is one of the
+    Order.PAYMENT_STATUS_CHOICES values; `transaction_id` is the provider's id.
+    """
+    __slots__ = ('reference', 'status', 'transaction_id', 'response')
+
+    def __init__(self, reference, status, transaction_id=None, response=None):
+        self.reference = reference
+        self.status = status
+        self.transaction_id = transaction_id
+        self.response = response
+
+
+class PaymentProvider:
+    """
+    Interface for payment providers. request_payment() runs in a background job,
+    never in a web request; the outcome normally arrives later through the
+    callback endpoint, parsed by parse_callback().
+    """
+    name = None
+
+    def request_payment(self, order):
+        raise NotImplementedError
+
+    def verify_callback(self, request):
+        raise NotImplementedError
+
+    def parse_callback(self, data):
+        raise NotImplementedError
+
+    def check_status(self, order):
+        raise NotImplementedError
+
+
+class FakePaymentProvider(PaymentProvider):
+    """
+    Local provider for development and tests. Payments are accepted at once and
+    left 'processing'; settle them by posting {'reference', 'status'} to the
+    callback URL, signed with PAYMENT_WEBHOOK_SECRET. Only available when DEBUG
+    is on or under the test runner.
+    """
+    name = 'fake'
+
+    def request_payment(self, order):
+        transaction_id = f"FAKE-{uuid.uuid4().hex[:12].upper()}"
+        return PaymentResult(order.payment_reference, 'processing', transaction_id, {
+            'provider': self.name,
+            'transaction_id': transaction_id,
+            'amount': str(order.total_amount),
+        })
+
+    def verify_callback(self, request):
+        secret = getattr(settings, 'PAYMENT_WEBHOOK_SECRET', None)
+        if not secret:
+            logger.error("PAYMENT_WEBHOOK_SECRET is not set, refusing payment callback")
+            return False
+        expected = hmac.new(secret.encode(), request.body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, request.headers.get('X-Payment-Signature', ''))
+
+    def parse_callback(self, data):
+        return PaymentResult(data.get('reference'), data.get('status'), data.get('transaction_id'), data)
+
+    def check_status(self, order):
+        return PaymentResult(order.payment_reference, order.payment_status, order.transaction_id)
+
+
+def get_payment_providers():
+    providers = {}
+    if settings.DEBUG or getattr(settings, 'TESTING', False):
+        providers.update(DEVELOPMENT_PAYMENT_PROVIDERS)
+    providers.update(getattr(settings, 'PAYMENT_PROVIDERS', {}))
+    return providers
+
+
+def get_payment_provider(name):
+    providers = get_payment_providers()
+    if name not in providers:
+        raise ValueError(f"Unknown payment provider: {name}")
+    return import_string(providers[name])()
+
+
+def default_payment_provider():
+    return getattr(settings, 'PAYMENT_PROVIDER', 'fake')
+
+
+def start_payment(order, payment_method, provider_name=None):
+    """
+    Open a new payment attempt and queue the provider request. Returns at once;
+    the provider call happens in the 'payments.request' job.
+    """
+    provider_name = provider_name or default_payment_provider()
+    get_payment_provider(provider_name)  # fail fast on an unknown provider
+    with transaction.atomic():
+        order.payment_method = payment_method
+        order.payment_provider = provider_name
+        order.payment_reference = uuid.uuid4().hex
+        order.payment_status = 'processing'
+        order.save(update_fields=[
+            'payment_method', 'payment_provider', 'payment_reference', 'payment_status', 'updated_at'
+        ])
+        enqueue_on_commit(
+            'payments.request',
+            {'order_id': order.pk, 'reference': order.payment_reference},
+            idempotency_key=f"payment:request:{order.payment_reference}",
+            max_attempts=PAYMENT_JOB_MAX_ATTEMPTS,
+        )
+    return order
+
+
+def queue_payment_verification(order):
+    """
+    Queue a 'payments.verify' job for the order's current payment attempt. Requests
+    within the same PAYMENT_VERIFY_INTERVAL window get the job already queued.
+    """
+    window = int(timezone.now().timestamp()) // PAYMENT_VERIFY_INTERVAL
+    return enqueue(
+        'payments.verify',
+        {'order_id': order.pk, 'reference': order.payment_reference},
+        idempotency_key=f"payment:verify:{order.payment_reference}:{window}",
+        max_attempts=PAYMENT_JOB_MAX_ATTEMPTS,
+    )
+
+
+def apply_payment_result(result):
+    """
+    Record a provider outcome on its order. Idempotent: a callback for an order whose
+    payment already reached a final status is acknowledged and ignored, so provider
+    retries and duplicate deliveries are harmless. Returns the order, or None if the
+    reference is unknown.
+    """
+    valid = {status for status, _ in Order.PAYMENT_STATUS_CHOICES}
+    if result.status not in valid:
+        raise ValueError(f"Unknown payment status: {result.status}")
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(payment_reference=result.reference).first()
+        if order is None:
+            logger.warning(f"Payment result for unknown reference {result.reference}")
+            return None
+        if order.payment_status in FINAL_PAYMENT_STATUSES:
+            logger.info(f"Order {order.order_number} already {order.payment_status}, ignoring {result.status}")
+            return order
+
+        order.payment_status = result.status
+        if result.transaction_id:
+            order.transaction_id = result.transaction_id
+        if result.response is not None:
+            order.payment_provider_response = result.response
+        if result.status == 'completed':
+            order.status = 'processing'
+        order.save(update_fields=[
+            'payment_status', 'status', 'transaction_id', 'payment_provider_response', 'updated_at'
+        ])
+
+        # A failed payment keeps its stock until the reservation expires, so the
+        # buyer can retry; the sweeper releases it and cancels the order after that
+        if result.status == 'completed':
+            commit_reservations(order)
+    return order
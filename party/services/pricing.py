@@ -0,0 +1,89 @@
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+CENT = Decimal('0.01')
+
+
+class ProductPrice:
+    __slots__ = ('unit_price', 'original_price', 'discount')
+
+    def __init__(self, unit_price, original_price, discount):
+        self.unit_price = unit_price
+        self.original_price = original_price
+        self.discount = discount
+
+
+class QuoteLine:
+    __slots__ = ('product', 'quantity', 'unit_price', 'original_price', 'line_total', 'line_discount')
+
+    def __init__(self, product, quantity, price):
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = price.unit_price
+        self.original_price = price.original_price
+        self.line_total = price.unit_price * quantity
+        self.line_discount = max(Decimal('0.00'), (price.original_price - price.unit_price) * quantity)
+
+    def as_dict(self):
+        return {
+            'product': self.product.pk,
+            'name': self.product.name,
+            'quantity': self.quantity,
+            'unit_price': self.unit_price,
+            'original_price': self.original_price,
+            'line_total': self.line_total,
+            'line_discount': self.line_discount,
+        }
+
+
+class Quote:
+    def __init__(self, lines):
+        self.lines = lines
+        self.subtotal = sum((line.original_price * line.quantity for line in lines), Decimal('0.00'))
+        self.discount_total = sum((line.line_discount for line in lines), Decimal('0.00'))
+        self.total = sum((line.line_total for line in lines), Decimal('0.00'))
+
+    def as_dict(self):
+        return {
+            'items': [line.as_dict() for line in self.lines],
+            'subtotal': self.subtotal,
+            'discount_total': self.discount_total,
+            'total': self.total,
+        }
+
+
+@lru_cache(maxsize=4096)
+def _compute_price(product_id, version, price, modifier_type, modifier_value):
+    # product_id and version only key the cache; the price inputs make a stale hit impossible
+    if modifier_type == 'multiply':
+        original = price * modifier_value
+    else:
+        original = price + modifier_value
+    original = original.quantize(CENT, rounding=ROUND_HALF_UP)
+    discount = int((original - price) / original * 100) if original else 0
+    return ProductPrice(price, original, discount)
+
+
+def price_product(product):
+    """
+    Selling price, list ('original') price and discount percent for a product,
+    computed once per product version (its updated_at)
+    """
+    return _compute_price(
+        product.pk,
+        product.updated_at,
+        Decimal(product.price).quantize(CENT),
+        product.price_modifier_type,
+        Decimal(product.price_modifier_value),
+    )
+
+
+def quote(quantities, products):
+    """
+    Price a cart in one pass. `quantities` is {product_id: quantity} and
+    `products` the matching {product_id: Product}, already loaded.
+    """
+    return Quote([
+        QuoteLine(products[product_id], quantity, price_product(products[product_id]))
+        for product_id, quantity in quantities.items()
+    ])
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+import gzip
+import hashlib
+import uuid
+
+DEFAULT_RESPONSE_CACHE_SETTINGS = {
+    'CACHE': 'default',      # alias holding bodies and hit counters; generations always use 'default'
+    'TIMEOUT': 300,          # seconds a cached body lives even without invalidation
+    'MAX_BODY_SIZE': 2 * 1024 * 1024,
+}
+
+GENERATION_KEY = 'respcache:gen:{label}'
+STATS_KEY = 'respcache:stats:{name}:{outcome}'
+STATS_INDEX_KEY = 'respcache:stats:views'
+
+
+def get_response_cache_settings():
+    config = dict(DEFAULT_RESPONSE_CACHE_SETTINGS)
+    config.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    return config
+
+
+def get_body_cache():
+    return caches[get_response_cache_settings()['CACHE']]
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def model_generations(models):
+    """
+    Current generation token of each model. Tokens live in the shared default
+    cache so a write in any process retires every process's entries. A missing
+    (or evicted) token is regenerated, which simply makes every key built on it miss.
+    """
+    keys = {GENERATION_KEY.format(label=_label(model)): model for model in models}
+    found = cache.get_many(list(keys))
+    tokens = []
+    for key in sorted(keys):
+        token = found.get(key)
+        if token is None:
+            token = uuid.uuid4().hex
+            # add() so two workers racing on a fresh key agree on one token
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key, token)
+        tokens.append(token)
+    return tokens
+
+
+def bump_model_generation(model):
+    cache.set(GENERATION_KEY.format(label=_label(model)), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_model_responses(model):
+    """
+    Expire every cached response built from `model`, once the current transaction commits
+    """
+    transaction.on_commit(lambda: bump_model_generation(model))
+
+
+def build_cache_key(name, path, query, accept, auth, models):
+    """
+    Key for one rendering of a view: who may see it (auth), what was asked for
+    (path, normalized query, Accept) and the data it was built from (generations)
+    """
+    raw = '|'.join([name, path, query, accept, auth, *model_generations(models)])
+    return f"respcache:body:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def store_response(key, status_code, content_type, body, headers=None):
+    config = get_response_cache_settings()
+    if len(body) > config['MAX_BODY_SIZE']:
+        return
+    get_body_cache().set(key, {
+        'status': status_code,
+        'content_type': content_type,
+        'headers': headers or {},
+        'body': body,
+        'gzipped': gzip.compress(body, compresslevel=6, mtime=0),
+    }, timeout=config['TIMEOUT'])
+
+
+def get_cached_response(key):
+    return get_body_cache().get(key)
+
+
+def record(name, outcome):
+    body_cache = get_body_cache()
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    try:
+        body_cache.incr(key)
+    except ValueError:
+        if not body_cache.add(key, 1, timeout=None):
+            body_cache.incr(key)
+        views = body_cache.get(STATS_INDEX_KEY) or []
+        if name not in views:
+            body_cache.set(STATS_INDEX_KEY, sorted(views + [name]), timeout=None)
+
+
+def response_cache_stats():
+    """
+    Hit/miss counters per cached view since the counters were last cleared. They
+    live beside the bodies, so with a per-process body cache they are this process's.
+    """
+    body_cache = get_body_cache()
+    stats = {}
+    for name in body_cache.get(STATS_INDEX_KEY) or []:
+        hits = body_cache.get(STATS_KEY.format(name=name, outcome='hit'), 0)
+        misses = body_cache.get(STATS_KEY.format(name=name, outcome='miss'), 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
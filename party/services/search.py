@@ -0,0 +1,140 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+from django.utils.html import escape
+from ..models import Event, Gallery, News, Product
+
+SEARCH_CONFIG = 'english'
+# ts_headline marks matches with control characters; the snippet text is escaped
+# before they become <mark> tags, since content_text holds unescaped text
+HIGHLIGHT_START, HIGHLIGHT_STOP = '\x02', '\x03'
+HEADLINE_OPTIONS = {
+    'start_sel': HIGHLIGHT_START,
+    'stop_sel': HIGHLIGHT_STOP,
+    'max_words': 35,
+    'min_words': 15,
+    'max_fragments': 2,
+}
+
+
+class SearchType:
+    """
+    How one model takes part in search: its weighted source fields (A ranks
+    highest), the field shown as the hit title, the field snippets are cut
+    from, and the filter limiting what the public may find. Rich-text bodies
+    are indexed through their plain-text derivative (content_text).
+    """
+    def __init__(self, model, weights, title, snippet, filters=None):
+        self.model = model
+        self.weights = weights
+        self.title = title
+        self.snippet = snippet
+        self.filters = filters or {}
+
+    def vector(self):
+        vectors = [
+            SearchVector(F(field), weight=weight, config=SEARCH_CONFIG)
+            for field, weight in self.weights
+        ]
+        document = vectors[0]
+        for vector in vectors[1:]:
+            document = document + vector
+        return document
+
+    @property
+    def fields(self):
+        return {field for field, _ in self.weights}
+
+    @property
+    def has_slug(self):
+        return any(field.name == 'slug' for field in self.model._meta.fields)
+
+
+SEARCH_TYPES = {
+    'news': SearchType(
+        News, (('title', 'A'), ('description', 'B'), ('content_text', 'C')),
+        title='title', snippet='content_text', filters={'is_published': True},
+    ),
+    'event': SearchType(
+        Event, (('title', 'A'), ('description', 'B'), ('location', 'B'), ('content_text', 'C')),
+        title='title', snippet='content_text', filters={'is_published': True},
+    ),
+    'product': SearchType(
+        Product, (('name', 'A'), ('description', 'B')),
+        title='name', snippet='description',
+    ),
+    'gallery': SearchType(
+        Gallery, (('title', 'A'), ('description', 'B')),
+        title='title', snippet='description',
+    ),
+}
+SEARCH_MODELS = {search_type.model: search_type for search_type in SEARCH_TYPES.values()}
+
+
+def update_search_vector(instance, update_fields=None):
+    """
+    Recompute one row's stored document in a single UPDATE, computed entirely in
+    the database. Saves that touched none of the indexed fields are skipped.
+    """
+    search_type = SEARCH_MODELS[type(instance)]
+    if update_fields is not None and not search_type.fields & set(update_fields):
+        return
+    type(instance).objects.filter(pk=instance.pk).update(search_vector=search_type.vector())
+
+
+def rebuild_search_vectors(model, batch_size=1000):
+    """
+    Recompute the stored documents of every row of `model`, one pk range at a time
+    """
+    search_type = SEARCH_MODELS[model]
+    last_pk = 0
+    updated = 0
+    while True:
+        pks = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return updated
+        updated += model.objects.filter(pk__in=pks).update(search_vector=search_type.vector())
+        last_pk = pks[-1]
+
+
+def highlight(snippet):
+    return escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def search(text, types=None, limit=10):
+    """
+    Ranked hits for `text` (web-search syntax: "phrases", or, -exclusions) across
+    the given search types, best first, with <mark>-highlighted snippets
+    """
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    hits = []
+    for name in types or SEARCH_TYPES:
+        search_type = SEARCH_TYPES[name]
+        values = ['pk', search_type.title] + (['slug'] if search_type.has_slug else [])
+        # The GIN index finds the matches; ts_headline is costly enough that
+        # PostgreSQL evaluates it after the LIMIT, i.e. only for returned rows
+        rows = (
+            search_type.model.objects
+            .filter(search_vector=query, **search_type.filters)
+            .annotate(
+                rank=SearchRank(F('search_vector'), query),
+                snippet=SearchHeadline(
+                    F(search_type.snippet), query,
+                    config=SEARCH_CONFIG, **HEADLINE_OPTIONS
+                ),
+            )
+            .order_by('-rank', '-pk')
+            .values(*values, 'rank', 'snippet')[:limit]
+        )
+        for row in rows:
+            hits.append({
+                'type': name,
+                'id': row['pk'],
+                'title': row[search_type.title],
+                'slug': row.get('slug'),
+                'rank': round(row['rank'], 6),
+                'snippet': highlight(row['snippet']),
+            })
+    hits.sort(key=lambda hit: hit['rank'], reverse=True)
+    return hits[:limit]
@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+from datetime import timedelta
+from rest_framework.exceptions import ValidationError
+from ..models.shop import Order, Product, StockReservation
+from .response_cache import invalidate_model_responses
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STOCK_RESERVATION_SETTINGS = {
+    'TTL': 900,            # seconds an unpaid order keeps its stock
+    'SWEEP_BATCH': 500,    # expired reservations released per sweeper transaction
+}
+
+
+def get_stock_reservation_settings():
+    config = dict(DEFAULT_STOCK_RESERVATION_SETTINGS)
+    config.update(getattr(settings, 'STOCK_RESERVATION', {}))
+    return config
+
+
+def _adjust_stock(quantities, sign):
+    """
+    Apply {product_id: quantity} to Product.stock in a single UPDATE.
+    Decrements (sign=-1) only touch rows that still have enough stock;
+    returns the number of rows changed.
+    """
+    if not quantities:
+        return 0
+    delta = Case(
+        *[When(pk=product_id, then=quantity) for product_id, quantity in quantities.items()],
+        default=0,
+    )
+    # Moving updated_at keeps the products' conditional-GET validators current
+    now = timezone.now()
+    if sign > 0:
+        changed = Product.objects.filter(pk__in=quantities).update(stock=F('stock') + delta, updated_at=now)
+        # Back from zero: the stock is now exactly what was returned
+        crossed = Q()
+        for product_id, quantity in quantities.items():
+            crossed |= Q(pk=product_id, stock=quantity)
+    else:
+        enough = Q()
+        for product_id, quantity in quantities.items():
+            enough |= Q(pk=product_id, stock__gte=quantity)
+        changed = Product.objects.filter(enough).update(stock=F('stock') - delta, updated_at=now)
+        crossed = Q(pk__in=quantities, stock=0)
+
+    # update() skips the model signals. Cached listings may show a stock count up to
+    # RESPONSE_CACHE['TIMEOUT'] old, so only a product selling out or coming back
+    # into stock retires them rather than every checkout
+    if changed and Product.objects.filter(crossed).exists():
+        invalidate_model_responses(Product)
+    return changed
+
+
+def reserve_stock(quantities, order=None, ttl=None):
+    """
+    Take stock for {product_id: quantity} and record held reservations expiring after the TTL.
+
+    The decrement is one conditional UPDATE, so concurrent checkouts can never take a
+    product below zero. If any product is short nothing is kept: must run inside the
+    caller's transaction, which the ValidationError rolls back.
+    """
+    if _adjust_stock(quantities, -1) != len(quantities):
+        short = Product.objects.filter(pk__in=quantities).values_list('pk', 'name', 'stock')
+        raise ValidationError({'items': {
+            product_id: f"Only {stock} of {name} left in stock."
+            for product_id, name, stock in short
+            if stock < quantities[product_id]
+        } or 'Stock changed while placing the order; please retry.'})
+
+    ttl = ttl if ttl is not None else get_stock_reservation_settings()['TTL']
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    return StockReservation.objects.bulk_create([
+        StockReservation(product_id=product_id, order=order, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    ])
+
+
+class StockShortage(Exception):
+    pass
+
+
+def commit_reservations(order):
+    """
+    Make an order's held stock permanent once it is paid; returns the number committed.
+    Locks the rows so a concurrent sweep cannot release them underneath us.
+
+    Reservations the sweeper already released (all of them, or only some when a
+    sweep batch split the order) take their stock again with the same guarded
+    decrement checkout uses. If some of it has been sold since, nothing is taken,
+    the stock still held goes back and the order is cancelled and flagged for a refund.
+    """
+    with transaction.atomic():
+        reservations = dict(
+            StockReservation.objects.select_for_update()
+            .filter(order=order, status__in=('held', 'released'))
+            .values_list('pk', 'status')
+        )
+        held = [pk for pk, status in reservations.items() if status == 'held']
+        released = StockReservation.objects.filter(
+            pk__in=[pk for pk, status in reservations.items() if status == 'released']
+        )
+        quantities = {
+            product_id: total
+            for product_id, total in released.order_by().values('product_id').annotate(total=Sum('quantity'))
+            .values_list('product_id', 'total')
+        }
+        if quantities:
+            try:
+                with transaction.atomic():
+                    if _adjust_stock(quantities, -1) != len(quantities):
+                        raise StockShortage
+            except StockShortage:
+                _release(StockReservation.objects.filter(pk__in=held))
+                order.status = 'cancelled'
+                order.refund_required = True
+                order.save(update_fields=['status', 'refund_required', 'updated_at'])
+                logger.error(
+                    f"Order {order.order_number} was paid after its stock was released and resold; "
+                    f"cancelled and flagged for refund"
+                )
+                return 0
+            logger.warning(f"Order {order.order_number} was paid after its reservation expired; stock taken again")
+        return StockReservation.objects.filter(pk__in=reservations).update(status='committed', updated_at=timezone.now())
+
+
+def _release(reservations):
+    quantities = {
+        product_id: total
+        for product_id, total in reservations.order_by().values('product_id').annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    }
+    _adjust_stock(quantities, 1)
+    return reservations.update(status='released', updated_at=timezone.now())
+
+
+def release_reservations(order):
+    """
+    Give back an order's held stock, e.g. when it is cancelled or its payment fails
+    """
+    with transaction.atomic():
+        held = list(
+            StockReservation.objects.select_for_update()
+            .filter(order=order, status='held')
+            .values_list('pk', flat=True)
+        )
+        return _release(StockReservation.objects.filter(pk__in=held))
+
+
+def release_expired_reservations(batch_size=None, now=None):
+    """
+    Sweep one batch of expired held reservations back into stock and cancel their
+    unpaid orders. Rows another worker has locked are skipped, so sweepers can run
+    side by side with each other and with checkout. Returns the number released.
+    """
+    batch_size = batch_size or get_stock_reservation_settings()['SWEEP_BATCH']
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = list(
+            StockReservation.objects.select_for_update(skip_locked=True)
+            .filter(status='held', expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('pk', 'order_id')[:batch_size]
+        )
+        if not expired:
+            return 0
+        released = _release(StockReservation.objects.filter(pk__in=[pk for pk, _ in expired]))
+        order_ids = {order_id for _, order_id in expired if order_id}
+        cancelled = (
+            Order.objects.filter(pk__in=order_ids, status='pending')
+            .exclude(payment_status='completed')
+            .exclude(reservations__status='held')
+            .update(status='cancelled', updated_at=now)
+        )
+        if cancelled:
+            invalidate_model_responses(Order)
+    logger.info(f"Released {released} expired stock reservations, cancelled {cancelled} orders")
+    return released
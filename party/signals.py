@@ -1,53 +1,151 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from django.template.loader import render_to_string
-from .models.news import News
-from .models.events import Event
-from .models.leadership import NationalLeadership
-from .services.email_service import EmailService
+from .models.user import User
+from .models.news import News, NewsCategory
+from .models.events import Event, EventCategory, EventRegistration
+from .models.gallery import Gallery, GalleryCategory
+from .models.leadership import NationalLeadership, LeadershipPosition
+from .models.shop import Order, OrderItem, Product, ProductCategory, Review
+from .models.locations import County, Constituency, Ward
+from .models.membership import Membership, MembershipPlan
+from .services.jobs import enqueue_on_commit
+from .services.locations import invalidate_location_snapshot
+from .services.membership_rollups import (
+    apply_contribution, membership_contribution, update_membership_rollups
+)
+from .services.response_cache import invalidate_model_responses
+from .services.search import SEARCH_MODELS, update_search_vector
+from .serializers import UserSerializer
+
+# Models behind the cached public endpoints (see ResponseCacheMixin) and the
+# generation tokens folded into conditional-GET validators (ConditionalGetMixin)
+RESPONSE_CACHE_MODELS = (
+    News, NewsCategory, Event, EventCategory, EventRegistration, Gallery, GalleryCategory,
+    NationalLeadership, LeadershipPosition, Product, ProductCategory, Review, MembershipPlan,
+    Order, OrderItem,
+)
 
 @receiver(post_save, sender=News)
 def send_news_notification(sender, instance, created, **kwargs):
     """
-    Send newsletter when new news is posted
+    Queue the newsletter when new news is posted
     """
     if created:
-        subject = f"New News: {instance.title}"
-        html_content = render_to_string('newsletter/news_notification.html', {
-            'title': instance.title,
-            'content': instance.content,
-            'date': instance.created_at,
-            'url': f"/news/{instance.id}"
-        })
-        EmailService.send_newsletter(subject, html_content)
+        enqueue_on_commit(
+            'newsletter.news',
+            {'news_id': instance.id},
+            idempotency_key=f"newsletter:news:{instance.id}"
+        )
 
 @receiver(post_save, sender=Event)
 def send_event_notification(sender, instance, created, **kwargs):
     """
-    Send newsletter when new event is created
+    Queue the newsletter when new event is created
     """
     if created:
-        subject = f"New Event: {instance.title}"
-        html_content = render_to_string('newsletter/event_notification.html', {
-            'title': instance.title,
-            'description': instance.description,
-            'date': instance.date,
-            'location': instance.location,
-            'url': f"/events/{instance.id}"
-        })
-        EmailService.send_newsletter(subject, html_content)
+        enqueue_on_commit(
+            'newsletter.event',
+            {'event_id': instance.id},
+            idempotency_key=f"newsletter:event:{instance.id}"
+        )
 
 @receiver(post_save, sender=NationalLeadership)
 def send_leadership_notification(sender, instance, created, **kwargs):
     """
-    Send newsletter when new leadership position is appointed
+    Queue the newsletter when new leadership position is appointed
     """
     if created:
-        subject = f"New Leadership Appointment: {instance.position}"
-        html_content = render_to_string('newsletter/leadership_notification.html', {
-            'position': instance.position,
-            'name': instance.name,
-            'bio': instance.bio,
-            'url': f"/leadership/{instance.id}"
-        })
-        EmailService.send_newsletter(subject, html_content) 
\ No newline at end of file
+        enqueue_on_commit(
+            'newsletter.leadership',
+            {'leader_id': instance.id},
+            idempotency_key=f"newsletter:leadership:{instance.id}"
+        )
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_product_rating(sender, instance, **kwargs):
+    """
+    Keep the product's denormalized rating totals in step with its reviews
+    """
+    Product.refresh_ratings(instance.product_id)
+
+@receiver(post_save, sender=County)
+@receiver(post_delete, sender=County)
+@receiver(post_save, sender=Constituency)
+@receiver(post_delete, sender=Constituency)
+@receiver(post_save, sender=Ward)
+@receiver(post_delete, sender=Ward)
+def invalidate_location_hierarchy(sender, instance, **kwargs):
+    """
+    Rebuild the cached location hierarchy once the change is committed
+    """
+    transaction.on_commit(invalidate_location_snapshot)
+
+@receiver(pre_save, sender=Membership)
+def remember_membership_contribution(sender, instance, **kwargs):
+    """
+    Capture what the stored row counted towards, so post_save can move it
+    """
+    previous = None
+    if instance.pk:
+        stored = Membership.objects.filter(pk=instance.pk).first()
+        if stored is not None:
+            previous = membership_contribution(stored)
+    instance._rollup_previous = previous
+
+@receiver(post_save, sender=Membership)
+def update_membership_rollup(sender, instance, **kwargs):
+    """
+    Keep the regional membership rollups in step with each create and update
+    """
+    update_membership_rollups(
+        getattr(instance, '_rollup_previous', None),
+        membership_contribution(instance),
+    )
+
+@receiver(post_delete, sender=Membership)
+def remove_membership_rollup(sender, instance, **kwargs):
+    apply_contribution(membership_contribution(instance), -1)
+
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """
+    Retire cached API responses built from the changed model
+    """
+    invalidate_model_responses(sender)
+
+for model in RESPONSE_CACHE_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'respcache:{model._meta.label_lower}')
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'respcache:{model._meta.label_lower}')
+
+# Where users are nested in cached responses: the model and its foreign key to
+# User. A user's change retires only the responses of the models they appear in.
+USER_REFERENCES = (
+    (News, 'author'), (Gallery, 'uploaded_by'), (Review, 'user'), (EventRegistration, 'user'),
+)
+# Everything a cached response can show of a user (UserSerializer, Review's name)
+DISPLAYED_USER_FIELDS = set(UserSerializer.Meta.fields)
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Most users are in no public response at all, and logins and password
+    changes touch nothing shown, so neither invalidates anything. Deleting a
+    user cascades to their rows, whose own post_delete does the invalidation.
+    """
+    if created:
+        return
+    if update_fields is not None and not DISPLAYED_USER_FIELDS & set(update_fields):
+        return
+    for model, field in USER_REFERENCES:
+        if model.objects.filter(**{field: instance.pk}).exists():
+            invalidate_model_responses(model)
+
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the stored full-text document in step with the indexed fields
+    """
+    update_search_vector(instance, update_fields)
+
+for model in SEARCH_MODELS:
+    post_save.connect(refresh_search_vector, sender=model, dispatch_uid=f'search:{model._meta.label_lower}')
@@ -0,0 +1,116 @@
+from datetime import datetime
+from django.utils import timezone
+from .models.jobs import BackgroundJob
+from .models.news import News
+from .models.events import Event
+from .models.leadership import NationalLeadership
+from .models.shop import Order
+from .services.email_service import EmailService
+from .services.jobs import task
+from .services.payments import PaymentResult, apply_payment_result, get_payment_provider
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def send_newsletter_job(job, subject, template_name, context):
+    """
+    Fan a newsletter out from inside a job, saving the completed subscriber ranges
+    after every batch so a retry only sends to the recipients still missing. Each
+    save also renews the job's lock, so a long send is not taken for a dead worker.
+    """
+    state = job.result or {}
+    previously_sent = state.get('sent', 0)
+    context = dict(context, year=datetime.now().year)
+
+    def save_progress(progress, batch):
+        job.result = {
+            'completed': progress.completed,
+            'checkpoint': progress.checkpoint,
+            'sent': previously_sent + progress.sent,
+            'failed': state.get('failed', 0) + progress.failed,
+        }
+        job.locked_at = timezone.now()
+        BackgroundJob.objects.filter(pk=job.pk).update(result=job.result, locked_at=job.locked_at)
+
+    progress = EmailService.send_newsletter(
+        subject, template_name, context,
+        on_progress=save_progress,
+        start_after=state.get('checkpoint', 0),
+        completed=state.get('completed'),
+    )
+    if progress.errors:
+        raise RuntimeError(
+            f"{progress.errors} newsletter batches failed, {len(progress.completed)} completed "
+            f"subscriber ranges saved for the retry"
+        )
+
+
+@task('newsletter.news')
+def send_news_newsletter(job):
+    news = News.objects.filter(pk=job.payload['news_id']).first()
+    if news is None:
+        logger.info(f"News {job.payload['news_id']} no longer exists, skipping newsletter")
+        return
+    send_newsletter_job(job, f"New News: {news.title}", 'newsletter/news_notification.html', {
+        'title': news.title,
+        'content': news.excerpt,
+        'date': news.created_at,
+        'url': f"/news/{news.id}",
+    })
+
+
+@task('newsletter.event')
+def send_event_newsletter(job):
+    event = Event.objects.filter(pk=job.payload['event_id']).first()
+    if event is None:
+        logger.info(f"Event {job.payload['event_id']} no longer exists, skipping newsletter")
+        return
+    send_newsletter_job(job, f"New Event: {event.title}", 'newsletter/event_notification.html', {
+        'title': event.title,
+        'description': event.description,
+        'date': event.start_date,
+        'location': event.location,
+        'url': f"/events/{event.id}",
+    })
+
+
+@task('newsletter.leadership')
+def send_leadership_newsletter(job):
+    leader = NationalLeadership.objects.select_related('position').filter(pk=job.payload['leader_id']).first()
+    if leader is None:
+        logger.info(f"Leader {job.payload['leader_id']} no longer exists, skipping newsletter")
+        return
+    send_newsletter_job(job, f"New Leadership Appointment: {leader.position}", 'newsletter/leadership_notification.html', {
+        'position': leader.position,
+        'name': leader.name,
+        'bio': leader.bio,
+        'url': f"/leadership/{leader.id}",
+    })
+
+
+@task('payments.request')
+def request_order_payment(job):
+    order = Order.objects.filter(pk=job.payload['order_id']).first()
+    if order is None or order.payment_reference != job.payload['reference']:
+        logger.info(f"Payment attempt {job.payload['reference']} is no longer current, skipping")
+        return
+    if order.payment_status != 'processing':
+        return
+    # Provider errors raise and the job retries with backoff
+    try:
+        result = get_payment_provider(order.payment_provider).request_payment(order)
+    except Exception as e:
+        # Out of retries: fail the attempt so the buyer can start a new one
+        if job.attempts >= job.max_attempts:
+            apply_payment_result(PaymentResult(order.payment_reference, 'failed', response={'error': str(e)}))
+        raise
+    apply_payment_result(result)
+
+
+@task('payments.verify')
+def verify_order_payment(job):
+    order = Order.objects.filter(pk=job.payload['order_id']).first()
+    if order is None or order.payment_reference != job.payload['reference']:
+        return
+    apply_payment_result(get_payment_provider(order.payment_provider).check_status(order))
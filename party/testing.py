@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def assert_query_budget(client, url, max_queries, method='get', **kwargs):
+    """
+    Request `url` with a test client and fail if it issues more than `max_queries`
+    database queries. Returns the response so callers can make further assertions.
+
+        response = assert_query_budget(self.client, '/api/news/', 4)
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, **kwargs)
+    executed = len(context.captured_queries)
+    if executed > max_queries:
+        queries = '\n'.join(
+            f"{index}. {query['sql']}" for index, query in enumerate(context.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f"{method.upper()} {url} ran {executed} queries, budget is {max_queries}:\n{queries}"
+        )
+    return response
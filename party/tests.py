@@ -1,3 +1,1318 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import caches
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rest_framework.test import APIClient
+from unittest import mock
+from .articles import derive_article
+from .email_backend import BrevoAPIError, BrevoEmailBackend
+from .models import User
+from .models.donate import Donation
+from .models.events import Event, EventCategory
+from .models.jobs import BackgroundJob
+from .models.analytics import MembershipRollup
+from .models.locations import Constituency, County, Ward
+from .models.membership import Membership
+from .models.news import News, NewsCategory
+from .models.newsletter import NewsletterSubscription
+from .models.shop import Order, OrderItem, Product, ProductCategory, Review
+from .services.donation_reports import parquet_available
+from .services import locations
+from .services.jobs import run_pending_jobs
+from .services.location_matching import LocationMatcher
+from .services.locations import get_location_snapshot, invalidate_location_snapshot
+from .services.membership_rollups import region_totals
+from .services.newsletter_fanout import NewsletterFanout, get_fanout_settings
+from .services.newsletter_templates import CompiledNewsletter, get_recipient_context, get_unsubscribe_url
+from .services.payments import (
+    PAYMENT_JOB_MAX_ATTEMPTS, FakePaymentProvider, PaymentResult, apply_payment_result, get_payment_provider,
+)
+from .services.pricing import price_product
+from .services.stock import release_expired_reservations, reserve_stock
+from .serializers import OrderSerializer
+from .testing import assert_query_budget
+import csv
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import threading
 
-# Create your tests here.
+WEBHOOK_SECRET = 'test-webhook-secret'
+
+
+def make_user(email='member@example.com'):
+    return User.objects.create_user(email, 'not-a-real-password')
+
+
+def make_order(user, **fields):
+    values = {
+        'order_number': f"ORD-{Order.objects.count() + 1}",
+        'payment_method': 'mpesa',
+        'total_amount': Decimal('1500.00'),
+        'shipping_address': 'Kenyatta Avenue, Nairobi',
+        'phone_number': '0700000000',
+        'email': user.email,
+    }
+    values.update(fields)
+    return Order.objects.create(user=user, **values)
+
+
+def make_product(name='Party T-shirt', stock=10, category=None, price=Decimal('800.00'), **fields):
+    if category is None:
+        category, _ = ProductCategory.objects.get_or_create(name='Merchandise', slug='merchandise')
+    # The model's price_modifier_value default is a float, which Decimal prices cannot multiply
+    fields.setdefault('price_modifier_value', Decimal('1.00'))
+    fields.setdefault('description', 'Cotton, party colours')
+    return Product.objects.create(
+        name=name, price=price,
+        image='products/shirt.jpg', category=category, stock=stock, **fields
+    )
+
+
+def make_news(title='Manifesto launch', author=None, **fields):
+    category, _ = NewsCategory.objects.get_or_create(name='Announcements', slug='announcements')
+    values = {
+        'description': 'Summary', 'preview_image': 'news/previews/n.jpg', 'content': '<p>Body</p>',
+        'is_published': True, 'category': category,
+    }
+    values.update(fields)
+    return News.objects.create(title=title, author=author or make_user(f"author-{News.objects.count()}@example.com"), **values)
+
+
+@override_settings(PAYMENT_WEBHOOK_SECRET=WEBHOOK_SECRET, SECURE_SSL_REDIRECT=False)
+class FakePaymentProviderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user()
+        self.order = make_order(
+            self.user, payment_provider='fake', payment_reference='ref-1', payment_status='processing'
+        )
+        self.url = reverse('payment-callback', kwargs={'provider': 'fake'})
+
+    def callback(self, data, secret=WEBHOOK_SECRET):
+        body = json.dumps(data).encode()
+        headers = {}
+        if secret:
+            headers['HTTP_X_PAYMENT_SIGNATURE'] = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(self.url, body, content_type='application/json', **headers)
+
+    def test_signed_callback_completes_the_order(self):
+        response = self.callback({'reference': 'ref-1', 'status': 'completed', 'transaction_id': 'T1'})
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'completed')
+        self.assertEqual(self.order.status, 'processing')
+        self.assertEqual(self.order.transaction_id, 'T1')
+
+    def test_repeated_callback_is_ignored_once_final(self):
+        self.callback({'reference': 'ref-1', 'status': 'completed'})
+        response = self.callback({'reference': 'ref-1', 'status': 'failed'})
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'completed')
+
+    def test_bad_signature_is_rejected(self):
+        response = self.callback({'reference': 'ref-1', 'status': 'completed'}, secret='wrong-secret')
+        self.assertEqual(response.status_code, 403)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'processing')
+
+    def test_unsigned_callback_is_rejected(self):
+        response = self.callback({'reference': 'ref-1', 'status': 'completed'}, secret=None)
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(PAYMENT_WEBHOOK_SECRET=None)
+    def test_callbacks_are_refused_without_a_configured_secret(self):
+        response = self.callback({'reference': 'ref-1', 'status': 'completed'}, secret=None)
+        self.assertEqual(response.status_code, 403)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'processing')
+
+    @override_settings(DEBUG=False, TESTING=False)
+    def test_fake_provider_is_not_registered_in_production(self):
+        with self.assertRaises(ValueError):
+            get_payment_provider('fake')
+        response = self.callback({'reference': 'ref-1', 'status': 'completed'})
+        self.assertEqual(response.status_code, 404)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'processing')
+
+    def test_payment_fields_are_read_only_for_the_buyer(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(
+            reverse('order-detail', kwargs={'pk': self.order.pk}),
+            {'payment_status': 'completed', 'status': 'shipped', 'transaction_id': 'FORGED'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'processing')
+        self.assertEqual(self.order.status, 'pending')
+        self.assertIsNone(self.order.transaction_id)
+
+    def test_initiated_payment_is_requested_by_the_job_and_settled_by_callback(self):
+        order = make_order(self.user)
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('order-initiate-payment', kwargs={'pk': order.pk}),
+                {'payment_method': 'mpesa', 'provider': 'fake'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 202)
+        run_pending_jobs()
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'processing')
+        self.assertTrue(order.transaction_id.startswith('FAKE-'))
+
+        self.client.force_authenticate(None)
+        self.callback({'reference': order.payment_reference, 'status': 'completed'})
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'completed')
+
+    def initiate_payment(self, order):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('order-initiate-payment', kwargs={'pk': order.pk}),
+                {'payment_method': 'mpesa', 'provider': 'fake'},
+                format='json',
+            )
+
+    def test_payment_request_out_of_retries_lets_the_buyer_retry(self):
+        order = make_order(self.user)
+        self.client.force_authenticate(self.user)
+        self.initiate_payment(order)
+        with mock.patch.object(FakePaymentProvider, 'request_payment', side_effect=RuntimeError('provider down')):
+            for _ in range(PAYMENT_JOB_MAX_ATTEMPTS):
+                BackgroundJob.objects.filter(status='pending').update(run_after=timezone.now())
+                run_pending_jobs()
+        self.assertEqual(BackgroundJob.objects.get(task='payments.request').status, 'failed')
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'failed')
+
+        first_reference = order.payment_reference
+        response = self.initiate_payment(order)
+        self.assertEqual(response.data['message'], 'Payment initiated')
+        order.refresh_from_db()
+        self.assertEqual(order.payment_status, 'processing')
+        self.assertNotEqual(order.payment_reference, first_reference)
+
+    def test_repeated_verify_requests_share_one_job(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('order-verify-payment', kwargs={'pk': self.order.pk})
+        # Pin the clock so the requests cannot straddle a verify window
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            for _ in range(3):
+                self.assertEqual(self.client.post(url).status_code, 202)
+        self.assertEqual(BackgroundJob.objects.filter(task='payments.verify').count(), 1)
+
+
+class LatePaymentTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def unpaid_order(self, product, quantity, reference):
+        order = make_order(self.user, payment_provider='fake', payment_reference=reference, payment_status='processing')
+        reserve_stock({product.pk: quantity}, order=order)
+        return order
+
+    def expire_reservations(self):
+        release_expired_reservations(now=timezone.now() + timedelta(days=1))
+
+    def test_payment_after_expiry_takes_the_stock_again(self):
+        product = make_product(stock=5)
+        order = self.unpaid_order(product, 2, 'late-1')
+        self.expire_reservations()
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 5)
+
+        apply_payment_result(PaymentResult('late-1', 'completed'))
+        product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+        self.assertEqual(order.status, 'processing')
+        self.assertFalse(order.refund_required)
+        self.assertEqual(set(order.reservations.values_list('status', flat=True)), {'committed'})
+
+    def test_payment_after_the_stock_was_resold_is_flagged_for_refund(self):
+        product = make_product(stock=2)
+        order = self.unpaid_order(product, 2, 'late-2')
+        self.expire_reservations()
+        self.unpaid_order(product, 2, 'other-buyer')
+
+        apply_payment_result(PaymentResult('late-2', 'completed'))
+        product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(order.payment_status, 'completed')
+        self.assertTrue(order.refund_required)
+
+    def split_order(self, shirts, caps, reference):
+        # Two reservations; a sweep batch of one releases only the first to expire
+        shirt, cap = make_product(stock=shirts), make_product(name='Party cap', stock=caps)
+        order = make_order(self.user, payment_provider='fake', payment_reference=reference, payment_status='processing')
+        reserve_stock({shirt.pk: 2}, order=order, ttl=60)
+        reserve_stock({cap.pk: 1}, order=order, ttl=120)
+        release_expired_reservations(batch_size=1, now=timezone.now() + timedelta(seconds=90))
+        self.assertEqual(
+            dict(order.reservations.values_list('product_id', 'status')),
+            {shirt.pk: 'released', cap.pk: 'held'},
+        )
+        return order, shirt, cap
+
+    def test_payment_after_a_partial_release_takes_the_released_stock_again(self):
+        order, shirt, cap = self.split_order(5, 5, 'split-1')
+        apply_payment_result(PaymentResult('split-1', 'completed'))
+        shirt.refresh_from_db()
+        cap.refresh_from_db()
+        self.assertEqual((shirt.stock, cap.stock), (3, 4))
+        self.assertEqual(set(order.reservations.values_list('status', flat=True)), {'committed'})
+
+    def test_partial_release_resold_returns_the_held_stock(self):
+        order, shirt, cap = self.split_order(2, 5, 'split-2')
+        self.unpaid_order(shirt, 2, 'other-buyer')
+        apply_payment_result(PaymentResult('split-2', 'completed'))
+        shirt.refresh_from_db()
+        cap.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual((shirt.stock, cap.stock), (0, 5))
+        self.assertTrue(order.refund_required)
+        self.assertEqual(set(order.reservations.values_list('status', flat=True)), {'released'})
+
+
+class StubBrevoHandler(BaseHTTPRequestHandler):
+    """
+    Answers each POST with the next queued status (201 once the queue is empty)
+    and keeps the decoded payloads for assertions
+    """
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.received.append({
+            'api_key': self.headers.get('api-key'),
+            'payload': json.loads(self.rfile.read(length)),
+        })
+        status = self.server.statuses.pop(0) if self.server.statuses else 201
+        body = json.dumps({'messageId': 'stub'} if status < 400 else {'message': 'rejected'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubBrevoMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubBrevoHandler)
+        self.server.received = []
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings = override_settings(
+            BREVO_API_KEY='test-key',
+            BREVO_EMAIL={
+                'API_URL': f"http://127.0.0.1:{self.server.server_port}/v3/smtp/email",
+                'MAX_RETRIES': 1,
+                'BACKOFF_BASE': 0,
+                'BACKOFF_MAX': 0,
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def message(self, to):
+        message = EmailMultiAlternatives('Hello', 'Plain body', 'news@example.com', [to])
+        message.attach_alternative('<p>Hello</p>', 'text/html')
+        return message
+
+
+class BrevoEmailBackendTests(StubBrevoMixin, SimpleTestCase):
+    def test_accepted_messages_are_counted(self):
+        sent = BrevoEmailBackend().send_messages([self.message('a@example.com'), self.message('b@example.com')])
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(self.server.received), 1)
+        request = self.server.received[0]
+        self.assertEqual(request['api_key'], 'test-key')
+        self.assertEqual(len(request['payload']['messageVersions']), 2)
+
+    def test_transient_failures_are_retried(self):
+        self.server.statuses = [503]
+        self.assertEqual(BrevoEmailBackend().send_messages([self.message('a@example.com')]), 1)
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_rejected_send_raises_unless_failing_silently(self):
+        self.server.statuses = [400]
+        with self.assertRaises(BrevoAPIError):
+            BrevoEmailBackend(fail_silently=False).send_messages([self.message('a@example.com')])
+        self.assertEqual(len(self.server.received), 1)  # 4xx is not retried
+
+        self.server.statuses = [400]
+        self.assertEqual(BrevoEmailBackend(fail_silently=True).send_messages([self.message('a@example.com')]), 0)
+
+    def test_exhausted_retries_raise(self):
+        self.server.statuses = [500, 500]
+        with self.assertRaises(BrevoAPIError):
+            BrevoEmailBackend().send_messages([self.message('a@example.com')])
+
+
+class NewsletterFanoutDeliveryTests(StubBrevoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            NewsletterSubscription.objects.create(
+                email=f"reader{number}@example.com", status='active', is_verified=True
+            )
+
+    def fanout(self, batch_size=50, completed=None):
+        config = get_fanout_settings()
+        config['LIMITS'] = dict(
+            config['LIMITS'], BACKEND='party.email_backend.BrevoEmailBackend',
+            BATCH_SIZE=batch_size, MAX_WORKERS=1, MAX_PER_SECOND=None,
+        )
+        return NewsletterFanout(
+            'Update', CompiledNewsletter.from_html('<p>News</p>'), completed=completed, config=config
+        )
+
+    def recipients(self):
+        return [
+            version['to'][0]['email'] for request in self.server.received
+            for version in request['payload'].get('messageVersions', [request['payload']])
+        ]
+
+    def test_provider_rejection_fails_the_batch(self):
+        self.server.statuses = [400]
+        progress = self.fanout().run()
+        self.assertEqual(progress.sent, 0)
+        self.assertEqual(progress.errors, 1)
+        self.assertEqual(progress.checkpoint, 0)
+
+    def test_accepted_batch_moves_the_checkpoint(self):
+        progress = self.fanout().run()
+        self.assertEqual(progress.sent, 3)
+        self.assertEqual(progress.errors, 0)
+        self.assertEqual(progress.checkpoint, NewsletterSubscription.objects.latest('id').id)
+
+    def test_retry_only_sends_to_the_failed_batch(self):
+        self.server.statuses = [201, 400, 201]
+        progress = self.fanout(batch_size=1).run()
+        self.assertEqual((progress.sent, progress.errors), (2, 1))
+        first, second, third = NewsletterSubscription.objects.order_by('id').values_list('id', flat=True)
+        self.assertEqual(progress.completed, [[0, first], [second, third]])
+
+        self.server.received = []
+        retry = self.fanout(batch_size=1, completed=progress.completed).run()
+        self.assertEqual((retry.sent, retry.errors), (1, 0))
+        self.assertEqual(self.recipients(), ['reader1@example.com'])
+        self.assertEqual(retry.checkpoint, third)
+
+
+class ArticleSanitizerTests(SimpleTestCase):
+    def html(self, source):
+        return derive_article(source)['html']
+
+    def test_script_urls_are_dropped(self):
+        for href in (
+            'javascript:alert(1)',
+            ' JAVASCRIPT:alert(1)',
+            'jav&#x61;script:alert(1)',
+            'jav&#x09;ascript:alert(1)',
+            'javascript&colon;alert(1)',
+            '&#106;&#97;&#118;&#97;&#115;&#99;&#114;&#105;&#112;&#116;&#58;alert(1)',
+        ):
+            with self.subTest(href=href):
+                self.assertEqual(self.html(f'<a href="{href}">x</a>'), '<a>x</a>')
+
+    def test_images_without_a_safe_source_are_dropped(self):
+        self.assertEqual(self.html('<img src="data:image/svg+xml;base64,AAAA" alt="x">'), '')
+        self.assertEqual(derive_article('<img src="javascript:alert(1)">')['images'], [])
+
+    def test_only_known_video_hosts_may_be_framed(self):
+        youtube = '<iframe src="https://www.youtube.com/embed/abc"></iframe>'
+        self.assertEqual(self.html(youtube), youtube)
+        self.assertEqual(self.html('<iframe src="http://www.youtube.com/embed/abc"></iframe>'), '')
+        self.assertEqual(self.html('<iframe src="https://evil.example.com/x"><p>fallback</p></iframe>after'), 'after')
+
+    def test_script_and_style_are_dropped_with_their_content(self):
+        article = derive_article('<p>a<script>alert(1)</script>b<style>p { color: red }</style>c</p>')
+        self.assertEqual(article['html'], '<p>abc</p>')
+        self.assertEqual(article['text'], 'abc')
+
+    def test_unsafe_styles_and_event_handlers_are_dropped(self):
+        self.assertEqual(self.html('<span style="background:url(javascript:x)" onclick="x()">s</span>'), '<span>s</span>')
+
+    def test_unclosed_tags_are_balanced(self):
+        self.assertEqual(self.html('<ul><li>one<li>two</ul>'), '<ul><li>one</li><li>two</li></ul>')
+        self.assertEqual(self.html('<p>one<p>two'), '<p>one</p><p>two</p>')
+        self.assertEqual(self.html('<div><p>unclosed'), '<div><p>unclosed</p></div>')
+
+    def test_attributes_and_text_are_escaped(self):
+        self.assertEqual(
+            self.html('<a href="/x" title=\'a"b<c\'>link</a>'),
+            '<a href="/x" title="a&quot;b&lt;c">link</a>',
+        )
+        article = derive_article('<p>1 &lt; 2 &amp; <b>bold</b></p>')
+        self.assertEqual(article['html'], '<p>1 &lt; 2 &amp; <b>bold</b></p>')
+        self.assertEqual(article['text'], '1 < 2 & bold')
+
+
+class ArticleDerivativesSaveTests(TestCase):
+    def setUp(self):
+        self.news = News.objects.create(
+            title='Devolution summit', description='Summary', preview_image='news/previews/summit.jpg',
+            content='<p>Delegates from <b>every county</b> met.</p>',
+            category=NewsCategory.objects.create(name='Events', slug='events'),
+            author=make_user(),
+        )
+
+    def test_derivatives_are_computed_on_create(self):
+        self.assertEqual(self.news.content_text, 'Delegates from every county met.')
+        self.assertEqual(self.news.word_count, 5)
+
+    def test_saving_other_fields_does_not_rerun_the_pipeline(self):
+        with mock.patch('party.models.articles.derive_article', wraps=derive_article) as pipeline:
+            news = News.objects.get(pk=self.news.pk)
+            news.title = 'Devolution summit 2026'
+            news.save()
+
+            deferred = News.objects.defer('content').get(pk=self.news.pk)
+            deferred.description = 'New summary'
+            deferred.save()
+            self.assertNotIn('content', deferred.__dict__)  # never loaded
+        pipeline.assert_not_called()
+
+    def test_changed_content_reruns_the_pipeline(self):
+        news = News.objects.defer('content').get(pk=self.news.pk)
+        news.content = '<p>Updated report</p>'
+        news.save()
+        news.refresh_from_db()
+        self.assertEqual(news.content_text, 'Updated report')
+
+
+# Budgets count only the views' own queries, so the shared database cache is
+# swapped for process-local ones that issue none
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-default'},
+    'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budget-responses'},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class QueryBudgetTests(TestCase):
+    """
+    Each endpoint renders three rows with distinct related objects, so a
+    relation loaded per row instead of up front goes over the budget
+    """
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.buyer = make_user('buyer@example.com')
+        cls.news, cls.events, cls.products, cls.orders = [], [], [], []
+        for number in range(3):
+            author = make_user(f"author{number}@example.com")
+            cls.news.append(News.objects.create(
+                title=f"News {number}", description='Summary', preview_image='news/previews/n.jpg',
+                content='<p>Body</p>', is_published=True, author=author,
+                category=NewsCategory.objects.create(name=f"News category {number}", slug=f"news-{number}"),
+            ))
+            cls.events.append(Event.objects.create(
+                title=f"Event {number}", description='Summary', preview_image='events/previews/e.jpg',
+                content='<p>Agenda</p>', is_published=True, location='Nairobi',
+                start_date=now, end_date=now + timedelta(hours=2),
+                category=EventCategory.objects.create(name=f"Event category {number}", slug=f"event-{number}"),
+            ))
+            category = ProductCategory.objects.create(name=f"Product category {number}", slug=f"product-{number}")
+            product = make_product(name=f"Product {number}", category=category)
+            Review.objects.create(product=product, user=author, rating=4, comment='Good')
+            Review.objects.create(product=product, user=cls.buyer, rating=5, comment='Great')
+            cls.products.append(product)
+        for number in range(3):
+            order = make_order(cls.buyer)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=product.price)
+                for product in cls.products
+            ])
+            cls.orders.append(order)
+
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        self.client = APIClient()
+
+    def assert_budgets(self, url, detail_url, list_budget, detail_budget):
+        response = assert_query_budget(self.client, url, list_budget)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        response = assert_query_budget(self.client, detail_url, detail_budget)
+        self.assertEqual(response.status_code, 200)
+
+    def test_news(self):
+        self.assert_budgets('/api/news/', f"/api/news/{self.news[0].pk}/", 3, 1)
+
+    def test_events(self):
+        self.assert_budgets('/api/events/', f"/api/events/{self.events[0].pk}/", 3, 1)
+
+    def test_products(self):
+        self.assert_budgets('/api/products/', f"/api/products/{self.products[0].pk}/", 4, 2)
+
+    def test_orders(self):
+        self.client.force_authenticate(self.buyer)
+        self.assert_budgets('/api/orders/', f"/api/orders/{self.orders[0].pk}/", 5, 3)
+
+
+LOCATION_TREE = [
+    {'id': 1, 'name': "Murang'a", 'constituencies': [
+        {'id': 10, 'name': 'Kiharu', 'wards': [{'id': 100, 'name': 'Township'}]},
+    ]},
+]
+
+
+class LocationMatcherMemoTests(SimpleTestCase):
+    def test_memo_is_bounded(self):
+        matcher = LocationMatcher(LOCATION_TREE, memo_size=2)
+        for spelling in ('Muranga', 'muranga ', 'Muranga!', 'MURANGA'):
+            self.assertEqual(matcher.match(spelling, 'Kiharu', 'Township').ward_id, 100)
+        for spelling in ('Nairobi', 'Mombasa', 'Kisumu'):
+            matcher.match(spelling, '', '')
+        self.assertEqual(matcher._memo.cache_info().currsize, 2)
+
+    def test_normalized_spellings_share_an_entry(self):
+        matcher = LocationMatcher(LOCATION_TREE)
+        first = matcher.match("Murang'a", 'Kiharu', '')
+        self.assertIs(matcher.match('MURANGA', 'kiharu', ''), first)
+        self.assertEqual(matcher._memo.cache_info().currsize, 1)
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class ProductRepresentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 800 marked up by 1.25 lists at 1000, so the discount is 20%
+        cls.product = make_product(price_modifier_value=Decimal('1.25'))
+        Review.objects.create(product=cls.product, user=make_user(), rating=4, comment='Good')
+
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        self.client = APIClient()
+        self.url = f"/api/products/{self.product.pk}/"
+
+    def test_default_representation_includes_prices(self):
+        for url in ('/api/products/', self.url):
+            response = self.client.get(url)
+            data = response.data['results'][0] if 'results' in response.data else response.data
+            self.assertEqual(Decimal(data['original_price']), Decimal('1000.00'))
+            self.assertEqual(data['discount'], 20)
+            self.assertEqual(data['category']['slug'], 'merchandise')
+            self.assertEqual(len(data['reviews']), 1)
+
+    def test_fields_keeps_only_the_requested_fields(self):
+        response = self.client.get(self.url, {'fields': 'id,discount'})
+        self.assertEqual(response.data, {'id': self.product.pk, 'discount': 20})
+        response = self.client.get(self.url, {'fields': 'name,original_price'})
+        self.assertEqual(set(response.data), {'name', 'original_price'})
+        self.assertEqual(Decimal(response.data['original_price']), Decimal('1000.00'))
+
+    def test_expand_renders_only_the_listed_relations(self):
+        response = self.client.get(self.url, {'expand': 'category'})
+        self.assertEqual(response.data['category']['slug'], 'merchandise')
+        self.assertEqual(response.data['reviews'], [self.product.reviews.get().pk])
+        self.assertEqual(response.data['discount'], 20)
+        response = self.client.get(self.url, {'fields': 'id,category'})
+        self.assertEqual(response.data['category'], self.product.category_id)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.shirt = make_product(stock=5)
+        self.cap = make_product(name='Party cap', stock=1)
+
+    def place(self, items, **fields):
+        data = {
+            'order_number': 'ORD-100',
+            'payment_method': 'mpesa',
+            'shipping_address': 'Kenyatta Avenue, Nairobi',
+            'phone_number': '0700000000',
+            'email': self.user.email,
+            'items': items,
+        }
+        data.update(fields)
+        return self.client.post('/api/orders/', data, format='json')
+
+    def assert_stock(self, shirt, cap):
+        self.shirt.refresh_from_db()
+        self.cap.refresh_from_db()
+        self.assertEqual((self.shirt.stock, self.cap.stock), (shirt, cap))
+
+    def test_order_takes_stock_and_holds_it(self):
+        response = self.place([{'product': self.shirt.pk, 'quantity': 2}, {'product': self.cap.pk}])
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(set(order.reservations.values_list('status', flat=True)), {'held'})
+        self.assert_stock(3, 0)
+
+    def test_overselling_order_is_rejected(self):
+        response = self.place([{'product': self.cap.pk, 'quantity': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['items'], {str(self.cap.pk): 'Only 1 of Party cap left in stock.'})
+        self.assertFalse(Order.objects.exists())
+        self.assert_stock(5, 1)
+
+    def test_one_short_item_rolls_the_whole_order_back(self):
+        response = self.place([{'product': self.shirt.pk, 'quantity': 2}, {'product': self.cap.pk, 'quantity': 3}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assert_stock(5, 1)
+
+    def test_unknown_product_places_nothing(self):
+        response = self.place([{'product': self.shirt.pk}, {'product': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assert_stock(5, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class DonationExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin@example.com', 'not-a-real-password')
+        for number, (amount, status) in enumerate([('100.00', 'completed'), ('250.50', 'completed'), ('75.00', 'failed')]):
+            Donation.objects.create(
+                amount=Decimal(amount), payment_method='mpesa', transaction_id=f"TX{number}", status=status,
+                payment_provider='mpesa', donor_name=f"Donor {number}", donor_email=f"donor{number}@example.com",
+                donor_phone='0700000000',
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get('/api/donations/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_streams_the_filtered_rows(self):
+        response, body = self.export(status='completed')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="donations-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([row['transaction_id'] for row in rows], ['TX0', 'TX1'])
+        self.assertEqual(rows[1]['amount'], '250.50')
+
+    def test_parquet_export_round_trips(self):
+        if not parquet_available():
+            self.skipTest('pyarrow is not installed')
+        import pyarrow.parquet as pq
+        with mock.patch('party.services.donation_reports.EXPORT_CHUNK_SIZE', 2):
+            response, body = self.export(output='parquet')
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column('transaction_id').to_pylist(), ['TX0', 'TX1', 'TX2'])
+        self.assertEqual(sum(table.column('amount').to_pylist()), Decimal('425.50'))
+
+    def test_export_is_admin_only(self):
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get('/api/donations/export/').status_code, 403)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PricingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # 800 sold against a list price of 1000 (x1.25) and 650 sold at list (+0)
+        self.shirt = make_product(price_modifier_value=Decimal('1.25'))
+        self.cap = make_product(
+            name='Party cap', price=Decimal('650.00'), price_modifier_type='add', price_modifier_value=Decimal('0.00'),
+        )
+
+    def test_multiply_modifier_sets_the_list_price_and_discount(self):
+        price = price_product(self.shirt)
+        self.assertEqual(price.unit_price, Decimal('800.00'))
+        self.assertEqual(price.original_price, Decimal('1000.00'))
+        self.assertEqual(price.discount, 20)
+
+    def test_add_modifier_sets_the_list_price_and_discount(self):
+        self.cap.price_modifier_value = Decimal('100.00')
+        self.cap.save()
+        price = price_product(self.cap)
+        self.assertEqual(price.original_price, Decimal('750.00'))
+        self.assertEqual(price.discount, 13)
+        self.cap.price_modifier_value = Decimal('0.00')
+        self.cap.save()
+        self.assertEqual(price_product(self.cap).discount, 0)
+
+    def test_quote_prices_the_cart(self):
+        response = self.client.post('/api/orders/quote/', {'items': [
+            {'product': self.shirt.pk, 'quantity': 2}, {'product': self.cap.pk}, {'product': self.shirt.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subtotal'], Decimal('3650.00'))
+        self.assertEqual(response.data['discount_total'], Decimal('600.00'))
+        self.assertEqual(response.data['total'], Decimal('3050.00'))
+        lines = {line['product']: line for line in response.data['items']}
+        self.assertEqual(lines[self.shirt.pk]['quantity'], 3)
+        self.assertEqual(lines[self.shirt.pk]['line_total'], Decimal('2400.00'))
+
+    def test_quote_rejects_unknown_products(self):
+        response = self.client.post('/api/orders/quote/', {'items': [{'product': 999999}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_total_is_priced_on_the_server(self):
+        user = make_user()
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/orders/', {
+            'order_number': 'ORD-200', 'payment_method': 'mpesa', 'shipping_address': 'Nairobi',
+            'phone_number': '0700000000', 'email': user.email, 'total_amount': '1.00',
+            'items': [{'product': self.shirt.pk, 'quantity': 2, 'price': '1.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('1600.00'))
+        self.assertEqual(order.items.get().price, Decimal('800.00'))
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        self.client = APIClient()
+        self.news = make_news()
+        self.url = f"/api/news/{self.news.pk}/"
+
+    def test_second_anonymous_get_is_a_hit(self):
+        miss = self.client.get(self.url)
+        self.assertEqual(miss['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            hit = self.client.get(self.url)
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['ETag'], miss['ETag'])
+
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), miss.content)
+
+    def test_query_string_and_credentials_miss(self):
+        self.client.get('/api/news/')
+        self.assertEqual(self.client.get('/api/news/', {'page': 1})['X-Cache'], 'MISS')
+        self.client.force_authenticate(make_user('reader@example.com'))
+        response = self.client.get('/api/news/', HTTP_AUTHORIZATION='Bearer token')
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_writes_retire_cached_responses(self):
+        self.client.get(self.url)
+        self.client.get('/api/news/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news.title = 'Manifesto relaunch'
+            self.news.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Manifesto relaunch')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        response = self.client.get('/api/news/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LocationSnapshotTests(TestCase):
+    def setUp(self):
+        invalidate_location_snapshot()
+        self.addCleanup(locations._finish_request)
+
+    def test_generation_is_read_once_per_request(self):
+        with mock.patch('party.services.locations.cache', wraps=locations.cache) as shared:
+            locations._start_request()
+            first = get_location_snapshot()
+            self.assertIs(get_location_snapshot(), first)
+            self.assertEqual(shared.get_or_set.call_count, 1)
+            locations._finish_request()
+
+            get_location_snapshot()
+            get_location_snapshot()
+            self.assertEqual(shared.get_or_set.call_count, 3)
+
+    def test_invalidation_inside_a_request_is_seen_at_once(self):
+        locations._start_request()
+        first = get_location_snapshot()
+        County.objects.create(name='Nakuru', code='032')
+        invalidate_location_snapshot()
+        snapshot = get_location_snapshot()
+        self.assertIsNot(snapshot, first)
+        self.assertEqual([county['name'] for county in snapshot.tree], ['Nakuru'])
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        self.user = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.orders = [make_order(self.user), make_order(self.user)]
+        self.url = f"/api/orders/{self.orders[0].pk}/"
+
+    def test_matching_validators_get_a_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(OrderSerializer, 'to_representation') as serialize:
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        serialize.assert_not_called()
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='W/"stale"').status_code, 200)
+
+        listing = self.client.get('/api/orders/')
+        self.assertEqual(self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 304)
+
+    def test_update_changes_the_etags(self):
+        detail, listing = self.client.get(self.url)['ETag'], self.client.get('/api/orders/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.orders[0].shipping_address = 'Moi Avenue, Mombasa'
+            self.orders[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], detail)
+        self.assertNotEqual(self.client.get('/api/orders/')['ETag'], listing)
+
+    def test_delete_changes_the_list_etag(self):
+        listing = self.client.get('/api/orders/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.orders[1].delete()
+        response = self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=listing)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_sweeper_cancellation_changes_the_etag(self):
+        # The sweeper cancels with update(), which sends no post_save
+        reserve_stock({make_product().pk: 1}, order=self.orders[0], ttl=0)
+        detail = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            release_expired_reservations()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'cancelled')
+
+
+@override_settings(NEWSLETTER_UNSUBSCRIBE_URL='https://example.com/unsubscribe?email={email}&s=1')
+class CompiledNewsletterTests(SimpleTestCase):
+    template = 'newsletter/news_notification.html'
+    context = {'title': 'Rally <Nakuru> & more', 'content': 'Join us', 'date': '1 May', 'url': '/news/1', 'year': 2026}
+
+    def test_rendering_matches_a_per_recipient_template_render(self):
+        newsletter = CompiledNewsletter.from_template(self.template, self.context)
+        for email in ('member@example.com', "o'brien+news@example.com"):
+            html, plain = newsletter.render(get_recipient_context(email))
+            expected = render_to_string(self.template, {**self.context, **get_recipient_context(email)})
+            self.assertEqual(html, expected)
+            self.assertEqual(plain, strip_tags(expected))
+            self.assertIn(escape(get_unsubscribe_url(email)), html)
+            self.assertIn('Rally &lt;Nakuru&gt; &amp; more', html)
+            self.assertNotIn('NEWSLETTER', html + plain)
+
+    def test_personal_values_are_escaped_in_html_only(self):
+        newsletter = CompiledNewsletter.from_html('<p>Hi</p>')
+        self.assertEqual(newsletter.render({'email': '<b>'}), ('<p>Hi</p>', 'Hi'))
+        segments = CompiledNewsletter.split('<p>Hi MARK</p>', {'MARK': 'email'})
+        self.assertEqual(segments, ['<p>Hi ', 'email', '</p>'])
+        self.assertEqual(CompiledNewsletter.join(segments, {'email': 'a&b<c>'}, escape_values=True), '<p>Hi a&amp;b&lt;c&gt;</p>')
+        self.assertEqual(CompiledNewsletter.join(segments, {'email': 'a&b<c>'}, escape_values=False), '<p>Hi a&b<c></p>')
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class ProductRatingTests(TestCase):
+    def setUp(self):
+        self.product = make_product()
+        self.reviews = [
+            Review.objects.create(product=self.product, user=make_user(f"reviewer{rating}@example.com"), rating=rating)
+            for rating in (5, 2)
+        ]
+
+    def assert_rating(self, count, average):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, count)
+        self.assertEqual(self.product.average_rating, average)
+
+    def test_reviews_keep_the_totals_in_step(self):
+        self.assert_rating(2, 3.5)
+        self.reviews[1].rating = 4
+        self.reviews[1].save()
+        self.assert_rating(2, 4.5)
+        self.reviews[0].delete()
+        self.assert_rating(1, 4)
+        self.reviews[1].delete()
+        self.assert_rating(0, None)
+
+    def test_refresh_ratings_repairs_drifted_totals(self):
+        Product.objects.filter(pk=self.product.pk).update(rating_count=9, rating_sum=9)
+        Product.refresh_ratings()
+        self.assert_rating(2, 3.5)
+
+    def test_lite_listing_drops_reviews_but_keeps_the_rating(self):
+        response = APIClient().get('/api/products/', {'lite': 'true'})
+        product = response.data['results'][0]
+        self.assertNotIn('reviews', product)
+        self.assertEqual((product['rating_count'], product['average_rating']), (2, 3.5))
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class FeedPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        author = make_user()
+        cls.news = [
+            make_news(f"News {number}", author=author, published_at=now - timedelta(hours=number))
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+        self.client = APIClient()
+
+    def titles(self, response):
+        return [item['title'] for item in response.data['results']]
+
+    def test_cursor_pages_walk_the_feed_newest_first(self):
+        first = self.client.get('/api/news/', {'pagination': 'cursor'})
+        self.assertNotIn('count', first.data)
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(second.data['next'])
+        self.assertEqual(self.titles(first) + self.titles(second), [f"News {number}" for number in range(12)])
+
+        # A row published above the cursor does not shift the next page
+        make_news('Breaking', author=self.news[0].author, published_at=timezone.now())
+        caches['responses'].clear()
+        self.assertEqual(self.titles(self.client.get(first.data['next'])), self.titles(second))
+
+    def test_count_false_skips_the_count_query(self):
+        counted = CaptureQueriesContext(connection)
+        with counted:
+            self.client.get('/api/news/', {'page': 2})
+        uncounted = CaptureQueriesContext(connection)
+        with uncounted:
+            response = self.client.get('/api/news/', {'count': 'false'})
+        self.assertEqual(len(uncounted), len(counted) - 1)
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNone(response.data['previous'])
+
+        last = self.client.get(response.data['next'])
+        self.assertEqual(self.titles(last), ['News 10', 'News 11'])
+        self.assertIsNone(last.data['next'])
+        self.assertIn('count=false', last.data['previous'])
+
+    def test_default_page_numbers_are_unchanged(self):
+        response = self.client.get('/api/news/')
+        self.assertEqual(response.data['count'], 12)
+        self.assertIn('page=2', response.data['next'])
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class LocationHierarchyTests(TestCase):
+    url = '/api/locations/hierarchy/'
+
+    def setUp(self):
+        county = County.objects.create(name='Nakuru', code='032')
+        constituency = Constituency.objects.create(name='Naivasha', code='174', county=county)
+        Ward.objects.create(name='Hells Gate', code='0868', constituency=constituency)
+        invalidate_location_snapshot()
+
+    def test_each_encoding_has_its_own_etag(self):
+        plain = self.client.get(self.url)
+        self.assertEqual(plain.json()[0]['constituencies'][0]['wards'][0]['name'], 'Hells Gate')
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertEqual(plain['ETag'], f'"{plain["X-Locations-Version"]}"')
+        self.assertEqual(gzipped['ETag'], f'"{plain["X-Locations-Version"]}-gzip"')
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+    def test_either_tag_revalidates(self):
+        plain = self.client.get(self.url)
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        for tag in (plain['ETag'], gzipped['ETag'], f'W/{plain["ETag"]}', f'"other", {gzipped["ETag"]}'):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=tag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_pinned_version_is_immutable(self):
+        version = self.client.get(self.url)['X-Locations-Version']
+        self.assertIn('must-revalidate', self.client.get(self.url)['Cache-Control'])
+        self.assertIn('immutable', self.client.get(self.url, {'v': version})['Cache-Control'])
+        self.assertIn('must-revalidate', self.client.get(self.url, {'v': 'old'})['Cache-Control'])
+
+    def test_a_location_change_moves_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            County.objects.create(name='Kajiado', code='034')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([county['name'] for county in response.json()], ['Kajiado', 'Nakuru'])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ImportLocationsTests(TestCase):
+    ROWS = [
+        ('County', 'County Code', 'Constituency', 'Constituency Code', 'Ward', 'Ward Code'),
+        ('Nakuru', '032', 'Naivasha', '174', 'Hells Gate', '0868'),
+        ('Nakuru', '032', 'Naivasha', '174', 'Olkaria', '0869'),
+        (' Nakuru ', '032', 'Gilgil', '173', 'Elementaita', '0864'),
+        ('Kajiado', '034', 'Kajiado North', '183', 'Olkeri', ''),
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'locations.csv')
+        self.write(self.ROWS)
+
+    def write(self, rows):
+        with open(self.path, 'w', newline='') as handle:
+            csv.writer(handle).writerows(rows)
+
+    def run_import(self, *args):
+        stdout = io.StringIO()
+        call_command('import_locations', self.path, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_import_creates_the_hierarchy(self):
+        output = self.run_import()
+        self.assertIn('County: 2 created, 0 updated, 0 unchanged', output)
+        self.assertIn('Ward: 4 created, 0 updated, 0 unchanged', output)
+        self.assertEqual(
+            set(Ward.objects.values_list('constituency__county__name', 'constituency__name', 'name', 'code')),
+            {
+                ('Nakuru', 'Naivasha', 'Hells Gate', '0868'), ('Nakuru', 'Naivasha', 'Olkaria', '0869'),
+                ('Nakuru', 'Gilgil', 'Elementaita', '0864'), ('Kajiado', 'Kajiado North', 'Olkeri', None),
+            },
+        )
+        self.assertEqual(len(get_location_snapshot().tree), 2)
+
+    def test_reimport_only_writes_changed_codes(self):
+        self.run_import()
+        self.assertIn('Ward: 0 created, 0 updated, 4 unchanged', self.run_import())
+
+        rows = [list(row) for row in self.ROWS]
+        rows[2][5] = '0870'
+        self.write(rows)
+        output = self.run_import()
+        self.assertIn('Ward: 0 created, 1 updated, 3 unchanged', output)
+        self.assertEqual(Ward.objects.get(name='Olkaria').code, '0870')
+        self.assertEqual(Ward.objects.count(), 4)
+
+    def test_dry_run_writes_nothing(self):
+        output = self.run_import('--dry-run')
+        self.assertIn('County: 2 created', output)
+        self.assertFalse(County.objects.exists())
+
+    def test_missing_columns_are_rejected(self):
+        self.write([('County', 'Ward'), ('Nakuru', 'Olkaria')])
+        with self.assertRaisesMessage(CommandError, 'Missing column(s): Constituency'):
+            self.run_import()
+
+
+@override_settings(CACHES=LOCAL_CACHES, SECURE_SSL_REDIRECT=False)
+class LocationSearchTests(TestCase):
+    url = '/api/locations/search/'
+
+    def setUp(self):
+        nakuru = County.objects.create(name='Nakuru', code='032')
+        town = Constituency.objects.create(name='Nakuru Town East', code='176', county=nakuru)
+        naivasha = Constituency.objects.create(name='Naivasha', code='174', county=nakuru)
+        Ward.objects.create(name='Nakuru East', code='0880', constituency=town)
+        Ward.objects.create(name='Naivasha East', code='0867', constituency=naivasha)
+        muranga = County.objects.create(name="Murang'a", code='021')
+        kiharu = Constituency.objects.create(name='Kiharu', code='107', county=muranga)
+        Ward.objects.create(name='Township', code='0535', constituency=kiharu)
+        invalidate_location_snapshot()
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['name']) for result in response.json()['results']]
+
+    def test_exact_then_prefix_then_word_matches(self):
+        self.assertEqual(self.search(q='nakuru'), [
+            ('county', 'Nakuru'),
+            ('constituency', 'Nakuru Town East'),
+            ('ward', 'Nakuru East'),
+        ])
+        # Same tier: counties before constituencies before wards, then shorter names
+        self.assertEqual(self.search(q='east'), [
+            ('constituency', 'Nakuru Town East'),
+            ('ward', 'Nakuru East'),
+            ('ward', 'Naivasha East'),
+        ])
+
+    def test_results_carry_their_path(self):
+        result = self.client.get(self.url, {'q': 'township'}).json()['results'][0]
+        self.assertEqual(result['path'], "Murang'a › Kiharu › Township")
+        self.assertEqual(result['county']['name'], "Murang'a")
+        self.assertEqual(result['code'], '0535')
+
+    def test_apostrophes_and_case_are_folded(self):
+        self.assertEqual(self.search(q='MURANGA'), [('county', "Murang'a")])
+
+    def test_misspellings_fall_back_to_trigrams(self):
+        self.assertEqual(self.search(q='naivsha')[0], ('constituency', 'Naivasha'))
+
+    def test_type_and_limit(self):
+        self.assertEqual(self.search(q='na', type='ward'), [('ward', 'Nakuru East'), ('ward', 'Naivasha East')])
+        self.assertEqual(len(self.search(q='na', limit=2)), 2)
+        self.assertEqual(self.client.get(self.url, {'q': 'na', 'type': 'village'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'na', 'limit': 'ten'}).status_code, 400)
+        self.assertEqual(self.search(q=''), [])
+
+
+class MembershipRollupTests(TestCase):
+    def setUp(self):
+        self.county = County.objects.create(name='Nakuru', code='032')
+        self.constituency = Constituency.objects.create(name='Naivasha', code='174', county=self.county)
+        self.ward = Ward.objects.create(name='Hells Gate', code='0868', constituency=self.constituency)
+        self.other_ward = Ward.objects.create(name='Olkaria', code='0869', constituency=self.constituency)
+
+    def join(self, **fields):
+        values = {
+            'email': 'member@example.com', 'membership_type': 'gold',
+            'county': self.county, 'constituency': self.constituency, 'ward': self.ward,
+        }
+        values.update(fields)
+        return Membership.objects.create(**values)
+
+    def status_count(self, level, region_id, payment_status, membership_type='gold'):
+        by_type = region_totals(level, region_id)['by_type']
+        return by_type.get(membership_type, {}).get(payment_status, {}).get('count', 0)
+
+    def test_new_membership_counts_at_every_level(self):
+        self.join(payment_status='completed')
+        for level, region_id in (('national', 0), ('county', self.county.pk),
+                                 ('constituency', self.constituency.pk), ('ward', self.ward.pk)):
+            totals = region_totals(level, region_id)
+            self.assertEqual(totals['count'], 1, level)
+            self.assertEqual(totals['revenue'], Decimal('25000.00'), level)
+        self.assertEqual(region_totals('ward', self.other_ward.pk)['count'], 0)
+
+    def test_updates_move_the_contribution(self):
+        membership = self.join()
+        self.assertEqual(self.status_count('national', 0, 'pending'), 1)
+
+        membership.payment_status = 'completed'
+        membership.ward = self.other_ward
+        membership.save()
+        self.assertEqual(self.status_count('national', 0, 'pending'), 0)
+        self.assertEqual(self.status_count('national', 0, 'completed'), 1)
+        self.assertEqual(region_totals('ward', self.ward.pk)['count'], 0)
+        self.assertEqual(region_totals('ward', self.other_ward.pk)['count'], 1)
+        self.assertEqual(region_totals('constituency', self.constituency.pk)['count'], 1)
+
+    def test_delete_removes_the_contribution(self):
+        membership = self.join(payment_status='completed')
+        self.join(email='second@example.com', membership_type='bronze', payment_status='completed')
+        membership.delete()
+        totals = region_totals('county', self.county.pk)
+        self.assertEqual(totals['count'], 1)
+        self.assertEqual(totals['revenue'], Decimal('5000.00'))
+
+    def test_reconcile_repairs_drift(self):
+        self.join(payment_status='completed')
+        self.join(email='second@example.com', membership_type='bronze')
+        MembershipRollup.objects.filter(level='county').update(member_count=99)
+
+        stdout = io.StringIO()
+        with self.assertLogs('party.services.membership_rollups', 'WARNING'):
+            call_command('reconcile_membership_rollups', '--dry-run', stdout=stdout)
+        self.assertIn('Drifted rows: 2 totals, 0 daily', stdout.getvalue())
+        self.assertEqual(region_totals('county', self.county.pk)['count'], 198)
+
+        stdout = io.StringIO()
+        with self.assertLogs('party.services.membership_rollups', 'WARNING'):
+            call_command('reconcile_membership_rollups', stdout=stdout)
+        self.assertIn('Rollups rebuilt', stdout.getvalue())
+        self.assertEqual(region_totals('county', self.county.pk)['count'], 2)
+        self.assertEqual(self.status_count('ward', self.ward.pk, 'pending', 'bronze'), 1)
+
+        stdout = io.StringIO()
+        call_command('reconcile_membership_rollups', stdout=stdout)
+        self.assertIn('Rollups already consistent', stdout.getvalue())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SiteSearchTests(TestCase):
+    url = '/api/search/'
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_title_matches_outrank_body_matches(self):
+        body = make_news('Weekend rally', content='<p>Our manifesto covers <em>healthcare</em> and roads.</p>')
+        title = make_news('Manifesto launch', content='<p>Details to follow.</p>')
+        make_news('Draft manifesto', is_published=False)
+        results = self.search(q='manifesto', type='news')
+        self.assertEqual([hit['id'] for hit in results], [title.pk, body.pk])
+        self.assertEqual(results[0]['slug'], title.slug)
+        self.assertIn('<mark>manifesto</mark>', results[1]['snippet'])
+
+    def test_products_are_found_and_snippets_escaped(self):
+        shirt = make_product(description='Cotton & linen tee in party colours')
+        make_product(name='Campaign cap', description='Adjustable')
+        results = self.search(q='cotton', type='product')
+        self.assertEqual([(hit['type'], hit['id']) for hit in results], [('product', shirt.pk)])
+        self.assertEqual(results[0]['title'], 'Party T-shirt')
+        self.assertIn('<mark>Cotton</mark> &amp; linen', results[0]['snippet'])
+
+    def test_types_are_mixed_by_rank(self):
+        make_news('Party colours explained', content='<p>Why green.</p>')
+        make_product()
+        self.assertEqual({hit['type'] for hit in self.search(q='colours')}, {'news', 'product'})
+        self.assertEqual({hit['type'] for hit in self.search(q='colours', type='product')}, {'product'})
+        self.assertEqual(self.search(q='colours -party', type='news'), [])
+
+    def test_rebuild_picks_up_bulk_updates(self):
+        product = make_product()
+        Product.objects.filter(pk=product.pk).update(name='Rally scarf')
+        self.assertEqual(self.search(q='scarf'), [])
+        call_command('rebuild_search_vectors', '--type', 'product', stdout=io.StringIO())
+        self.assertEqual([hit['id'] for hit in self.search(q='scarf')], [product.pk])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'news,poll'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'limit': 'all'}).status_code, 400)
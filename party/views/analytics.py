@@ -0,0 +1,91 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from django.utils.dateparse import parse_date
+from ..models.analytics import REGION_LEVELS
+from ..services.membership_rollups import BUCKETS, region_series, region_totals
+from ..services.response_cache import response_cache_stats
+
+LEVELS = [level for level, _ in REGION_LEVELS]
+
+
+def _region(request):
+    """
+    Read ?level= and ?region= ; returns (level, region_id, error_response)
+    """
+    level = request.query_params.get('level', 'national')
+    if level not in LEVELS:
+        return None, None, Response(
+            {'error': f"level must be one of: {', '.join(LEVELS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if level == 'national':
+        return level, 0, None
+    try:
+        region_id = int(request.query_params['region'])
+    except (KeyError, ValueError):
+        return None, None, Response(
+            {'error': f"region (a {level} id) is required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return level, region_id, None
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def membership_totals(request):
+    """
+    Membership count and revenue for a region, split by membership type and payment status
+    """
+    level, region_id, error = _region(request)
+    if error:
+        return error
+    return Response({'level': level, 'region': region_id, **region_totals(level, region_id)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def membership_series(request):
+    """
+    Daily or weekly membership series for a region: ?bucket=day|week&start=YYYY-MM-DD&end=YYYY-MM-DD
+    """
+    level, region_id, error = _region(request)
+    if error:
+        return error
+    bucket = request.query_params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return Response(
+            {'error': f"bucket must be one of: {', '.join(BUCKETS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    dates = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        dates[name] = parse_date(value) if value else None
+        if value and dates[name] is None:
+            return Response({'error': f"{name} must be a date (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+    series = region_series(
+        level, region_id, bucket=bucket, start=dates['start'], end=dates['end'],
+        membership_type=request.query_params.get('membership_type'),
+        payment_status=request.query_params.get('payment_status'),
+    )
+    return Response({'level': level, 'region': region_id, 'bucket': bucket, 'series': series})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_metrics(request):
+    """
+    Hit/miss counts of the public response cache, per view
+    """
+    views = response_cache_stats()
+    hits = sum(view['hits'] for view in views.values())
+    misses = sum(view['misses'] for view in views.values())
+    return Response({
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'views': views,
+    })
@@ -0,0 +1,73 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from ..services.locations import get_location_snapshot
+from ..services.location_search import get_location_search_index, KIND_ORDER
+
+# Clients revalidate with If-None-Match; a request pinned to the current
+# version (?v=<version>) can be cached for good since that URL never changes
+REVALIDATE_CACHE_CONTROL = 'public, max-age=300, must-revalidate'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+
+def _etag_matches(header, etags):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') in etags for tag in header.split(','))
+
+
+@require_safe
+def location_hierarchy(request):
+    """
+    Serve the full county → constituency → ward tree from the in-memory snapshot
+    """
+    snapshot = get_location_snapshot()
+    pinned = request.GET.get('v') == snapshot.version
+    gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+    etag = snapshot.gzip_etag if gzipped else snapshot.etag
+
+    # Either encoding's tag proves the client holds the current version
+    if _etag_matches(request.headers.get('If-None-Match'), (snapshot.etag, snapshot.gzip_etag)):
+        response = HttpResponseNotModified()
+    elif gzipped:
+        response = HttpResponse(snapshot.gzipped, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(snapshot.body, content_type='application/json')
+
+    response['ETag'] = etag
+    response['X-Locations-Version'] = snapshot.version
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if pinned else REVALIDATE_CACHE_CONTROL
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def location_search(request):
+    """
+    Typeahead over counties, constituencies and wards: ?q=<text>[&type=ward][&limit=10]
+    """
+    query = request.query_params.get('q', '')
+    kind = request.query_params.get('type') or None
+    if kind is not None and kind not in KIND_ORDER:
+        return Response(
+            {'error': f"type must be one of: {', '.join(KIND_ORDER)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = get_location_search_index().search(query, limit=max(limit, 1), kind=kind)
+    return Response({'query': query, 'results': results})
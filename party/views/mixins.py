@@ -0,0 +1,212 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, urlencode
+from functools import partial
+from ..serializers import SparseFieldsMixin, sparse_params
+from ..services.response_cache import (
+    build_cache_key, get_cached_response, model_generations, record, store_response
+)
+from rest_framework.response import Response
+import hashlib
+
+
+class QueryPlanMixin:
+    """
+    Apply the serializer's declared query plan (select_related / prefetch_related / only)
+    to every queryset the view serializes. Hooked into filter_queryset so it also covers
+    get_object() and views that build their queryset without calling super().
+    Serializers with sparse fieldsets get the request's ?fields= / ?expand= as well.
+    """
+    def get_required_columns(self, model):
+        """
+        Columns the view itself reads from each row: the conditional-GET validator
+        and the keyset cursor position
+        """
+        names = [getattr(self, 'modified_field', None)]
+        names += [name.lstrip('-') for name in getattr(self, 'cursor_ordering', None) or ()]
+        opts = model._meta
+        required = []
+        for name in names:
+            try:
+                required.append(opts.get_field(name).name)
+            except (FieldDoesNotExist, TypeError):
+                continue
+        return required
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'setup_eager_loading'):
+            return queryset
+        fields, expand = sparse_params(self.request)
+        if issubclass(serializer_class, SparseFieldsMixin) and (fields is not None or expand):
+            return serializer_class.setup_eager_loading(
+                queryset, fields, expand, required=self.get_required_columns(queryset.model)
+            )
+        return serializer_class.setup_eager_loading(queryset)
+
+
+# Response headers kept with a cached body and replayed on hits
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+class ResponseCacheMixin:
+    """
+    Serve anonymous GETs from a cache of rendered (and pre-gzipped) response bodies.
+    `cache_models` lists every model the response is built from; saving or deleting
+    any of them bumps its generation and so retires the cached bodies. Requests that
+    carry credentials bypass the cache, as do all writes.
+    """
+    cache_models = ()
+
+    def get_response_cache_auth(self, request):
+        # Only the anonymous rendering is cached; authentication is JWT-only, so
+        # a request without an Authorization header is anonymous
+        if request.method != 'GET' or not self.cache_models or 'HTTP_AUTHORIZATION' in request.META:
+            return None
+        return 'anonymous'
+
+    def dispatch(self, request, *args, **kwargs):
+        auth = self.get_response_cache_auth(request)
+        if auth is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        name = type(self).__name__
+        key = build_cache_key(
+            name,
+            # Absolute, since paginated bodies embed absolute next/previous links
+            request.build_absolute_uri(request.path),
+            urlencode(sorted(request.GET.lists()), doseq=True),
+            request.headers.get('Accept', ''),
+            auth,
+            self.cache_models,
+        )
+        accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+
+        entry = get_cached_response(key)
+        if entry is not None:
+            record(name, 'hit')
+            return self.cached_response(request, entry, accepts_gzip)
+
+        record(name, 'miss')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, 'render'):
+                response.render()
+            store_response(key, response.status_code, response['Content-Type'], response.content, {
+                header: response[header] for header in CACHED_HEADERS if response.has_header(header)
+            })
+        response['X-Cache'] = 'MISS'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+    def cached_response(self, request, entry, accepts_gzip):
+        headers = entry.get('headers', {})
+        # The stored validators stay current for as long as the entry does
+        not_modified = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+        )
+        if not_modified is not None:
+            response = not_modified
+        elif accepts_gzip:
+            response = HttpResponse(entry['gzipped'], status=entry['status'], content_type=entry['content_type'])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(entry['body'], status=entry['status'], content_type=entry['content_type'])
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Emit validators on list and detail GETs and answer If-None-Match /
+    If-Modified-Since with 304 before anything is serialized.
+
+    A list's ETag comes from one MAX(updated_at) / COUNT query over the filtered
+    queryset, a detail's from the row's own updated_at (also sent as Last-Modified).
+    Both fold in get_validator_tokens() - by default the generation tokens of the
+    view's `cache_models` - so edits to nested models change the ETag too. Models
+    without `modified_field` rely on those tokens alone and get no validators
+    when the view has none.
+    """
+    modified_field = 'updated_at'
+
+    def get_validator_tokens(self):
+        models = getattr(self, 'cache_models', ())
+        return model_generations(models) if models else []
+
+    def has_modified_field(self, model):
+        try:
+            model._meta.get_field(self.modified_field)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def make_etag(self, tokens, *parts):
+        user = self.request.user
+        raw = '|'.join(str(part) for part in (
+            type(self).__name__,
+            self.request.accepted_renderer.format,
+            user.pk if user.is_authenticated else '',
+            *tokens,
+            *parts,
+        ))
+        return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+    def list_validators(self, queryset):
+        """
+        (etag, last_modified) for a list. No Last-Modified here: a delete lowers
+        the count without moving MAX(updated_at), which only the ETag notices.
+        """
+        tokens = self.get_validator_tokens()
+        if self.has_modified_field(queryset.model):
+            stats = queryset.order_by().aggregate(modified=Max(self.modified_field), count=Count('pk'))
+            return self.make_etag(tokens, stats['modified'], stats['count']), None
+        if tokens:
+            return self.make_etag(tokens), None
+        return None, None
+
+    def detail_validators(self, instance):
+        tokens = self.get_validator_tokens()
+        modified = getattr(instance, self.modified_field, None)
+        if modified is None and not tokens:
+            return None, None
+        return self.make_etag(tokens, instance.pk, modified), modified
+
+    def respond_conditionally(self, request, validators, render):
+        etag, last_modified = validators
+        if etag is None and last_modified is None:
+            return render()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # Keep a copy but check back every time; per-user answers stay out of shared caches
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        validators = self.list_validators(self.filter_queryset(self.get_queryset()))
+        return self.respond_conditionally(request, validators, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.respond_conditionally(
+            request,
+            self.detail_validators(instance),
+            lambda: Response(self.get_serializer(instance).data),
+        )
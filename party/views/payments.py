@@ -0,0 +1,34 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from ..services.payments import apply_payment_result, get_payment_provider
+import logging
+
+logger = logging.getLogger(__name__)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def payment_callback(request, provider):
+    """
+    Receive a provider's payment outcome. Safe to deliver more than once.
+    """
+    try:
+        payment_provider = get_payment_provider(provider)
+    except ValueError:
+        return Response({'error': 'Unknown provider'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not payment_provider.verify_callback(request):
+        logger.warning(f"Rejected {provider} payment callback with a bad signature")
+        return Response({'error': 'Invalid signature'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        result = payment_provider.parse_callback(request.data)
+        order = apply_payment_result(result)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if order is None:
+        return Response({'error': 'Unknown payment reference'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({'received': True, 'payment_status': order.payment_status})
@@ -0,0 +1,34 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from ..services.search import SEARCH_TYPES, search
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def site_search(request):
+    """
+    Full-text search over news, events, products and gallery:
+    ?q=<text>[&type=news,event][&limit=10]
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    types = [name for name in request.query_params.get('type', '').split(',') if name] or None
+    unknown = [name for name in types or [] if name not in SEARCH_TYPES]
+    if unknown:
+        return Response(
+            {'error': f"type must be among: {', '.join(SEARCH_TYPES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'query': query, 'results': search(query, types=types, limit=max(limit, 1))})
@@ -1,76 +1,47 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
-from ..models.shop import Product, Order, OrderItem, ProductCategory, Review, PickupLocation
-from ..serializers import (
-    ProductSerializer, OrderSerializer, OrderItemSerializer,
-    ProductCategorySerializer, ReviewSerializer, PickupLocationSerializer
-)
+from rest_framework.reverse import reverse
+from rest_framework.permissions import IsAuthenticated
+from ..models.shop import Order, OrderItem, PickupLocation
+from ..serializers import OrderSerializer, PickupLocationSerializer
 from rest_framework.permissions import AllowAny
+from ..services.orders import load_cart, place_order
+from ..services.pricing import quote
+from ..services.payments import FINAL_PAYMENT_STATUSES, queue_payment_verification, start_payment
+from .mixins import ConditionalGetMixin, QueryPlanMixin
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
-    lookup_field = 'slug'
-
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        return queryset.prefetch_related('reviews')
-
-    @action(detail=True, methods=['post'])
-    def add_review(self, request, slug=None):
-        product = self.get_object()
-        user = request.user
-        
-        # Check if user has already reviewed this product
-        existing_review = Review.objects.filter(product=product, user=user).first()
-        if existing_review:
-            return Response(
-                {'error': 'You have already reviewed this product'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        serializer = ReviewSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save(product=product, user=user)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    @action(detail=True, methods=['get'])
-    def reviews(self, request, slug=None):
-        product = self.get_object()
-        reviews = product.reviews.all()
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
-
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-created_at',)
+    # Not response-cached (every request is authenticated); the generations only
+    # feed the ETags, so writes that skip signals still change them
+    cache_models = (Order, OrderItem)
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        order = serializer.save(user=self.request.user)
-        
-        # Create order items
-        items_data = self.request.data.get('items', [])
-        for item_data in items_data:
-            item_data['order'] = order.id
-            item_serializer = OrderItemSerializer(data=item_data)
-            if item_serializer.is_valid():
-                item_serializer.save()
-            else:
-                order.delete()
-                return Response(
-                    item_serializer.errors,
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # Invalid items or short stock raise ValidationError and roll the whole order back
+        place_order(serializer, self.request.user, self.request.data.get('items', []))
+
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def quote(self, request):
+        """
+        Price a cart without placing it: same items payload as order creation
+        """
+        quantities, products = load_cart(request.data.get('items', []))
+        return Response(quote(quantities, products).as_dict())
+
+    def payment_state(self, order, message):
+        return {
+            'message': message,
+            'order_id': order.id,
+            'status': order.status,
+            'payment_status': order.payment_status,
+            'status_url': reverse('order-payment-status', kwargs={'pk': order.pk}, request=self.request),
+        }
 
     @action(detail=True, methods=['post'])
     def initiate_payment(self, request, pk=None):
@@ -82,44 +53,50 @@ class OrderViewSet(viewsets.ModelViewSet):
                 {'error': 'Payment method is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Here you would integrate with your payment provider (e.g., M-PESA)
-        # For now, we'll just update the order status
-        order.payment_method = payment_method
-        order.status = 'processing'
-        order.save()
-        
-        return Response({
-            'message': 'Payment initiated',
-            'order_id': order.id,
-            'status': order.status
-        })
+        if payment_method not in dict(Order.PAYMENT_METHODS):
+            return Response(
+                {'error': f"Unsupported payment method: {payment_method}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if order.status == 'cancelled':
+            return Response(
+                {'error': 'This order has been cancelled'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Repeated clicks while a payment is in flight (or done) don't start another
+        if order.payment_status in ('processing', 'completed'):
+            return Response(self.payment_state(order, 'Payment already in progress'), status=status.HTTP_202_ACCEPTED)
+
+        try:
+            start_payment(order, payment_method, request.data.get('provider'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.payment_state(order, 'Payment initiated'), status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def payment_status(self, request, pk=None):
+        order = self.get_object()
+        return Response(self.payment_state(order, f"Payment {order.payment_status}"))
 
     @action(detail=True, methods=['post'])
     def verify_payment(self, request, pk=None):
+        """
+        Ask the provider for the payment's current state in the background.
+        The outcome is never taken from the client.
+        """
         order = self.get_object()
-        transaction_id = request.data.get('transaction_id')
-        
-        if not transaction_id:
+        if order.payment_reference is None:
             return Response(
-                {'error': 'Transaction ID is required'},
+                {'error': 'No payment has been initiated for this order'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Here you would verify the payment with your payment provider
-        # For now, we'll just update the order status
-        order.transaction_id = transaction_id
-        order.payment_status = 'completed'
-        order.status = 'processing'
-        order.save()
-        
-        return Response({
-            'message': 'Payment verified',
-            'order_id': order.id,
-            'status': order.status
-        })
+        if order.payment_status in FINAL_PAYMENT_STATUSES:
+            return Response(self.payment_state(order, f"Payment {order.payment_status}"))
+
+        queue_payment_verification(order)
+        return Response(self.payment_state(order, 'Verification queued'), status=status.HTTP_202_ACCEPTED)
 
-class PickupLocationViewSet(viewsets.ModelViewSet):
+class PickupLocationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PickupLocation.objects.filter(is_active=True)
     serializer_class = PickupLocationSerializer
     http_method_names = ['get']  # Only allow GET requests for pickup locations 
@@ -1,27 +1,37 @@
 from django.shortcuts import render
 from rest_framework import generics, status, permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth import get_user_model, authenticate
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.http import StreamingHttpResponse
 from ..models import (
     User, News, NewsCategory, Event, EventCategory, EventRegistration, Gallery, GalleryCategory,
-    NationalLeadership, LeadershipPosition, Donation, Product, ProductCategory, Order, OrderItem,
-    MembershipPlan, Membership
+    NationalLeadership, LeadershipPosition, Donation, Product, ProductCategory, OrderItem,
+    MembershipPlan, Membership, Review
 )
 from ..serializers import (
     UserRegistrationSerializer, UserSerializer,
     NewsSerializer, NewsCategorySerializer,
     EventSerializer, EventCategorySerializer, EventRegistrationSerializer,
     GallerySerializer, GalleryCategorySerializer, NationalLeadershipSerializer,
-    LeadershipPositionSerializer, DonationSerializer, ProductSerializer,
-    ProductCategorySerializer, OrderSerializer, OrderItemSerializer,
+    LeadershipPositionSerializer, DonationSerializer, ProductSerializer, ProductListSerializer,
+    ProductCategorySerializer, OrderItemSerializer,
     MembershipPlanSerializer, MembershipSerializer, CountySerializer, CountyDetailSerializer
 )
 from ..models.locations import County, Constituency, Ward
 from ..serializers import ConstituencySerializer, WardSerializer
+from ..services.donation_reports import (
+    donation_summary, filter_donations, parquet_available,
+    stream_donations_csv, stream_donations_parquet
+)
+from ..services.locations import get_location_snapshot
+from .mixins import ConditionalGetMixin, QueryPlanMixin, ResponseCacheMixin
 
 User = get_user_model()
 
@@ -77,15 +87,18 @@ class LoginView(APIView):
             }, status=status.HTTP_401_UNAUTHORIZED)
 
 # News Views
-class NewsCategoryViewSet(viewsets.ModelViewSet):
+class NewsCategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = NewsCategory.objects.all()
     serializer_class = NewsCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (NewsCategory,)
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(ResponseCacheMixin, ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = News.objects.filter(is_published=True)
     serializer_class = NewsSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (News, NewsCategory)
+    cursor_ordering = ('-published_at', '-created_at')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -97,21 +110,23 @@ class NewsViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class NewsDetailView(generics.RetrieveUpdateDestroyAPIView):
+class NewsDetailView(ConditionalGetMixin, QueryPlanMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = News.objects.all()
     serializer_class = NewsSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 # Event Views
-class EventCategoryViewSet(viewsets.ModelViewSet):
+class EventCategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = EventCategory.objects.all()
     serializer_class = EventCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (EventCategory,)
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ResponseCacheMixin, ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Event.objects.filter(is_published=True)
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Event, EventCategory, EventRegistration)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -120,7 +135,7 @@ class EventViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category__slug=category)
         return queryset
 
-class EventRegistrationViewSet(viewsets.ModelViewSet):
+class EventRegistrationViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     serializer_class = EventRegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -131,15 +146,18 @@ class EventRegistrationViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 # Gallery Views
-class GalleryCategoryViewSet(viewsets.ModelViewSet):
+class GalleryCategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = GalleryCategory.objects.all()
     serializer_class = GalleryCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (GalleryCategory,)
 
-class GalleryViewSet(viewsets.ModelViewSet):
+class GalleryViewSet(ResponseCacheMixin, ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Gallery.objects.all()
     serializer_class = GallerySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Gallery, GalleryCategory)
+    cursor_ordering = ('-created_at',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -152,15 +170,17 @@ class GalleryViewSet(viewsets.ModelViewSet):
         serializer.save(uploaded_by=self.request.user)
 
 # Leadership Views
-class LeadershipPositionViewSet(viewsets.ModelViewSet):
+class LeadershipPositionViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = LeadershipPosition.objects.all()
     serializer_class = LeadershipPositionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (LeadershipPosition,)
 
-class NationalLeadershipViewSet(viewsets.ModelViewSet):
+class NationalLeadershipViewSet(ResponseCacheMixin, ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = NationalLeadership.objects.filter(is_active=True)
     serializer_class = NationalLeadershipSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (NationalLeadership, LeadershipPosition)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -170,10 +190,11 @@ class NationalLeadershipViewSet(viewsets.ModelViewSet):
         return queryset
 
 # Donation Views
-class DonationViewSet(viewsets.ModelViewSet):
+class DonationViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Donation.objects.all()
     serializer_class = DonationSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cursor_ordering = ('-created_at',)
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -181,16 +202,53 @@ class DonationViewSet(viewsets.ModelViewSet):
         else:
             serializer.save()
 
+    def get_report_queryset(self):
+        params = self.request.query_params
+        dates = {}
+        for name in ('start', 'end'):
+            value = params.get(name)
+            dates[name] = parse_date(value) if value else None
+            if value and dates[name] is None:
+                raise ValidationError({name: 'Must be a date (YYYY-MM-DD).'})
+        return filter_donations(
+            Donation.objects.all(), start=dates['start'], end=dates['end'],
+            status=params.get('status'), payment_method=params.get('payment_method'),
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def summary(self, request):
+        return Response(donation_summary(self.get_report_queryset()))
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        # ?output= rather than ?format=, which DRF reserves for renderer selection
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'parquet'):
+            return Response({'error': 'output must be csv or parquet'}, status=status.HTTP_400_BAD_REQUEST)
+        if output == 'parquet' and not parquet_available():
+            return Response({'error': 'Parquet export needs pyarrow installed'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        queryset = self.get_report_queryset()
+        filename = f"donations-{timezone.localdate():%Y%m%d}.{output}"
+        if output == 'parquet':
+            response = StreamingHttpResponse(stream_donations_parquet(queryset), content_type='application/vnd.apache.parquet')
+        else:
+            response = StreamingHttpResponse(stream_donations_csv(queryset), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 # Shop Views
-class ProductCategoryViewSet(viewsets.ModelViewSet):
+class ProductCategoryViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ProductCategory.objects.all()
     serializer_class = ProductCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (ProductCategory,)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ResponseCacheMixin, ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (Product, ProductCategory, Review)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -199,27 +257,24 @@ class ProductViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category__slug=category)
         return queryset
 
-class OrderViewSet(viewsets.ModelViewSet):
-    serializer_class = OrderSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
-
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def get_serializer_class(self):
+        # ?lite=true drops the embedded reviews from the catalogue listing
+        if self.action == 'list' and self.request.query_params.get('lite') in ('1', 'true'):
+            return ProductListSerializer
+        return super().get_serializer_class()
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class MembershipPlanViewSet(viewsets.ModelViewSet):
+class MembershipPlanViewSet(ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = MembershipPlan.objects.filter(is_active=True)
     serializer_class = MembershipPlanSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cache_models = (MembershipPlan,)
 
-class MembershipViewSet(viewsets.ModelViewSet):
+class MembershipViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = MembershipSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -229,7 +284,7 @@ class MembershipViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -244,7 +299,12 @@ class UserViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticated()]
 
-class CountyViewSet(viewsets.ReadOnlyModelViewSet):
+class LocationValidatorsMixin(ConditionalGetMixin):
+    def get_validator_tokens(self):
+        # Any county, constituency or ward change moves the hierarchy version
+        return [get_location_snapshot().version]
+
+class CountyViewSet(LocationValidatorsMixin, QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = County.objects.all().order_by('name')
     serializer_class = CountySerializer
     permission_classes = [permissions.AllowAny]
@@ -255,14 +315,7 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
             return CountyDetailSerializer
         return CountySerializer
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        # Add select_related to optimize the query
-        if self.action == 'retrieve':
-            return queryset.prefetch_related('constituencies')
-        return queryset
-
-class ConstituencyViewSet(viewsets.ReadOnlyModelViewSet):
+class ConstituencyViewSet(LocationValidatorsMixin, QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Constituency.objects.all().order_by('name')  # Default queryset
     serializer_class = ConstituencySerializer
     permission_classes = [permissions.AllowAny]
@@ -273,7 +326,7 @@ class ConstituencyViewSet(viewsets.ReadOnlyModelViewSet):
             return self.queryset.filter(county_id=county_id)
         return self.queryset
 
-class WardViewSet(viewsets.ReadOnlyModelViewSet):
+class WardViewSet(LocationValidatorsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ward.objects.all().order_by('name')  # Default queryset
     serializer_class = WardSerializer
     permission_classes = [permissions.AllowAny]